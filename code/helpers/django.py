@@ -1,5 +1,6 @@
 from typing import Optional, Tuple
 
+import numpy as np
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.http import HttpResponseRedirect, HttpRequest
@@ -52,6 +53,17 @@ def compute_amount_of_stars(score: float):
     return 5
 
 
+# Minimum score of each of the five stars, the thresholds of compute_amount_of_stars
+STAR_THRESHOLDS = (25, 45, 60, 80, 90)
+
+
+def compute_amounts_of_stars(scores: np.ndarray) -> np.ndarray:
+    """
+    Vectorized compute_amount_of_stars for an array of scores
+    """
+    return np.searchsorted(STAR_THRESHOLDS, scores, side='right')
+
+
 def is_user_allowed_to_access(
         request: HttpRequest,
         user: User,
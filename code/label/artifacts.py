@@ -0,0 +1,320 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from functools import lru_cache
+from io import BytesIO
+from typing import BinaryIO, Callable, Optional, Union
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from code.label.catalogue import current_catalogue_generation
+from webapp.models import Catalogue, Dataset, DQMetricValue, Organization
+
+# Increase when the look of the rendered label changes, so the images stored before are not reused
+LABEL_STYLE_VERSION = 2
+# Templates, stylesheets, fonts and images of the PDF reports
+PDF_TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+
+def content_key(*parts) -> str:
+    """
+        SHA-256 of the canonical JSON of the given parts
+    """
+    content = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def assessment_answers_key(assessment_id: Optional[int]) -> str:
+    """
+        SHA-256 of the answers of an assessment, the same for every assessment with the same answers
+
+        Params
+        ------
+        assessment_id: int
+            The assessment, None for a dataset not assessed yet
+
+        Returns
+        -------
+        The hexadecimal SHA-256 key
+    """
+    answers = []
+
+    if assessment_id is not None:
+        answers = list(
+            DQMetricValue.objects.filter(dq_assessment_id=assessment_id).order_by('dq_metric_id').values_list(
+                'dq_metric_id',
+                'value'
+            )
+        )
+
+    return content_key(answers)
+
+
+@lru_cache(maxsize=None)
+def pdf_template_version() -> str:
+    """
+        SHA-256 of every file of the PDF templates directory, the PDFs stored before a change are not reused.
+        Computed once per process.
+    """
+    digest = hashlib.sha256()
+
+    for root, directories, filenames in os.walk(PDF_TEMPLATES_PATH):
+        directories.sort()
+
+        for filename in sorted(filenames):
+            path = os.path.join(root, filename)
+            digest.update(os.path.relpath(path, PDF_TEMPLATES_PATH).encode('utf-8'))
+
+            with open(path, 'rb') as template_file:
+                digest.update(template_file.read())
+
+    return digest.hexdigest()
+
+
+def pdf_artifact_key(dataset: Dataset, catalogue: Optional[Catalogue], organization: Organization) -> str:
+    """
+        Key of the PDF report in the artifact store, computed from everything shown in it without building the
+        assessment tree nor loading WeasyPrint. The generation date on the first page is the one of the stored PDF.
+    """
+    return content_key(
+        pdf_template_version(),
+        LABEL_STYLE_VERSION,
+        current_catalogue_generation(),
+        dataset.name,
+        catalogue.title if catalogue is not None else None,
+        organization.name,
+        assessment_answers_key(dataset.dq_assessment_id)
+    )
+
+
+class ArtifactBackend(ABC):
+    """
+        Storage of the artifact store. Artifacts are identified by their kind ('label', 'pdf', 'ttl') and a key
+        computed from everything they are generated from, so an artifact never changes once stored.
+    """
+
+    @abstractmethod
+    def open(self, kind: str, key: str) -> Optional[BinaryIO]:
+        """Opens the artifact for reading, None if it is not stored."""
+
+    @abstractmethod
+    def put(self, kind: str, key: str, content: BinaryIO) -> None:
+        """Stores the artifact, read from the file, unless an artifact with the key is already stored."""
+
+    @abstractmethod
+    def delete(self, kind: str, key: str) -> None:
+        """Removes the artifact, if it is stored."""
+
+    def evict(self) -> None:
+        """Removes the artifacts over the size limit of the storage, if it has one."""
+
+
+class LocalArtifactBackend(ArtifactBackend):
+    """
+        Artifacts on the local disk, shared by every worker process. Opening an artifact marks it as recently used
+        and the least recently used artifacts are removed when the size limit is exceeded.
+    """
+    # Artifacts stored by this process between two scans of the whole store, the other processes also store
+    # artifacts that the size counted by this process does not include
+    EVICTION_INTERVAL = 100
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        # Size of the store at the last scan plus the artifacts stored by this process since, None before the
+        # first scan
+        self._size = None
+        self._puts_since_scan = 0
+        self._size_lock = threading.Lock()
+
+    def path(self, kind: str, key: str) -> str:
+        return os.path.join(self.directory, kind, key[:2], key)
+
+    def open(self, kind: str, key: str) -> Optional[BinaryIO]:
+        path = self.path(kind, key)
+
+        try:
+            artifact = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        try:
+            # The modification time is the last use of the artifact
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        return artifact
+
+    def put(self, kind: str, key: str, content: BinaryIO) -> None:
+        path = self.path(kind, key)
+
+        # Generated from the same inputs by another process meanwhile
+        if os.path.exists(path):
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Written to a temporary file first, so no process reads a partially written artifact
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+
+        try:
+            with os.fdopen(file_descriptor, 'wb') as temporary_file:
+                shutil.copyfileobj(content, temporary_file)
+
+            os.replace(temporary_path, path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+
+        with self._size_lock:
+            self._puts_since_scan += 1
+
+            if self._size is not None:
+                self._size += os.path.getsize(path)
+
+            # The whole store is only scanned when it may be over the limit
+            scan = self._size is None or self._size > self.max_bytes or \
+                self._puts_since_scan >= self.EVICTION_INTERVAL
+
+        if scan:
+            self.evict()
+
+    def delete(self, kind: str, key: str) -> None:
+        try:
+            os.remove(self.path(kind, key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> None:
+        """
+            Removes the least recently used artifacts until the store fits in max_bytes. Scans the whole store, run
+            every EVICTION_INTERVAL artifacts stored by the process and by the pdf_worker command when idle.
+        """
+        entries = []
+        total_size = 0
+
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+
+                path = os.path.join(root, filename)
+
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        if total_size > self.max_bytes:
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    # Removed by another process evicting at the same time
+                    pass
+
+                total_size -= size
+
+                if total_size <= self.max_bytes:
+                    break
+
+        with self._size_lock:
+            self._size = total_size
+            self._puts_since_scan = 0
+
+
+class ArtifactStore:
+    """
+        Generated files (label images, PDF reports, RDF files) stored by the key of their inputs, so generating an
+        artifact again is replaced by reading it. Counts the hits and misses of this process by kind.
+    """
+
+    def __init__(self, backend: ArtifactBackend):
+        self.backend = backend
+        self.hits = Counter()
+        self.misses = Counter()
+        self._counters_lock = threading.Lock()
+
+    def open(self, kind: str, key: str) -> Optional[BinaryIO]:
+        artifact = self.backend.open(kind, key)
+
+        with self._counters_lock:
+            if artifact is None:
+                self.misses[kind] += 1
+            else:
+                self.hits[kind] += 1
+
+        return artifact
+
+    def get(self, kind: str, key: str) -> Optional[bytes]:
+        artifact = self.open(kind, key)
+
+        if artifact is None:
+            return None
+
+        with artifact:
+            return artifact.read()
+
+    def put(self, kind: str, key: str, content: Union[bytes, BinaryIO]) -> None:
+        if isinstance(content, bytes):
+            content = BytesIO(content)
+
+        self.backend.put(kind, key, content)
+
+    def get_or_create(self, kind: str, key: str, create: Callable[[], bytes]) -> bytes:
+        """
+            Returns the stored artifact, generated with create and stored if missing
+        """
+        content = self.get(kind, key)
+
+        if content is None:
+            content = create()
+            self.put(kind, key, content)
+
+        return content
+
+    def delete(self, kind: str, key: str) -> None:
+        self.backend.delete(kind, key)
+
+    def evict(self) -> None:
+        self.backend.evict()
+
+    def stats(self) -> dict:
+        """
+            Hits and misses of this process by kind
+        """
+        with self._counters_lock:
+            return {
+                kind: {'hits': self.hits[kind], 'misses': self.misses[kind]}
+                for kind in sorted(set(self.hits) | set(self.misses))
+            }
+
+
+def create_artifact_store() -> ArtifactStore:
+    """
+        Artifact store with the backend of the ARTIFACT_STORE setting
+    """
+    backend_class = import_string(settings.ARTIFACT_STORE['BACKEND'])
+
+    if not isinstance(backend_class, type) or not issubclass(backend_class, ArtifactBackend):
+        raise ImproperlyConfigured(
+            f'The ARTIFACT_STORE backend {settings.ARTIFACT_STORE["BACKEND"]} is not an ArtifactBackend'
+        )
+
+    return ArtifactStore(backend_class(**settings.ARTIFACT_STORE.get('OPTIONS', {})))
+
+
+artifact_store = create_artifact_store()
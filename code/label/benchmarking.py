@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from django.db.models import QuerySet
+
+from code.label.catalogue import get_catalogue_snapshot
+from code.label.label import compute_bulk_maturity_scores
+from code.label.statistics import PERCENTILES, optional_float, percentiles
+
+# Width of the bins of the maturity score histogram
+SCORE_BIN_WIDTH = 5
+
+
+def maturity_benchmark(organizations: QuerySet) -> dict:
+    """
+        Distribution of the maturity of many organizations, computed from their level matrix
+
+        Params
+        ------
+        organizations: QuerySet
+            The organizations to compare
+
+        Returns
+        -------
+        The amount of organizations and of the ones with at least one maturity level, the percentiles and
+        histogram of the maturity score of the latter, and for every dimension the amount of organizations that
+        selected a level, the mean and percentiles of the level and how many organizations selected each level
+    """
+    catalogue = get_catalogue_snapshot()
+    organization_ids, level_matrix, scores = compute_bulk_maturity_scores(organizations)
+
+    levels = pd.DataFrame(
+        level_matrix,
+        index=organization_ids,
+        columns=[dimension.name for dimension in catalogue.maturity_dimensions]
+    )
+
+    # Organizations that never filled the maturity assessment would drag every statistic to 0
+    assessed = levels.notna().any(axis=1).to_numpy()
+    assessed_levels = levels[assessed]
+    assessed_scores = pd.Series(scores[assessed])
+
+    maximum_score = int(sum(max((level.value for level in dimension.levels), default=0)
+                            for dimension in catalogue.maturity_dimensions))
+    bins = np.arange(0, maximum_score + SCORE_BIN_WIDTH, SCORE_BIN_WIDTH)
+    histogram, edges = np.histogram(assessed_scores, bins=bins) if len(bins) > 1 else (np.array([]), bins)
+
+    dimension_quantiles = assessed_levels.quantile(list(PERCENTILES))
+    dimension_means = assessed_levels.mean()
+    dimension_answered = assessed_levels.count()
+
+    dimensions = []
+    for dimension in catalogue.maturity_dimensions:
+        column = assessed_levels[dimension.name]
+        level_counts = column.value_counts()
+
+        dimensions.append({
+            'id': dimension.id,
+            'name': dimension.name,
+            'answered': int(dimension_answered[dimension.name]),
+            'mean': optional_float(dimension_means[dimension.name]),
+            'percentiles': percentiles(dimension_quantiles[dimension.name]),
+            'distribution': [
+                {'value': level.value, 'text': level.text, 'count': int(level_counts.get(float(level.value), 0))}
+                for level in dimension.levels
+            ]
+        })
+
+    return {
+        'organizations': len(organization_ids),
+        'assessed_organizations': int(assessed.sum()),
+        'maximum_score': maximum_score,
+        'score': {
+            'mean': optional_float(assessed_scores.mean()),
+            'percentiles': percentiles(assessed_scores.quantile(list(PERCENTILES))),
+            'histogram': [
+                {'from': int(start), 'to': int(end), 'count': int(count)}
+                for start, end, count in zip(edges[:-1], edges[1:], histogram)
+            ]
+        },
+        'dimensions': dimensions
+    }
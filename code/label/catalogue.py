@@ -0,0 +1,348 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import F, Prefetch
+from django.utils import timezone
+
+from code.label.scoring import ScoringEngine, MaturityEngine
+from code.label.shared_catalogue import attach_catalogue_arrays, share_catalogue_arrays
+from webapp.models import EHDSCategory, DQDimension, DQMetric, DQCategoricalMetricCategory, DQCatalogueGeneration, \
+    MaturityDimension, MaturityDimensionLevel
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+@dataclass(frozen=True, slots=True)
+class MetricLevel:
+    value: int
+    text: str
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogueMetric:
+    id: int
+    name: str
+    definition: str
+    additional_information: Optional[str]
+    measurement_approach: Optional[str]
+    formula: Optional[str]
+    weight: float
+    needs_report_URL: bool
+    is_categorical: bool
+    # Categorical levels ordered by value
+    levels: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogueDimension:
+    id: int
+    name: str
+    definition: str
+    relevance: Optional[float]
+    metrics: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogueCategory:
+    id: int
+    name: str
+    dimensions: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class MaturityLevel:
+    id: int
+    value: int
+    text: str
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogueMaturityDimension:
+    id: int
+    name: str
+    definition: str
+    # Levels ordered by id
+    levels: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogueSnapshot:
+    """
+        Read-only copy of the DQ and maturity catalogues and their scoring engines, valid while the catalogue
+        generation stored in the database does not change
+    """
+    generation: int
+    categories: tuple
+    engine: ScoringEngine
+    # Sum of the relevance of all the dimensions
+    total_relevance: float
+    maturity_dimensions: tuple
+    maturity_engine: MaturityEngine
+
+    @property
+    def dimensions(self) -> list:
+        return [dimension for category in self.categories for dimension in category.dimensions]
+
+    @property
+    def metrics(self) -> list:
+        return [metric for dimension in self.dimensions for metric in dimension.metrics]
+
+
+def load_catalogue() -> tuple:
+    """
+        Loads the EHDS categories with their dimensions, metrics and categorical levels with a fixed number
+        of queries
+
+        Returns
+        -------
+        The immutable catalogue, ordered by id at every level
+    """
+    metrics = DQMetric.objects.select_related('dqcategoricalmetric').prefetch_related(
+        Prefetch(
+            'dqcategoricalmetric__dqcategoricalmetriccategory_set',
+            queryset=DQCategoricalMetricCategory.objects.order_by('value', 'id')
+        )
+    ).order_by('id')
+
+    categories = EHDSCategory.objects.prefetch_related(
+        Prefetch('dqdimension_set', queryset=DQDimension.objects.order_by('id')),
+        Prefetch('dqdimension_set__dqmetric_set', queryset=metrics)
+    ).order_by('id')
+
+    return tuple(
+        CatalogueCategory(
+            id=category.id,
+            name=category.name,
+            dimensions=tuple(
+                CatalogueDimension(
+                    id=dimension.id,
+                    name=dimension.name,
+                    definition=dimension.definition,
+                    relevance=dimension.relevance,
+                    metrics=tuple(_catalogue_metric(metric) for metric in dimension.dqmetric_set.all())
+                )
+                for dimension in category.dqdimension_set.all()
+            )
+        )
+        for category in categories
+    )
+
+
+def load_maturity_catalogue() -> tuple:
+    """
+        Loads the maturity dimensions with their levels with two queries
+    """
+    dimensions = MaturityDimension.objects.prefetch_related(
+        Prefetch('maturitydimensionlevel_set', queryset=MaturityDimensionLevel.objects.order_by('id'))
+    ).order_by('id')
+
+    return tuple(
+        CatalogueMaturityDimension(
+            id=dimension.id,
+            name=dimension.name,
+            definition=dimension.definition,
+            levels=tuple(
+                MaturityLevel(id=level.id, value=level.value, text=level.text)
+                for level in dimension.maturitydimensionlevel_set.all()
+            )
+        )
+        for dimension in dimensions
+    )
+
+
+def build_scoring_engine(categories: tuple, arrays: Optional[dict] = None) -> ScoringEngine:
+    """
+        Builds the scoring engine from an already loaded catalogue, without queries
+    """
+    engine_categories = []
+    engine_dimensions = []
+    engine_metrics = []
+
+    for category in categories:
+        engine_categories.append({'id': category.id, 'name': category.name})
+
+        for dimension in category.dimensions:
+            engine_dimensions.append({
+                'id': dimension.id,
+                'name': dimension.name,
+                'relevance': dimension.relevance,
+                'ehds_category_id': category.id
+            })
+
+            for metric in dimension.metrics:
+                engine_metrics.append({
+                    'id': metric.id,
+                    'definition': metric.definition,
+                    'weight': metric.weight,
+                    'dq_dimension_id': dimension.id,
+                    'is_categorical': metric.is_categorical,
+                    'category_count': len(metric.levels)
+                })
+
+    return ScoringEngine(
+        categories=engine_categories,
+        dimensions=engine_dimensions,
+        metrics=engine_metrics,
+        arrays=arrays
+    )
+
+
+def build_maturity_engine(dimensions: tuple, arrays: Optional[dict] = None) -> MaturityEngine:
+    """
+        Builds the maturity engine from an already loaded maturity catalogue, without queries
+    """
+    return MaturityEngine(
+        dimensions=[{'id': dimension.id, 'name': dimension.name} for dimension in dimensions],
+        levels=[
+            {'id': level.id, 'value': level.value, 'maturity_dimension_id': dimension.id}
+            for dimension in dimensions for level in dimension.levels
+        ],
+        arrays=arrays
+    )
+
+
+def build_catalogue_snapshot(generation: int, modified: Optional[datetime] = None) -> CatalogueSnapshot:
+    categories = load_catalogue()
+    maturity_dimensions = load_maturity_catalogue()
+
+    shared_arrays = attach_catalogue_arrays(generation, modified) if settings.SHARED_CATALOGUE else None
+
+    if shared_arrays is not None:
+        # Arrays computed by the process that published this version, mapped without a copy
+        engine = build_scoring_engine(categories, arrays=_prefixed_arrays(shared_arrays, 'dq.'))
+        maturity_engine = build_maturity_engine(
+            maturity_dimensions,
+            arrays=_prefixed_arrays(shared_arrays, 'maturity.')
+        )
+    else:
+        engine = build_scoring_engine(categories)
+        maturity_engine = build_maturity_engine(maturity_dimensions)
+
+        if settings.SHARED_CATALOGUE:
+            # First process of this version, the others map its arrays. It keeps using its own copy.
+            share_catalogue_arrays(generation, modified, {
+                **{f'dq.{field}': array for field, array in engine.arrays().items()},
+                **{f'maturity.{field}': array for field, array in maturity_engine.arrays().items()}
+            })
+
+    return CatalogueSnapshot(
+        generation=generation,
+        categories=categories,
+        engine=engine,
+        total_relevance=sum(
+            dimension.relevance or 0 for category in categories for dimension in category.dimensions
+        ),
+        maturity_dimensions=maturity_dimensions,
+        maturity_engine=maturity_engine
+    )
+
+
+def current_catalogue_generation() -> int:
+    """
+        The generation of the catalogue stored in the database, shared by all the worker processes
+    """
+    generation = DQCatalogueGeneration.objects.filter(pk=1).values_list('generation', flat=True).first()
+
+    return generation or 0
+
+
+def current_catalogue_version() -> tuple[int, Optional[datetime]]:
+    """
+        The generation of the catalogue stored in the database and the last time it changed, None if unknown
+    """
+    version = DQCatalogueGeneration.objects.filter(pk=1).values_list('generation', 'modified').first()
+
+    return version or (0, None)
+
+
+def bump_catalogue_generation() -> None:
+    """
+        Marks the catalogue as changed, so every process rebuilds its snapshot on its next use
+    """
+    modified = timezone.now()
+    updated = DQCatalogueGeneration.objects.filter(pk=1).update(generation=F('generation') + 1, modified=modified)
+
+    if not updated:
+        DQCatalogueGeneration.objects.get_or_create(pk=1, defaults={'generation': 1, 'modified': modified})
+
+
+def get_catalogue_snapshot() -> CatalogueSnapshot:
+    """
+        Returns the catalogue snapshot of this process, rebuilding it when the catalogue generation stored in
+        the database has changed. Costs a single query while the catalogue does not change.
+    """
+    global _snapshot
+
+    generation, modified = current_catalogue_version()
+    snapshot = _snapshot
+
+    if snapshot is not None and snapshot.generation == generation:
+        return snapshot
+
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.generation != generation:
+            _snapshot = build_catalogue_snapshot(generation, modified)
+
+        return _snapshot
+
+
+def reset_catalogue_snapshot() -> None:
+    """
+        Drops the catalogue snapshot of this process, needed when a catalogue change is rolled back and the
+        generation counter goes back to a value already seen
+    """
+    global _snapshot
+
+    with _snapshot_lock:
+        _snapshot = None
+
+
+def preload_catalogue_snapshot() -> None:
+    """
+        Builds the catalogue snapshot before the worker processes are forked (gunicorn --preload), so the
+        workers inherit it and its arrays are published to shared memory once by the master
+    """
+    try:
+        get_catalogue_snapshot()
+    except DatabaseError:
+        # Database not reachable or not migrated yet, the workers will build the snapshot themselves
+        pass
+    finally:
+        # Database connections can not be shared with the forked workers
+        connections.close_all()
+
+
+def _prefixed_arrays(arrays: dict, prefix: str) -> dict:
+    return {key[len(prefix):]: array for key, array in arrays.items() if key.startswith(prefix)}
+
+
+def _catalogue_metric(metric: DQMetric) -> CatalogueMetric:
+    try:
+        categorical_metric = metric.dqcategoricalmetric
+    except DQMetric.dqcategoricalmetric.RelatedObjectDoesNotExist:
+        categorical_metric = None
+
+    levels = ()
+    if categorical_metric is not None:
+        levels = tuple(
+            MetricLevel(value=level.value, text=level.text)
+            for level in categorical_metric.dqcategoricalmetriccategory_set.all()
+        )
+
+    return CatalogueMetric(
+        id=metric.id,
+        name=metric.name,
+        definition=metric.definition,
+        additional_information=metric.additional_information,
+        measurement_approach=metric.measurement_approach,
+        formula=metric.formula,
+        weight=metric.weight,
+        needs_report_URL=metric.needs_report_URL,
+        is_categorical=categorical_metric is not None,
+        levels=levels
+    )
@@ -1,15 +1,46 @@
 import base64
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
 from typing import Optional
 
-import plotly.express as px
+import numpy as np
+import plotly.graph_objects as go
 import plotly.io as pio
-from django.db.models import Sum
-
-from code.helpers.django import generate_assessment_stars
-from webapp.models import Dataset, EHDSCategory, DQDimension, DQMetric, DQMetricValue, DQCategoricalMetricCategory, MaturityDimension, MaturityDimensionValue, MaturityDimensionLevel, Organization
-
-
-def plot_label(dataset: Dataset, output_type: str = 'html') -> Optional[str]:
+from PIL import Image
+from django.core.cache import caches
+from django.db.models import QuerySet
+from django.utils.http import quote_etag
+
+from code.helpers.django import compute_amount_of_stars, generate_assessment_stars
+from code.label.catalogue import current_catalogue_generation, current_catalogue_version, get_catalogue_snapshot
+from code.label.artifacts import LABEL_STYLE_VERSION, artifact_store, content_key
+from code.label.materialization import refresh_assessment_scores
+from code.label.sunburst import SunburstSector, render_sunburst_svg
+from code.label.tree import AssessmentTree, build_assessment_tree
+from webapp.models import Dataset, DQAssessment, MaturityDimensionValue, Organization
+
+# Predefined color palette for categories
+CATEGORY_COLORS = [
+    (0, 68, 148),  # Dark Blue
+    (255, 214, 23),  # Yellow
+    (64, 64, 64),  # Dark Grey
+    (242, 151, 39)  # Orange
+]
+
+ANNOTATION_FONT_SIZE = 15
+
+QUANTUM_ICON_PATH = Path(__file__).resolve().parent / 'templates' / 'img' / 'quantum_icon.png'
+# Height in pixels of the icon embedded in the SVG labels, twice the drawn size so it stays sharp when printed
+SVG_ICON_HEIGHT = 180
+
+# Formats of the maturity plot kept in the plots cache
+MATURITY_PLOT_OUTPUT_TYPES = ('html', 'img')
+
+
+def plot_label(dataset: Dataset, output_type: str = 'html', tree: Optional[AssessmentTree] = None) -> Optional[str]:
     """
         Returns the plot of the DQ&U label in graphical format
 
@@ -19,18 +50,125 @@ def plot_label(dataset: Dataset, output_type: str = 'html') -> Optional[str]:
         output_type: str
             - html -> for embedding div into website
             - img -> for base64 encoded image
+            - svg -> for the SVG document, drawn without plotly and kaleido
+            - json -> for the plotly figure, rendered by the browser
+        tree: AssessmentTree
+            The already built assessment tree of the dataset, if available
 
         Returns
         -------
         The plot in the specified format or None if the output type is wrong
     """
-    elements = []
-    parents = []
-    values = []
-    colors = {}
-    custom_hover_texts = []
+    if tree is None:
+        tree = build_assessment_tree(dataset)
+
+    if output_type == 'html':
+        # Generate HTML div as a string
+        html_div = pio.to_html(
+            _label_figure(tree),
+            default_width='100%',
+            include_plotlyjs='cdn',
+            full_html=False,
+            config={'staticPlot': False},
+            validate=False
+        )
+
+        return html_div
+    elif output_type == 'img':
+        # Encode image to base64
+        encoded_img = base64.b64encode(label_image(tree)).decode('utf-8')
+
+        # Return the base64 string
+        return f"data:image/png;base64,{encoded_img}"
+    elif output_type == 'svg':
+        return _sunburst_svg(*_label_sunburst(tree))
+    elif output_type == 'json':
+        return pio.to_json(_label_figure(tree), validate=False)
+
+    return None
+
+
+def label_validators(dataset: Dataset) -> tuple[str, Optional[datetime]]:
+    """
+        HTTP validators of the label of the dataset, obtained without building its assessment tree. The label only
+        changes with the answers of the assessment, which store its scores again, and with the catalogue.
+
+        Params
+        ------
+        dataset: Dataset
+
+        Returns
+        -------
+        The ETag and the Last-Modified date, None if unknown
+    """
+    generation, catalogue_modified = current_catalogue_version()
+    assessment = dataset.dq_assessment
+    score_date = assessment.score_date if assessment is not None else None
+
+    etag = quote_etag(content_key(LABEL_STYLE_VERSION, generation, dataset.dq_assessment_id, score_date))
+    last_modified = max((date for date in (catalogue_modified, score_date) if date is not None), default=None)
+
+    return etag, last_modified
+
+
+def label_image(tree: AssessmentTree) -> bytes:
+    """
+        Returns the PNG image of the DQ&U label. Rendering with kaleido is slow, so the images are kept in the
+        artifact store: datasets with the same scores share one image.
+
+        Params
+        ------
+        tree: AssessmentTree
+            The assessment tree of the dataset
+
+        Returns
+        -------
+        The PNG image
+    """
+    # Convert figure to image in memory (PNG)
+    return artifact_store.get_or_create(
+        'label',
+        label_image_key(tree),
+        lambda: pio.to_image(_label_figure(tree), format="png", validate=False)
+    )
+
+
+def label_image_key(tree: AssessmentTree) -> str:
+    """
+        Cache key of the label image: everything drawn on the label, i.e. the names, scores and relevances of the
+        categories and dimensions, the total score and the stars, and the version of the label style
+
+        Params
+        ------
+        tree: AssessmentTree
+
+        Returns
+        -------
+        The hexadecimal SHA-256 key
+    """
+    categories = [
+        [
+            category.name, category.score, category.relevance,
+            [[dimension.name, dimension.score, dimension.relevance] for dimension in category.dimensions]
+        ]
+        for category in tree.categories
+    ]
+
+    return content_key(LABEL_STYLE_VERSION, tree.score, compute_amount_of_stars(tree.score), categories)
+
 
-    scores, total_score = compute_scores(dataset=dataset)
+def _label_figure(tree: AssessmentTree) -> dict:
+    """
+        Sunburst figure of the DQ&U label, category -> dimension, with the stars and score in the middle
+    """
+    return _sunburst_figure('label', *_label_sunburst(tree))
+
+
+def _label_sunburst(tree: AssessmentTree) -> tuple[SunburstSector, str]:
+    """
+        Sectors of the DQ&U label, category -> dimension, and the stars and score written in the middle
+    """
+    total_score = tree.score
     total_score_is_zero = total_score == 0.0
 
     stars = generate_assessment_stars(
@@ -41,81 +179,151 @@ def plot_label(dataset: Dataset, output_type: str = 'html') -> Optional[str]:
 
     total_score = f'{total_score:.2f}'
 
-    # Predefined color palette for categories
-    category_colors = [
-        (0, 68, 148),  # Dark Blue
-        (255, 214, 23),  # Yellow
-        (64, 64, 64),  # Dark Grey
-        (242, 151, 39)  # Orange
-    ]
-
     category_index = 0  # Track category color assignment
 
     # Root Element
-    elements.append('QUANTUM')
-    parents.append('')
-    values.append(100)
-    colors['QUANTUM'] = 'rgb(255, 255, 255)'  # White
-    custom_hover_texts.append(f'DQ&U<br>Score: {total_score}')
-
-    for category in EHDSCategory.objects.all():
-        dimensions = DQDimension.objects.filter(ehds_category=category)
+    root = SunburstSector(
+        label='QUANTUM',
+        value=100,
+        color='rgb(255, 255, 255)',  # White
+        hover_text=f'DQ&U<br>Score: {total_score}',
+        id='QUANTUM'
+    )
 
-        category_score = scores[category.name]['score']
-        category_max_score = scores[category.name]['relevance']
+    for category in tree.categories:
+        category_score = category.score
+        category_max_score = category.relevance
         category_name = f'{category.name.replace(" ", "<br>")}<br>{category_score:.2f}/{category_max_score:.2f}'
 
-        elements.append(category_name)
-        parents.append('QUANTUM')
-        values.append(category_max_score)
-        custom_hover_texts.append(category_name)
-
         # Assign a color to the category
-        base_color = category_colors[category_index % len(category_colors)]
+        base_color = CATEGORY_COLORS[category_index % len(CATEGORY_COLORS)]
         category_index += 1  # Increment for the next category
 
         # Store solid RGB color (full opacity) for the category
-        category_color = f'rgb({base_color[0]},{base_color[1]},{base_color[2]})'
-        colors[category_name] = category_color
+        category_sector = SunburstSector(
+            label=category_name,
+            value=category_max_score,
+            color=f'rgb({base_color[0]},{base_color[1]},{base_color[2]})',
+            id=f'category-{category.id}'
+        )
+        root.children.append(category_sector)
 
-        for dimension in dimensions:
-            score = scores[category.name]['dimensions'][dimension.name]['score']
-            max_score = scores[category.name]['dimensions'][dimension.name]['relevance'] * 100
+        for dimension in category.dimensions:
+            score = dimension.score
+            max_score = dimension.relevance
 
             score_str = f'{score:.2f}'
             max_score_str = f'{max_score:.2f}'
 
             dimension_name = f'{dimension.name.replace(" ", "<br>")}<br>{score_str}/{max_score_str}'
-            elements.append(dimension_name)
-            parents.append(category_name)
-            custom_hover_texts.append(dimension_name)
 
             # Compute dimension opacity using the category's base color
             opacity = min(1.0, max(score / max_score, 0.1))  # Ensuring opacity is between 0.3 and 1.0
             rgba_color = f'rgba({base_color[0]},{base_color[1]},{base_color[2]},{opacity:.2f})'
 
-            values.append(max_score)
-            colors[dimension_name] = rgba_color  # Assign color with opacity
+            category_sector.children.append(SunburstSector(
+                label=dimension_name,
+                value=max_score,
+                color=rgba_color,
+                id=f'dimension-{dimension.id}'
+            ))
 
-    # Store color mapping explicitly in the dataset
-    data = dict(
-        elements=elements,
-        parents=parents,
-        values=values,
-        hover_texts=custom_hover_texts
-    )
+    if total_score_is_zero:
+        score_text = 0
+    else:
+        score_text = total_score
+
+    return root, f'{stars}<br>{score_text}/100'
+
+
+@dataclass(frozen=True)
+class FigureSkeleton:
+    ids: tuple
+    parents: tuple
+    # Validated plotly figure as a dict, the arrays of the sectors are replaced for every dataset
+    figure: dict
+
+
+# Figure skeletons of this process, by kind of figure
+_figure_skeletons = {}
+
+
+def _sunburst_figure(kind: str, root: SunburstSector, annotation: str) -> dict:
+    """
+        Plotly sunburst of the sectors, with the QUANTUM logo and the annotation in the middle, as a figure dict to
+        serialize without validation. The figure is only built and validated once per kind of figure and catalogue
+        structure, then the labels, values, colors and hover texts of the sectors are replaced in a copy.
+    """
+    ids = []
+    parents = []
+    labels = []
+    values = []
+    colors = []
+    custom_hover_texts = []
 
-    # Create sunburst plot
-    figure = px.sunburst(
-        data,
-        names='elements',
-        parents='parents',
-        values='values',
+    sectors = [(root, '')]
+    while sectors:
+        sector, parent = sectors.pop()
+        sector_id = sector.id if sector.id is not None else sector.label
+
+        ids.append(sector_id)
+        parents.append(parent)
+        labels.append(sector.label)
+        values.append(sector.value)
+        colors.append(sector.color)
+        custom_hover_texts.append(sector.hover_text if sector.hover_text is not None else sector.label)
+
+        sectors.extend((child, sector_id) for child in reversed(sector.children))
+
+    ids = tuple(ids)
+    parents = tuple(parents)
+
+    # Rebuilt when the catalogue has other categories or dimensions
+    skeleton = _figure_skeletons.get(kind)
+    if skeleton is None or skeleton.ids != ids or skeleton.parents != parents:
+        skeleton = build_figure_skeleton(ids, parents)
+        _figure_skeletons[kind] = skeleton
+
+    trace = skeleton.figure['data'][0]
+    layout = skeleton.figure['layout']
+
+    return {
+        'data': [dict(
+            trace,
+            labels=labels,
+            values=values,
+            customdata=custom_hover_texts,
+            marker=dict(trace['marker'], colors=colors)
+        )],
+        'layout': dict(layout, annotations=[dict(layout['annotations'][0], text=annotation)])
+    }
+
+
+def build_figure_skeleton(ids: tuple, parents: tuple) -> FigureSkeleton:
+    """
+        Builds and validates the sunburst figure of the given sectors, with placeholder labels, values and colors
+
+        Params
+        ------
+        ids: tuple
+            The identifiers of the sectors, root first
+        parents: tuple
+            The identifier of the parent of every sector, empty for the root
+
+        Returns
+        -------
+        The figure skeleton
+    """
+    figure = go.Figure(go.Sunburst(
+        ids=ids,
+        parents=parents,
+        labels=ids,
+        values=[0] * len(ids),
         branchvalues='total',
-        color='elements',
-        color_discrete_map=colors,
-        custom_data=['hover_texts']
-    )
+        marker=dict(colors=['rgb(255, 255, 255)'] * len(ids)),
+        customdata=ids,
+        hovertemplate='<b>%{customdata}<extra></extra></b>'
+    ))
 
     figure.update_layout(
         images=[dict(
@@ -128,20 +336,13 @@ def plot_label(dataset: Dataset, output_type: str = 'html') -> Optional[str]:
         )],
     )
 
-    figure.update_traces(hovertemplate='<b>%{customdata}<extra></extra></b>')
-
-    if total_score_is_zero:
-        score_text = 0
-    else:
-        score_text = total_score
-
     figure.add_annotation(
         dict(
             font=dict(color='black', size=15),
             xref='paper', yref='paper',
             x=0.5, y=0.43,
             showarrow=False,
-            text=f'{stars}<br>{score_text}/100',
+            text='',
             textangle=0,
             xanchor='center',
         )
@@ -151,150 +352,203 @@ def plot_label(dataset: Dataset, output_type: str = 'html') -> Optional[str]:
         margin=dict(t=0, l=0, r=0, b=0)
     )
 
-    if output_type == 'html':
-        # Generate HTML div as a string
-        html_div = pio.to_html(
-            figure,
-            default_width='100%',
-            include_plotlyjs='cdn',
-            full_html=False,
-            config={'staticPlot': False}
-        )
+    return FigureSkeleton(ids=ids, parents=parents, figure=figure.to_plotly_json())
 
-        return html_div
-    elif output_type == 'img':
-        # Convert figure to image in memory (PNG)
-        img_bytes = pio.to_image(figure, format="png")
 
-        # Encode image to base64
-        encoded_img = base64.b64encode(img_bytes).decode('utf-8')
+def _sunburst_svg(root: SunburstSector, annotation: str) -> str:
+    """
+        SVG of the sectors with the QUANTUM icon and the annotation in the middle, the same drawing as
+        _sunburst_figure without plotly
+    """
+    return render_sunburst_svg(
+        root,
+        [(line, ANNOTATION_FONT_SIZE) for line in annotation.split('<br>')],
+        logo=_svg_icon()
+    )
 
-        # Return the base64 string
-        return f"data:image/png;base64,{encoded_img}"
 
-    return None
+@lru_cache(maxsize=1)
+def _svg_icon() -> tuple:
+    """
+        (data URI, width, height) of the QUANTUM icon, downscaled once so every SVG label does not embed the full
+        size image
+    """
+    with Image.open(QUANTUM_ICON_PATH) as icon:
+        icon.thumbnail((SVG_ICON_HEIGHT * icon.width // icon.height, SVG_ICON_HEIGHT))
+
+        buffer = BytesIO()
+        icon.save(buffer, format='PNG', optimize=True)
+
+        return f'data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode("utf-8")}', icon.width, icon.height
 
 
 def compute_scores(dataset: Dataset) -> [dict, float]:
-    # Compute the assessment table
-    dimensions_total_relevance = DQDimension.objects.aggregate(Sum('relevance'))['relevance__sum']
+    """
+        Computes the DQ&U score tree of the dataset assessment
 
-    results = {}
-    total_score = 0
+        Params
+        ------
+        dataset: Dataset
+
+        Returns
+        -------
+        The scores per category, dimension and metric and the total score
+    """
     assessment = dataset.dq_assessment
-    ehds_categories = EHDSCategory.objects.all()
-    for category in ehds_categories:
-        results[category.name] = {
-            'relevance': 0,
-            'dimensions': {},
-            'score': 0
+
+    if assessment is None:
+        engine = get_catalogue_snapshot().engine
+
+        return engine.score(engine.assessment_answers(None))
+
+    # Scores are materialized on the assessment and kept up to date by webapp.signals
+    if assessment.score_tree is None or assessment.score is None:
+        refresh_assessment_scores([assessment.id])
+        assessment.refresh_from_db(fields=['score', 'score_tree', 'answered_metrics'])
+
+    return assessment.score_tree, assessment.score
+
+
+def compute_bulk_scores(datasets: QuerySet) -> dict:
+    """
+        Computes the DQ&U score of many datasets at once. Materialized scores are read with a single query and
+        the assessments never scored are computed together from a single query of their metric values.
+
+        Params
+        ------
+        datasets: QuerySet
+            The datasets to score
+
+        Returns
+        -------
+        For every dataset id, a dictionary with its total "score" and the number of "answered" metrics
+    """
+    dataset_assessments = {
+        dataset_id: (assessment_id, score, answered)
+        for dataset_id, assessment_id, score, answered in datasets.values_list(
+            'id', 'dq_assessment_id', 'dq_assessment__score', 'dq_assessment__answered_metrics'
+        )
+    }
+
+    # Scores are materialized on the assessments, only the ones never scored are computed
+    missing_assessment_ids = [
+        assessment_id
+        for assessment_id, score, answered in dataset_assessments.values()
+        if assessment_id is not None and (score is None or answered is None)
+    ]
+
+    if missing_assessment_ids:
+        refresh_assessment_scores(missing_assessment_ids)
+
+        refreshed = {
+            assessment_id: (score, answered)
+            for assessment_id, score, answered in DQAssessment.objects.filter(
+                id__in=missing_assessment_ids
+            ).values_list('id', 'score', 'answered_metrics')
         }
 
-        dimensions = DQDimension.objects.filter(ehds_category=category)
-        for dimension in dimensions:
-            dimension_relevance = (dimension.relevance / dimensions_total_relevance)
-            results[category.name]['dimensions'][dimension.name] = {
-                'relevance': dimension_relevance,
-                # this part take care of showing the number of stars in the dashboard (removed the *100 cause I increase the metrics weight by 100)
-                'metrics': {},
-                'score': 0
-            }
-            results[category.name]['relevance'] += (dimension_relevance * 100)
-
-            metrics = DQMetric.objects.filter(dq_dimension=dimension)
-            for metric_index, metric in enumerate(metrics):
-                results[category.name]['dimensions'][dimension.name]['metrics'][metric.definition] = {
-                    'weight': int(metric.weight),
-                    'score': 0
-                }
-                metric_score = 0
-
-                dq_metric_value = DQMetricValue.objects.filter(dq_assessment=assessment, dq_metric=metric)
-
-                # If the metric is filled then we assign the value, else it is None
-                if len(dq_metric_value) >= 1:
-                    current_value = str(dq_metric_value.first().value)
-
-                    # For the categorical metrics we provide the possible values
-                    if getattr(metric, 'dqcategoricalmetric') is not None and current_value:
-                        current_value = int(current_value)
-                        metric_categories = DQCategoricalMetricCategory.objects.filter(
-                            dq_categorical_metric=metric
-                        ).count()
-
-                        metric_score = current_value / (metric_categories - 1)  # If 3 : 0, 1, 2 -> 0% 50% 100%
-                    metric_score = metric_score * metric.weight * results[category.name]['dimensions'][dimension.name][
-                        'relevance']
-                    results[category.name]['dimensions'][dimension.name]['metrics'][metric.definition][
-                        'score'] = metric_score
-                    results[category.name]['dimensions'][dimension.name]['score'] += metric_score
-                    results[category.name]['score'] += metric_score
-
-            total_score += results[category.name]['dimensions'][dimension.name]['score']
-
-    return results, total_score
+        for dataset_id, (assessment_id, score, answered) in dataset_assessments.items():
+            if assessment_id in refreshed:
+                dataset_assessments[dataset_id] = (assessment_id, *refreshed[assessment_id])
+
+    results = {}
+    for dataset_id, (assessment_id, score, answered) in dataset_assessments.items():
+        if assessment_id is None:
+            results[dataset_id] = {'score': 0.0, 'answered': 0}
+        else:
+            results[dataset_id] = {'score': score, 'answered': answered}
+
+    return results
 
 
 def compute_maturity_score(organization: Organization) -> tuple[dict, float]:
-    matrix_score = 0
+    catalogue = get_catalogue_snapshot()
+    maturity_engine = catalogue.maturity_engine
+
+    # Selected level of every dimension, only taken into account when the dimension has a single value
+    dimension_values = {}
+    for dimension_id, level_id in MaturityDimensionValue.objects.filter(
+        maturity_organization=organization
+    ).values_list('maturity_dimension_id', 'maturity_dimension_level_id'):
+        dimension_values.setdefault(dimension_id, []).append(level_id)
 
-    dimensions = MaturityDimension.objects.all()
     dimensions_dictionary = {}
+    selected_levels = []
 
-    for dimension in dimensions:
+    for dimension in catalogue.maturity_dimensions:
         dimensions_dictionary[dimension.name] = {
             'id': dimension.id,
             'definition': dimension.definition,
-            'options': [],
+            'options': [{'value': level.value, 'text': level.text} for level in dimension.levels],
             'value': None,
             'maximum_score': 5
         }
 
-        levels = MaturityDimensionLevel.objects.filter(maturity_dimension=dimension)
+        level_ids = dimension_values.get(dimension.id, [])
 
-        for level in levels:
-            dimensions_dictionary[dimension.name]['options'].append({
-                'value': level.value,
-                'text': level.text
-            })
+        if len(level_ids) == 1 and level_ids[0] is not None:
+            dimensions_dictionary[dimension.name]['value'] = maturity_engine.level_value(level_ids[0])
+            selected_levels.append(level_ids[0])
 
-        dimension_value = MaturityDimensionValue.objects.filter(
-            maturity_dimension=dimension,
-            maturity_organization=organization
-        )
-
-        if len(dimension_value) == 1:
-            dimensions_dictionary[dimension.name]['value'] = dimension_value.first().maturity_dimension_level.value
-            matrix_score += dimension_value.first().maturity_dimension_level.value
+    matrix_score = maturity_engine.score(selected_levels)
 
     return dimensions_dictionary, matrix_score
 
 
-def plot_maturity(organization: Organization) -> str:
-    elements = []
-    parents = []
-    values = []
-    hover_texts = []
-    colors = {}
+def compute_bulk_maturity_scores(organizations: QuerySet) -> tuple[list, np.ndarray, np.ndarray]:
+    """
+        Computes the maturity of many organizations at once, with one query for the organizations and one for
+        all their maturity values
 
-    maturity_dimensions, matrix_score = compute_maturity_score(organization=organization)
+        Params
+        ------
+        organizations: QuerySet
+            The organizations to score
 
-    # Predefined color palette for categories
-    category_colors = [
-        (0, 68, 148),  # Dark Blue
-        (255, 214, 23),  # Yellow
-        (64, 64, 64),  # Dark Grey
-        (242, 151, 39)  # Orange
-    ]
+        Returns
+        -------
+        The organization ids, the organizations x maturity dimensions matrix of selected level values (NaN if
+        not selected, columns in the order of the catalogue snapshot) and the maturity score of every organization
+    """
+    maturity_engine = get_catalogue_snapshot().maturity_engine
+
+    organization_ids = list(organizations.order_by('id').values_list('id', flat=True))
+    values = MaturityDimensionValue.objects.filter(maturity_organization_id__in=organization_ids).values_list(
+        'maturity_organization_id', 'maturity_dimension_id', 'maturity_dimension_level_id'
+    )
+
+    level_matrix = maturity_engine.level_matrix(organization_ids, values)
+
+    return organization_ids, level_matrix, maturity_engine.scores(level_matrix)
+
+
+def plot_maturity(organization: Organization, maturity: Optional[tuple] = None, output_type: str = 'html') -> str:
+    """
+        Params
+        ------
+        organization: Organization
+        maturity: tuple
+            The result of compute_maturity_score for the organization, computed if not given
+        output_type: str
+            - html -> for embedding div into website
+            - img -> for base64 encoded image
+            - svg -> for the SVG document, drawn without plotly
+    """
+    if maturity is None:
+        maturity = compute_maturity_score(organization=organization)
+
+    maturity_dimensions, matrix_score = maturity
 
     category_index = 0  # Track category color assignment
 
     # Root Element
-    elements.append('QUANTUM')
-    parents.append('')
-    values.append(50)
-    hover_texts.append(f'Maturity<br>Score: {matrix_score}')
-    colors['QUANTUM'] = 'rgb(255, 255, 255)'  # White
+    root = SunburstSector(
+        label='QUANTUM',
+        value=50,
+        color='rgb(255, 255, 255)',  # White
+        hover_text=f'Maturity<br>Score: {matrix_score}',
+        id='QUANTUM'
+    )
 
     for dimension in maturity_dimensions:
         current_dimension = maturity_dimensions[dimension]
@@ -304,76 +558,83 @@ def plot_maturity(organization: Organization) -> str:
             dimension_score = 0
         dimension_name = f'{dimension.replace(" ", "<br>")}<br>{dimension_score:.2f}/{current_dimension["maximum_score"]:.2f}'
 
-        elements.append(dimension_name)
-        parents.append('QUANTUM')
-        values.append(current_dimension["maximum_score"])
-        hover_texts.append(dimension_name)
-
         # Assign a color to the category
-        base_color = category_colors[category_index % len(category_colors)]
+        base_color = CATEGORY_COLORS[category_index % len(CATEGORY_COLORS)]
         category_index += 1  # Increment for the next category
 
         # Store solid RGB color (full opacity) for the category
         opacity = min(1.0, max(dimension_score / current_dimension['maximum_score'], 0.3))  # Ensuring opacity is between 0.3 and 1.0
         rgba_color = f'rgba({base_color[0]},{base_color[1]},{base_color[2]},{opacity:.2f})'
-        colors[dimension_name] = rgba_color  # Assign color with opacity
 
-    # Store color mapping explicitly in the dataset
-    data = dict(
-        elements=elements,
-        parents=parents,
-        values=values,
-        hover_texts=hover_texts
-    )
-
-    # Create sunburst plot
-    figure = px.sunburst(
-        data,
-        names='elements',
-        parents='parents',
-        values='values',
-        branchvalues='total',
-        color='elements',
-        color_discrete_map=colors,  # Uses the defined RGBA colors,
-        custom_data=['hover_texts']
-    )
-
-    figure.update_layout(
-        images=[dict(
-            source='https://pbs.twimg.com/profile_images/1757761164556021760/WK-zxj8K_400x400.jpg',
-            xref='paper', yref='paper',
-            x=0.5, y=0.55,
-            sizex=0.18, sizey=0.18,
-            xanchor='center', yanchor='middle',
-            layer='above'
-        )],
-    )
+        root.children.append(SunburstSector(
+            label=dimension_name,
+            value=current_dimension['maximum_score'],
+            color=rgba_color,  # Assign color with opacity
+            id=f'maturity-dimension-{current_dimension["id"]}'
+        ))
 
-    figure.add_annotation(
-        dict(
-            font=dict(color='black', size=15),
-            xref='paper', yref='paper',
-            x=0.5, y=0.43,
-            showarrow=False,
-            text=f'{matrix_score}/50',
-            textangle=0,
-            xanchor='center',
-        )
-    )
+    annotation = f'{matrix_score}/50'
 
-    figure.update_traces(hovertemplate='<b>%{customdata}<extra></extra></b>')
+    if output_type == 'svg':
+        return _sunburst_svg(root, annotation)
+    elif output_type == 'img':
+        img_bytes = pio.to_image(_sunburst_figure('maturity', root, annotation), format="png", validate=False)
+        encoded_img = base64.b64encode(img_bytes).decode('utf-8')
 
-    figure.update_layout(
-        margin=dict(t=0, l=0, r=0, b=0)
-    )
+        return f"data:image/png;base64,{encoded_img}"
 
     # Generate HTML div as a string
     html_div = pio.to_html(
-        figure,
+        _sunburst_figure('maturity', root, annotation),
         default_width='100%',
         include_plotlyjs='cdn',
         full_html=False,
-        config={'staticPlot': False}
+        config={'staticPlot': False},
+        validate=False
     )
 
     return html_div
+
+
+def cached_plot_maturity(organization: Organization, maturity: Optional[tuple] = None,
+                         output_type: str = 'html') -> str:
+    """
+        plot_maturity from the plots cache, shared by the worker processes. The entries of an organization are
+        removed when its maturity values change (invalidate_maturity_plot) and the key contains the catalogue
+        generation, so a change of the maturity dimensions or levels makes every entry outdated.
+
+        Params
+        ------
+        organization: Organization
+        maturity: tuple
+            The result of compute_maturity_score for the organization, computed if not needed and not given
+        output_type: str
+            html or img, as in plot_maturity
+
+        Returns
+        -------
+        The plot in the specified format
+    """
+    key = _maturity_plot_key(organization.id, current_catalogue_generation(), output_type)
+    plot = caches['plots'].get(key)
+
+    if plot is None:
+        plot = plot_maturity(organization, maturity=maturity, output_type=output_type)
+        caches['plots'].set(key, plot)
+
+    return plot
+
+
+def invalidate_maturity_plot(organization_id: int) -> None:
+    """
+        Removes the cached maturity plots of the organization
+    """
+    generation = current_catalogue_generation()
+
+    caches['plots'].delete_many([
+        _maturity_plot_key(organization_id, generation, output_type) for output_type in MATURITY_PLOT_OUTPUT_TYPES
+    ])
+
+
+def _maturity_plot_key(organization_id: int, generation: int, output_type: str) -> str:
+    return f'maturity_plot:{organization_id}:{generation}:{output_type}'
@@ -0,0 +1,202 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from code.label.catalogue import get_catalogue_snapshot
+from code.label.scoring import ScoringEngine
+from webapp.models import DQAssessment
+
+# Amount of assessments refreshed per query when the whole table is recomputed
+REFRESH_CHUNK_SIZE = 500
+
+_deferred_refresh = threading.local()
+
+
+def refresh_assessment_scores(assessment_ids: Iterable[int], engine: Optional[ScoringEngine] = None) -> None:
+    """
+        Recomputes and stores the materialized scores (DQAssessment.score, score_tree and answered_metrics)
+        of the given assessments. The assessment rows are locked while their values are read, so concurrent
+        updates of the same assessment are serialized.
+
+        Params
+        ------
+        assessment_ids: Iterable[int]
+            The DQAssessment ids to refresh
+        engine: ScoringEngine
+            Engine to use, by default the one of the catalogue snapshot
+    """
+    assessment_ids = sorted(set(assessment_ids))
+
+    if not assessment_ids:
+        return
+
+    if engine is None:
+        engine = get_catalogue_snapshot().engine
+
+    with transaction.atomic():
+        locked_ids = list(
+            DQAssessment.objects.select_for_update().filter(id__in=assessment_ids).order_by('id').values_list(
+                'id', flat=True
+            )
+        )
+
+        if not locked_ids:
+            return
+
+        store_assessment_scores(compute_assessment_scores(locked_ids, engine))
+
+
+def compute_assessment_scores(assessment_ids: list, engine: ScoringEngine) -> list:
+    """
+        Scores the given assessments without storing anything, with a single query
+
+        Params
+        ------
+        assessment_ids: list
+            The DQAssessment ids to score
+        engine: ScoringEngine
+
+        Returns
+        -------
+        (assessment id, score, score tree, answered metrics) of every assessment
+    """
+    return score_assessment_answers(assessment_ids, engine.assessments_answers(assessment_ids), engine)
+
+
+def score_assessment_answers(assessment_ids: list, answers: np.ndarray, engine: ScoringEngine) -> list:
+    """
+        Scores the answer matrix of the given assessments, as compute_assessment_scores
+    """
+    answered = engine.answered_counts(answers)
+
+    results = []
+    for index, assessment_id in enumerate(assessment_ids):
+        score_tree, score = engine.score(answers[index])
+        results.append((assessment_id, score, score_tree, int(answered[index])))
+
+    return results
+
+
+def store_assessment_scores(results: list) -> None:
+    """
+        Stores the scores returned by compute_assessment_scores with a bulk update
+    """
+    score_date = timezone.now()
+    assessments = [
+        DQAssessment(
+            id=assessment_id,
+            score=score,
+            score_tree=score_tree,
+            answered_metrics=answered_metrics,
+            score_date=score_date
+        )
+        for assessment_id, score, score_tree, answered_metrics in results
+    ]
+
+    DQAssessment.objects.bulk_update(assessments, ['score', 'score_tree', 'answered_metrics', 'score_date'])
+
+
+def store_scored_assessments(assessment_ids: list, answers: np.ndarray, results: list, engine: ScoringEngine) -> None:
+    """
+        Stores scores computed without locking the assessments, e.g. by another process. The assessments are
+        locked and their answers read again first, and the ones answered differently since they were scored
+        (saved concurrently) are scored again under the lock, so an older result never overwrites a newer one.
+
+        Params
+        ------
+        assessment_ids: list
+            The DQAssessment ids, in the order of the rows of answers and of results
+        answers: np.ndarray
+            The answer matrix the results were computed from
+        results: list
+            The scores returned by compute_assessment_scores or score_assessment_answers
+        engine: ScoringEngine
+            The engine the results were computed with
+    """
+    with transaction.atomic():
+        locked_ids = set(
+            DQAssessment.objects.select_for_update().filter(id__in=assessment_ids).order_by('id').values_list(
+                'id', flat=True
+            )
+        )
+
+        current_answers = engine.assessments_answers(assessment_ids)
+        changed = ~((current_answers == answers) | (np.isnan(current_answers) & np.isnan(answers))).all(axis=1)
+
+        if changed.any():
+            changed_ids = [assessment_id for assessment_id, is_changed in zip(assessment_ids, changed) if is_changed]
+            rescored = {
+                result[0]: result for result in score_assessment_answers(changed_ids, current_answers[changed], engine)
+            }
+            results = [rescored.get(result[0], result) for result in results]
+
+        # Deleted since they were scored
+        store_assessment_scores([result for result in results if result[0] in locked_ids])
+
+
+def refresh_all_assessment_scores() -> None:
+    """
+        Recomputes the materialized scores of every assessment, used when the catalogue changes. Every chunk
+        is locked and stored in its own transaction, so the table is never locked as a whole.
+    """
+    # Built from the database, the snapshot of this process may not have seen the catalogue change yet
+    engine = ScoringEngine.from_database()
+    assessment_ids = list(DQAssessment.objects.order_by('id').values_list('id', flat=True))
+
+    for start in range(0, len(assessment_ids), REFRESH_CHUNK_SIZE):
+        refresh_assessment_scores(assessment_ids[start:start + REFRESH_CHUNK_SIZE], engine=engine)
+
+
+def schedule_all_assessment_refresh() -> None:
+    """
+        Refreshes the materialized scores of every assessment once the current transaction is committed,
+        a single time however many catalogue objects are changed in it (e.g. an admin form and its inlines)
+    """
+    connection = transaction.get_connection()
+
+    # Already scheduled by a previous change of the transaction. The callbacks of rolled back savepoints
+    # are discarded, so a rolled back change does not prevent a later one from scheduling it.
+    if any(callback is refresh_all_assessment_scores for _, callback, *_ in connection.run_on_commit):
+        return
+
+    transaction.on_commit(refresh_all_assessment_scores)
+
+
+@contextmanager
+def deferred_score_refresh():
+    """
+        Collects the assessments changed inside the block and refreshes each of them once when the block
+        exits, instead of once per saved or deleted DQMetricValue. Must be used inside a transaction for
+        the refresh to be atomic with the changes.
+    """
+    if getattr(_deferred_refresh, 'pending', None) is not None:
+        # Nested blocks are refreshed by the outermost one
+        yield
+        return
+
+    _deferred_refresh.pending = set()
+
+    try:
+        yield
+        pending = _deferred_refresh.pending
+    finally:
+        _deferred_refresh.pending = None
+
+    refresh_assessment_scores(pending)
+
+
+def schedule_assessment_refresh(assessment_id: int) -> None:
+    """
+        Refreshes the materialized scores of an assessment, or postpones it until the end of the current
+        deferred_score_refresh block
+    """
+    pending = getattr(_deferred_refresh, 'pending', None)
+
+    if pending is not None:
+        pending.add(assessment_id)
+    else:
+        refresh_assessment_scores([assessment_id])
@@ -1,176 +1,423 @@
+import base64
 import os
 import pathlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime
-from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Callable, Optional
 
-from django.db.models import Sum
-from weasyprint import HTML
-from jinja2 import Environment, FileSystemLoader
+from django.conf import settings
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+import tinycss2
+from weasyprint import CSS, HTML, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
+from weasyprint.urls import path2url
 
 from code.helpers.django import generate_assessment_stars
-from code.label.label import plot_label, compute_scores
-from webapp.models import Dataset, Catalogue, DQAssessment, Organization, DQMetric, DQDimension, EHDSCategory, DQMetricValue, DQCategoricalMetricCategory
+from code.label.artifacts import PDF_TEMPLATES_PATH, content_key, pdf_artifact_key, pdf_template_version
+from code.label.label import plot_label
+from code.label.tree import build_assessment_tree
+from webapp.models import Dataset, Catalogue, DQAssessment, Organization
 
+# Templates with this comment have a small, bounded number of different outputs (e.g. only depending on the score),
+# their laid out pages are reused for every PDF filled with the same content (PDF_REUSABLE_PAGES_CACHE_SIZE). Pages
+# depending on the answers have too many outputs to be reused.
+REUSABLE_PAGE_MARKER = '{# pdf-page: reusable #}'
+# Parsed styles of the pages kept by each process, one per group of pages laid out together
+PAGE_STYLES_CACHE_SIZE = 8
+
+# PDF creators of this process, by rendering mode
+_pdf_creators = {}
+_pdf_creators_lock = threading.Lock()
 
-class PDFCreator:
-    TEMPLATES_PATH = os.path.dirname(os.path.abspath(__file__)) + '/templates'
 
-    def __init__(self):
-        self.html_files = self._get_html_files()
+class PDFCreator:
+    TEMPLATES_PATH = PDF_TEMPLATES_PATH
+
+    def __init__(self, single_pass: bool = True):
+        """
+            Params
+            ------
+            single_pass: bool
+                Render all the pages as a single document (default), or each page as its own document
+        """
+        self.html_files = sorted(self._get_html_files())
+        self.single_pass = single_pass
+        self.environment = self._create_environment()
+        # Compiled once, the environment only checks the files for changes in DEBUG
+        self.templates = [self.environment.get_template(html_file) for html_file in self.html_files]
+        self.reusable = [self._is_reusable(html_file) for html_file in self.html_files]
+        self.template_version = pdf_template_version()
+        # Fonts, stylesheets and template files loaded once for all the PDFs of this process, the fonts of the
+        # @font-face rules are registered in the font configuration when the stylesheets are parsed
+        self.font_config = FontConfiguration()
+        self.url_fetcher = CachingURLFetcher(PDFCreator.TEMPLATES_PATH)
+        # Linked stylesheets by path, with the modification time they were parsed at
+        self.stylesheets = {}
+        # Styles of the pages by the key of their text, least recently used first
+        self.page_styles = OrderedDict()
+        # Documents of the reusable pages by the key of their filled template, least recently used first
+        self.reusable_pages = OrderedDict()
+        # WeasyPrint and pango do not share a font configuration between threads
+        self.render_lock = threading.Lock()
 
     @staticmethod
     def _get_html_files():
         """Get all HTML files from the current directory."""
         return [file for file in os.listdir(PDFCreator.TEMPLATES_PATH) if file.endswith('.html')]
 
-    def generate_pdf(self, dataset: Dataset, catalogue: Catalogue, assessment: DQAssessment, organization: Organization) -> BytesIO:
-        """Generate a PDF with one page per HTML file."""
-        buffer = BytesIO()
-
-        if not self.html_files:
-            print("No HTML files found in the current directory.")
-            return buffer
-
-        pdf_pages = []
+    def _is_reusable(self, html_file: str) -> bool:
+        source, _, _ = self.environment.loader.get_source(self.environment, html_file)
 
-        _, score = compute_scores(dataset)
-        score = int(score)
+        return REUSABLE_PAGE_MARKER in source
 
-        results = self.__generate_results(dataset=dataset)
+    @staticmethod
+    def _create_environment() -> Environment:
+        """Environment with the compiled templates stored on disk, shared by the worker processes."""
+        os.makedirs(settings.PDF_TEMPLATE_CACHE_DIR, exist_ok=True)
+
+        return Environment(
+            loader=FileSystemLoader(PDFCreator.TEMPLATES_PATH),
+            bytecode_cache=FileSystemBytecodeCache(str(settings.PDF_TEMPLATE_CACHE_DIR)),
+            auto_reload=settings.DEBUG
+        )
+
+    def _get_templates(self) -> list:
+        if self.environment.auto_reload:
+            # Compiled again when edited
+            return [self.environment.get_template(html_file) for html_file in self.html_files]
+
+        return self.templates
+
+    def _get_stylesheet(self, href: str) -> CSS:
+        """Stylesheet linked by the templates, parsed again when the file changes."""
+        path = os.path.normpath(os.path.join(PDFCreator.TEMPLATES_PATH, href))
+        modified = os.path.getmtime(path)
+        cached = self.stylesheets.get(path)
+
+        if cached is None or cached[0] != modified:
+            stylesheet = CSS(url=path2url(path), url_fetcher=self.url_fetcher, font_config=self.font_config)
+            self.stylesheets[path] = cached = (modified, stylesheet)
+
+        return cached[1]
+
+    def _get_page_style(self, style: str) -> CSS:
+        """Style of the pages laid out together, parsed the first time it is used."""
+        key = content_key(style)
+        stylesheet = self.page_styles.get(key)
+
+        if stylesheet is None:
+            stylesheet = CSS(
+                string=style,
+                base_url=path2url(PDFCreator.TEMPLATES_PATH),
+                url_fetcher=self.url_fetcher,
+                font_config=self.font_config
+            )
+            self.page_styles[key] = stylesheet
+
+            if len(self.page_styles) > PAGE_STYLES_CACHE_SIZE:
+                self.page_styles.popitem(last=False)
+        else:
+            self.page_styles.move_to_end(key)
+
+        return stylesheet
+
+    def artifact_key(self, dataset: Dataset, catalogue: Catalogue, organization: Organization) -> str:
+        """Key of the PDF in the artifact store, see pdf_artifact_key."""
+        return pdf_artifact_key(dataset, catalogue, organization)
+
+    def _group_pages(self, filled_pages: list) -> list:
+        """(reusable, filled pages) in the order of the templates, every reusable page in a group of its own."""
+        groups = []
+
+        for filled_page, reusable in zip(filled_pages, self.reusable):
+            if reusable or not groups or groups[-1][0]:
+                groups.append((reusable, [filled_page]))
+            else:
+                groups[-1][1].append(filled_page)
+
+        return groups
+
+    def _render_document(self, filled_pages: list):
+        """Lays out the filled pages as one document, each page starting on a new sheet."""
+        document = compose_document(filled_pages)
+
+        # The linked stylesheets and the style of the pages keep their order, all given with the same origin
+        # (user) so their rules cascade as in the pages, the document itself has no stylesheet left
+        stylesheets = [self._get_stylesheet(href) for href in document.stylesheets]
+        stylesheets.append(self._get_page_style(document.style))
+
+        html = HTML(string=document.html, base_url=PDFCreator.TEMPLATES_PATH, url_fetcher=self.url_fetcher)
+
+        return html.render(font_config=self.font_config, stylesheets=stylesheets)
+
+    def _render_reusable_page(self, filled_page: str):
+        """Document of a reusable page, laid out the first time the page is filled with this content."""
+        if settings.PDF_REUSABLE_PAGES_CACHE_SIZE < 1:
+            return self._render_document([filled_page])
+
+        key = content_key(self.template_version, filled_page)
+        document = self.reusable_pages.get(key)
+
+        if document is None:
+            document = self._render_document([filled_page])
+            self.reusable_pages[key] = document
+
+            if len(self.reusable_pages) > settings.PDF_REUSABLE_PAGES_CACHE_SIZE:
+                self.reusable_pages.popitem(last=False)
+        else:
+            self.reusable_pages.move_to_end(key)
+
+        return document
+
+    def render_document(self, dataset: Dataset, catalogue: Catalogue, assessment: DQAssessment,
+                        organization: Organization, progress: Optional[Callable[[int, int], None]] = None):
+        """
+            Lays out the PDF with one page per HTML file, without writing it
+
+            Params
+            ------
+            dataset: Dataset
+                The dataset of the report
+            catalogue: Catalogue
+                The catalogue of the dataset
+            assessment: DQAssessment
+                The assessment of the dataset
+            organization: Organization
+                The organization shown in the report
+            progress: Callable
+                Called with the done and total steps, writing the PDF is the last step in single pass
+
+            Returns
+            -------
+            The WeasyPrint document with all the pages
+        """
+        # The category -> dimension -> metric tree with the scores, shared by the label and the tables
+        tree = build_assessment_tree(dataset)
+        score = int(tree.score)
+
+        # Vector label, drawn without kaleido
+        label = plot_label(dataset, output_type='svg', tree=tree)
 
         data = {
             'stars': generate_assessment_stars(score),
-            'label': plot_label(dataset, output_type='img'),
+            'label': f'data:image/svg+xml;base64,{base64.b64encode(label.encode("utf-8")).decode("utf-8")}',
             'score': score,
             'dataset': dataset,
             'catalogue': catalogue,
             'organization': organization,
             'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'version': '0.1',
-            'results': results
+            'results': tree.categories
         }
 
-        env = Environment(loader=FileSystemLoader(PDFCreator.TEMPLATES_PATH))
-        for html_file in sorted(self.html_files):
-            template = env.get_template(f'{html_file}')
-            filled_html = template.render(data)
+        filled_pages = []
+        # Filling every template then rendering the whole document, or rendering every page
+        total_steps = len(self.html_files) + 1 if self.single_pass else len(self.html_files)
+
+        for template in self._get_templates():
+            filled_pages.append(template.render(data))
+
+            if progress is not None and self.single_pass:
+                progress(len(filled_pages), total_steps)
+
+        if self.single_pass:
+            documents = []
+
+            with self.render_lock:
+                # Consecutive pages laid out as one document, the reusable pages on their own
+                for reusable, pages in self._group_pages(filled_pages):
+                    if reusable:
+                        documents.append(self._render_reusable_page(pages[0]))
+                    else:
+                        documents.append(self._render_document(pages))
+
+            return documents[0].copy([page for document in documents for page in document.pages])
 
+        # Fonts loaded once for all the pages
+        font_config = FontConfiguration()
+        pdf_pages = []
+
+        for filled_html in filled_pages:
             html = HTML(string=filled_html, base_url=PDFCreator.TEMPLATES_PATH)
 
             pdf_pages.append(
                 html.render(
-                    data=data
+                    font_config=font_config
                 )
             )
 
+            if progress is not None:
+                progress(len(pdf_pages), total_steps)
+
         # Combine all pages
         combined_pdf = pdf_pages[0]
         for pdf in pdf_pages[1:]:
             combined_pdf.pages.extend(pdf.pages)
 
-        combined_pdf.write_pdf(buffer)
+        return combined_pdf
+
+    def generate_pdf(self, dataset: Dataset, catalogue: Catalogue, assessment: DQAssessment, organization: Organization,
+                     progress: Optional[Callable[[int, int], None]] = None) -> BinaryIO:
+        """Generate a PDF with one page per HTML file, progress is called with the done and total steps."""
+        # In memory up to PDF_SPOOL_MAX_BYTES, on disk above, so large reports do not grow the worker memory
+        buffer = SpooledTemporaryFile(max_size=settings.PDF_SPOOL_MAX_BYTES)
+
+        if not self.html_files:
+            print("No HTML files found in the current directory.")
+            return buffer
+
+        document = self.render_document(dataset, catalogue, assessment, organization, progress=progress)
+
+        if self.single_pass:
+            # The reused pages share the font configuration of this creator
+            with self.render_lock:
+                document.write_pdf(buffer)
+
+            if progress is not None:
+                total_steps = len(self.html_files) + 1
+                progress(total_steps, total_steps)
+        else:
+            document.write_pdf(buffer)
 
         # Go to beginning of buffer
         buffer.seek(0)
 
         return buffer
 
-    def __generate_results(self, dataset: Dataset) -> list:
-        # Compute the assessment table
-        dimensions_total_relevance = DQDimension.objects.aggregate(Sum('relevance'))['relevance__sum']
-        results = []
-        assessment = dataset.dq_assessment
-        ehds_categories = EHDSCategory.objects.all()
-
-        for category_index, category in enumerate(ehds_categories, start=1):
-            results.append({
-                'category_index': category_index,  # Numeric index
-                'category_index_str': f"{category_index}.",  # String version
-                'name': category.name,
-                'dimensions': [],
-                'score': 0,
-                'score_str': "0.00",  # String version of score
-                'all_dimensions_ok': True,
-                'id': category.id
-            })
-
-            dimensions = DQDimension.objects.filter(ehds_category=category)
-            for dimension_index, dimension in enumerate(dimensions, start=1):
-                dimension_relevance = (dimension.relevance / dimensions_total_relevance) * 100
-                dimension_index_str = f"{category_index}.{dimension_index}."  # String version of index
-
-                results[-1]['dimensions'].append({
-                    'dimension_index': dimension_index,  # Numeric index
-                    'dimension_index_str': dimension_index_str,  # String version
-                    'name': dimension.name,
-                    'definition': dimension.definition,
-                    'relevance': dimension_relevance,
-                    'relevance_str': f"{dimension_relevance:.2f}%",  # String version of relevance
-                    'metrics': [],
-                    'score': 0,
-                    'score_str': "0.00",  # String version of score
-                    'all_metrics_ok': True,
-                    'id': dimension.id
-                })
-
-                metrics = DQMetric.objects.filter(dq_dimension=dimension)
-                for metric_index, metric in enumerate(metrics, start=1):
-                    metric_label = f"Metric #{metric_index}"
-                    metric_value = DQMetricValue.objects.filter(dq_assessment=assessment, dq_metric=metric).first()
-                    answer_text = "Not answered"
-
-                    if metric_value:
-                        # Fetch the corresponding text for the categorical value
-                        answer_text = metric_value.value
-                        if metric_value.value.isdigit():
-                            category_match = DQCategoricalMetricCategory.objects.filter(
-                                dq_categorical_metric=metric, value=int(metric_value.value)
-                            ).first()
-                            if category_match:
-                                answer_text = category_match.text
-
-                    results[-1]['dimensions'][-1]['metrics'].append({
-                        'definition': metric.definition,
-                        'weight': int(metric.weight),
-                        'weight_str': f"{int(metric.weight)}%",  # String version of weight
-                        'score': 0,
-                        'score_str': "0.00",  # String version of score
-                        'metric_label': metric_label,
-                        'answer': answer_text,
-                        'is_metric_ok': False
-                    })
-
-                    dq_metric_value = DQMetricValue.objects.filter(dq_assessment=assessment, dq_metric=metric)
-                    current_value = None
-                    metric_score = 0
-
-                    if dq_metric_value.exists():
-                        current_value = str(dq_metric_value.first().value)
-
-                    if getattr(metric, 'dqcategoricalmetric') is not None and current_value:
-                        current_value = int(current_value)
-                        metric_categories = DQCategoricalMetricCategory.objects.filter(
-                            dq_categorical_metric=metric
-                        ).count()
-
-                        # Calculate metric score
-                        metric_score = current_value / (metric_categories - 1)
-                        metric_score = metric_score * (metric.weight / 100) * dimension_relevance
-
-                        # Store both numeric and string score
-                        results[-1]['dimensions'][-1]['metrics'][-1]['score'] = metric_score
-                        results[-1]['dimensions'][-1]['metrics'][-1]['score_str'] = f"{metric_score:.2f}"
-                        results[-1]['dimensions'][-1]['score'] += metric_score
-
-                    results[-1]['dimensions'][-1]['metrics'][-1]['is_metric_ok'] = metric_score > 0
-                    results[-1]['dimensions'][-1]['all_metrics_ok'] = results[-1]['dimensions'][-1]['all_metrics_ok'] and results[-1]['dimensions'][-1]['metrics'][-1]['is_metric_ok']
-
-                # Store the formatted score for the dimension
-                results[-1]['dimensions'][-1]['score_str'] = f"{results[-1]['dimensions'][-1]['score']:.2f}"
-
-                results[-1]['all_dimensions_ok'] = results[-1]['all_dimensions_ok'] and results[-1]['dimensions'][-1]['all_metrics_ok']
-
-            # Store the formatted score for the category
-            results[-1]['score_str'] = f"{results[-1]['score']:.2f}"
-
-        return results
+
+def get_pdf_creator(single_pass: bool = True) -> PDFCreator:
+    """
+        Returns the PDF creator of this process, so the templates are listed and compiled once. Safe to share
+        between threads, the templates only read the data they are rendered with.
+    """
+    creator = _pdf_creators.get(single_pass)
+
+    if creator is not None:
+        return creator
+
+    with _pdf_creators_lock:
+        if single_pass not in _pdf_creators:
+            _pdf_creators[single_pass] = PDFCreator(single_pass=single_pass)
+
+        return _pdf_creators[single_pass]
+
+
+class CachingURLFetcher:
+    """
+        URL fetcher of WeasyPrint keeping the files of the templates directory (images, fonts) in memory, the other
+        URLs (the label as a data URL) are fetched every time
+    """
+    def __init__(self, directory: str):
+        self.prefix = path2url(directory)
+        self.resources = {}
+
+    def __call__(self, url: str, *args, **kwargs) -> dict:
+        if not url.startswith(self.prefix):
+            return default_url_fetcher(url, *args, **kwargs)
+
+        resource = self.resources.get(url)
+
+        if resource is None:
+            resource = default_url_fetcher(url, *args, **kwargs)
+
+            if 'file_obj' in resource:
+                with resource.pop('file_obj') as file:
+                    resource['string'] = file.read()
+
+            self.resources[url] = resource
+
+        # WeasyPrint fills in the result
+        return dict(resource)
+
+
+@dataclass
+class ComposedDocument:
+    # Pages of the document without the stylesheets
+    html: str
+    # URLs of the stylesheets linked by the pages, relative to the templates directory, in document order
+    stylesheets: list
+    # Style of the pages, each rule restricted to its page, applied after the linked stylesheets
+    style: str
+
+
+_LINK = re.compile(r'<link\b[^>]*>', re.IGNORECASE)
+_HREF = re.compile(r'\bhref\s*=\s*["\']([^"\']*)["\']', re.IGNORECASE)
+_STYLE = re.compile(r'<style\b[^>]*>(.*?)</style>', re.IGNORECASE | re.DOTALL)
+_BODY = re.compile(r'<body\b[^>]*>(.*?)</body>', re.IGNORECASE | re.DOTALL)
+_ROOT_SELECTOR = re.compile(r'^(html|body)\b', re.IGNORECASE)
+
+
+def compose_document(pages: list) -> ComposedDocument:
+    """
+        Joins the filled page templates into one HTML document, each page starting on a new sheet. The stylesheets
+        linked by the pages are kept once and the style elements of every page only apply to the page.
+    """
+    stylesheets = []
+    styles = []
+    sections = []
+
+    for index, page in enumerate(pages, start=1):
+        scope = f'pdf-page-{index}'
+
+        for link in _LINK.findall(page):
+            href = _HREF.search(link)
+
+            if href is not None and href.group(1) not in stylesheets:
+                stylesheets.append(href.group(1))
+
+        styles.extend(_scoped_css(css, scope) for css in _STYLE.findall(page))
+
+        body = _BODY.search(page)
+        content = _STYLE.sub('', body.group(1) if body is not None else page)
+        sections.append(f'<section class="pdf-page {scope}">{content}</section>')
+
+    html = f'<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="UTF-8">\n</head>\n' \
+           f'<body>\n{"".join(sections)}\n</body>\n</html>'
+    style = '\n'.join(['.pdf-page + .pdf-page { break-before: page; }'] + styles)
+
+    return ComposedDocument(html=html, stylesheets=stylesheets, style=style)
+
+
+def _scoped_css(css: str, scope: str) -> str:
+    """
+        Restricts the rules of a page style to the section of the page. The scope is added with :where(), which has
+        no specificity, so the rules win and lose against the linked stylesheets as in the page alone.
+    """
+    rules = []
+
+    for rule in tinycss2.parse_stylesheet(css, skip_comments=True, skip_whitespace=True):
+        if rule.type == 'qualified-rule':
+            selectors = ', '.join(_scoped_selector(selector, scope) for selector in _split_selectors(rule.prelude))
+            rules.append(f'{selectors} {{{tinycss2.serialize(rule.content)}}}')
+        elif rule.type == 'at-rule' and rule.lower_at_keyword == 'media' and rule.content is not None:
+            content = _scoped_css(tinycss2.serialize(rule.content), scope)
+            rules.append(f'@media {tinycss2.serialize(rule.prelude).strip()} {{{content}}}')
+        elif rule.type != 'error':
+            # @page, @font-face and the others are not bound to elements
+            rules.append(rule.serialize())
+
+    return '\n'.join(rules)
+
+
+def _split_selectors(prelude: list) -> list:
+    selectors = [[]]
+
+    for token in prelude:
+        if token.type == 'literal' and token.value == ',':
+            selectors.append([])
+        else:
+            selectors[-1].append(token)
+
+    return [tinycss2.serialize(tokens).strip() for tokens in selectors]
+
+
+def _scoped_selector(selector: str, scope: str) -> str:
+    # The html and body of the page are its section
+    if _ROOT_SELECTOR.match(selector):
+        return _ROOT_SELECTOR.sub(f':where(.{scope})', selector, count=1)
+
+    return f':where(.{scope}) {selector}'
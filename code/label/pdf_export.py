@@ -0,0 +1,238 @@
+import logging
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+from typing import Callable, Iterator, Optional
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.db import connections
+from django.utils import timezone
+from django.utils.text import slugify
+
+from code.label.pdf_jobs import dataset_pdf, dataset_pdf_filename
+from webapp.models import Catalogue, Dataset, Organization, PDFExportJob
+
+logger = logging.getLogger(__name__)
+
+
+class _ZipStream:
+    """
+        Write-only file receiving the ZIP, emptied after every PDF so only one PDF is held at a time. Having no
+        tell(), zipfile writes the sizes after the content instead of seeking back.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+
+        return data
+
+
+def _init_worker() -> None:
+    # Processes started with "spawn" do not inherit the configured Django
+    if not apps.ready:
+        django.setup()
+
+    # Connections inherited with "fork" can not be shared with the parent, each worker opens its own
+    connections.close_all()
+
+
+def _render_pdf(dataset_id: int) -> tuple:
+    dataset = Dataset.objects.select_related('catalogue', 'organization').filter(id=dataset_id).first()
+
+    # Deleted since the export started
+    if dataset is None:
+        return dataset_id, '', None, None, 'The dataset does not exist'
+
+    try:
+        with dataset_pdf(dataset, dataset.organization) as pdf_file:
+            return dataset.id, dataset.name, dataset_pdf_filename(dataset), pdf_file.read(), None
+    except Exception as error:
+        logger.exception('PDF of dataset %s failed', dataset.id)
+
+        return dataset.id, dataset.name, None, None, str(error)
+
+
+def _render_pdfs(dataset_ids: list, workers: int) -> Iterator[tuple]:
+    """
+        (dataset id, dataset name, file name, PDF, error) of every dataset in the order they are rendered, with at
+        most two PDFs per worker rendered and not yet consumed. The file name and PDF are None when it failed.
+    """
+    if workers == 1:
+        for dataset_id in dataset_ids:
+            yield _render_pdf(dataset_id)
+
+        return
+
+    # The forked workers must not inherit the connection of this process
+    connections.close_all()
+
+    remaining_ids = iter(dataset_ids)
+    executor = ProcessPoolExecutor(workers, initializer=_init_worker)
+
+    try:
+        pending = {executor.submit(_render_pdf, dataset_id) for dataset_id in islice(remaining_ids, workers * 2)}
+
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in finished:
+                for dataset_id in islice(remaining_ids, 1):
+                    pending.add(executor.submit(_render_pdf, dataset_id))
+
+                yield future.result()
+    finally:
+        # Stopped early when the download is interrupted
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pdf_zip(dataset_ids: list, workers: int = 1,
+                 progress: Optional[Callable[[int, int], None]] = None) -> Iterator[bytes]:
+    """
+        Renders the PDF report of every dataset in worker processes and yields the ZIP with them, one PDF after the
+        other as they finish. The memory used does not depend on the amount of datasets. The PDFs that fail are
+        listed in errors.txt.
+
+        Params
+        ------
+        dataset_ids: list
+            The datasets, each report shows the organization of its dataset
+        workers: int
+            Rendering processes, 1 renders in this process
+        progress: Callable
+            Called with the done and total datasets
+
+        Returns
+        -------
+        The chunks of the ZIP file
+    """
+    stream = _ZipStream()
+    errors = []
+    done = 0
+
+    # The PDFs are already compressed
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for dataset_id, name, filename, pdf, error in _render_pdfs(dataset_ids, workers):
+            if pdf is None:
+                errors.append(f'{dataset_id} {name}: {error}')
+            else:
+                archive.writestr(filename, pdf)
+
+            done += 1
+            if progress is not None:
+                progress(done, len(dataset_ids))
+
+            yield stream.drain()
+
+        if errors:
+            archive.writestr('errors.txt', '\n'.join(errors) + '\n')
+
+    yield stream.drain()
+
+
+def export_dataset_ids(organization: Organization, catalogue: Optional[Catalogue] = None) -> list:
+    """
+        Assessed datasets of the organization, or of one of its catalogues, exported in the ZIP
+    """
+    datasets = Dataset.objects.filter(organization=organization, dq_assessment__isnull=False)
+    if catalogue is not None:
+        datasets = datasets.filter(catalogue=catalogue)
+
+    return list(datasets.order_by('id').values_list('id', flat=True))
+
+
+def enqueue_pdf_export_job(organization: Organization, catalogue: Optional[Catalogue], user: User) -> PDFExportJob:
+    """
+        Queues the ZIP export of the PDF reports of the organization, unless the user already waits for the same one
+
+        Params
+        ------
+        organization: Organization
+        catalogue: Catalogue
+            Only the datasets of this catalogue, None for all the datasets of the organization
+        user: User
+            The user requesting the export
+
+        Returns
+        -------
+        The queued or running job
+    """
+    pending_job = PDFExportJob.objects.filter(
+        organization=organization,
+        catalogue=catalogue,
+        requested_by=user,
+        status__in=['Q', 'R']
+    ).order_by('-created').first()
+
+    if pending_job is not None:
+        return pending_job
+
+    return PDFExportJob.objects.create(organization=organization, catalogue=catalogue, requested_by=user)
+
+
+def pdf_export_filename(job: PDFExportJob) -> str:
+    """
+        Name of the ZIP of the export when downloaded
+    """
+    return f'{slugify(job.organization.name) or "organization"}-pdf.zip'
+
+
+def run_pdf_export_job(job: PDFExportJob) -> None:
+    """
+        Renders the PDFs of a claimed export in PDF_EXPORT_WORKERS processes and stores their ZIP in the default
+        storage, the job ends done or failed
+    """
+    def report_progress(done: int, total: int) -> None:
+        PDFExportJob.objects.filter(id=job.id).update(progress=int(done * 100 / total))
+
+    try:
+        dataset_ids = export_dataset_ids(job.organization, job.catalogue)
+
+        # In memory up to PDF_SPOOL_MAX_BYTES, on disk above
+        with SpooledTemporaryFile(max_size=settings.PDF_SPOOL_MAX_BYTES) as zip_file:
+            for chunk in iter_pdf_zip(dataset_ids, workers=settings.PDF_EXPORT_WORKERS, progress=report_progress):
+                zip_file.write(chunk)
+
+            zip_file.seek(0)
+            job.file.save(f'{job.id}.zip', File(zip_file), save=False)
+
+        job.status = 'D'
+        job.progress = 100
+    except Exception as error:
+        logger.exception('PDF export job %s failed', job.id)
+
+        job.status = 'F'
+        job.error = str(error)
+
+    job.finished = timezone.now()
+    job.save(update_fields=['status', 'progress', 'error', 'file', 'finished'])
+
+
+def pdf_export_job_status(job: PDFExportJob) -> dict:
+    """
+        Status of the export as returned by the export endpoints, with the URL of the ZIP once built
+    """
+    return {
+        'id': job.id,
+        'status': job.get_status_display().lower(),
+        'progress': job.progress,
+        'error': job.error,
+        'status_url': f'/organization/pdf/export/status?id={job.id}',
+        'download_url': f'/organization/pdf/export/download?id={job.id}' if job.status == 'D' else None
+    }
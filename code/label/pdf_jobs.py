@@ -0,0 +1,293 @@
+import logging
+from datetime import timedelta
+from typing import BinaryIO, Callable, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.db.models import F, QuerySet
+from django.utils import timezone
+from django.utils.text import slugify
+
+from code.label.artifacts import artifact_store, pdf_artifact_key
+from webapp.models import Dataset, DQAssessment, Organization, PDFExportJob, PDFJob
+
+logger = logging.getLogger(__name__)
+
+# Queued jobs looked at by a worker to claim one, others may be claimed by other workers meanwhile
+CLAIM_CANDIDATES = 10
+
+
+def enqueue_pdf_job(dataset: Dataset, organization: Organization, user: User) -> PDFJob:
+    """
+        Queues the rendering of the PDF report of the dataset, unless the user already waits for one. The job is
+        done at once when the artifact store has the PDF.
+
+        Params
+        ------
+        dataset: Dataset
+        organization: Organization
+            The organization shown in the report
+        user: User
+            The user requesting the report
+
+        Returns
+        -------
+        The queued, running or done job
+    """
+    pending_job = PDFJob.objects.filter(
+        dataset=dataset,
+        requested_by=user,
+        status__in=['Q', 'R']
+    ).order_by('-created').first()
+
+    if pending_job is not None:
+        return pending_job
+
+    # Without the PDF creator, the web workers never load WeasyPrint nor compile the templates
+    key = pdf_artifact_key(dataset, dataset.catalogue, organization)
+    stored_pdf = artifact_store.open('pdf', key)
+
+    if stored_pdf is None:
+        return PDFJob.objects.create(dataset=dataset, organization=organization, requested_by=user)
+
+    stored_pdf.close()
+
+    # Already rendered from the same answers, catalogue and templates, the job is done without the worker and
+    # the PDF is downloaded from the artifact store
+    now = timezone.now()
+
+    return PDFJob.objects.create(
+        dataset=dataset,
+        organization=organization,
+        requested_by=user,
+        status='D',
+        progress=100,
+        artifact_key=key,
+        started=now,
+        finished=now
+    )
+
+
+def claim_next_pdf_job() -> Optional[PDFJob]:
+    """
+        Marks the oldest queued job as running for this worker. The status is changed with a conditional update,
+        so two workers never claim the same job, on every database.
+
+        Returns
+        -------
+        The claimed job or None if no job is queued
+    """
+    return _claim_next_job(PDFJob.objects.select_related('dataset', 'organization'))
+
+
+def claim_next_pdf_export_job() -> Optional[PDFExportJob]:
+    """
+        Marks the oldest queued ZIP export as running for this worker, as claim_next_pdf_job
+
+        Returns
+        -------
+        The claimed job or None if no export is queued
+    """
+    return _claim_next_job(PDFExportJob.objects.select_related('organization', 'catalogue'))
+
+
+def _claim_next_job(jobs: QuerySet):
+    candidate_ids = jobs.filter(status='Q').order_by('created', 'id').values_list('id', flat=True)
+
+    for job_id in candidate_ids[:CLAIM_CANDIDATES]:
+        claimed = jobs.filter(id=job_id, status='Q').update(
+            status='R',
+            progress=0,
+            attempts=F('attempts') + 1,
+            started=timezone.now()
+        )
+
+        if claimed:
+            return jobs.get(id=job_id)
+
+    return None
+
+
+def dataset_pdf(dataset: Dataset, organization: Organization,
+                progress: Optional[Callable[[int, int], None]] = None) -> BinaryIO:
+    """
+        PDF report of the dataset, read from the artifact store or rendered and stored
+
+        Params
+        ------
+        dataset: Dataset
+        organization: Organization
+            The organization shown in the report
+        progress: Callable
+            Called with the done and total steps while rendering
+
+        Returns
+        -------
+        The PDF file, to be closed by the caller
+    """
+    return _stored_dataset_pdf(dataset, organization, progress)[1]
+
+
+def _stored_dataset_pdf(dataset: Dataset, organization: Organization,
+                        progress: Optional[Callable[[int, int], None]] = None) -> tuple:
+    """(key in the artifact store, PDF file) of the report of the dataset, rendered and stored if missing"""
+    key = pdf_artifact_key(dataset, dataset.catalogue, organization)
+    pdf_file = artifact_store.open('pdf', key)
+
+    if pdf_file is None:
+        # Imported by the processes rendering PDFs only, the web workers never load WeasyPrint
+        from code.label.pdf_creator import get_pdf_creator
+
+        assessment = DQAssessment.objects.filter(dataset=dataset).first()
+
+        pdf_file = get_pdf_creator().generate_pdf(
+            dataset=dataset,
+            catalogue=dataset.catalogue,
+            assessment=assessment,
+            organization=organization,
+            progress=progress
+        )
+
+        artifact_store.put('pdf', key, pdf_file)
+        pdf_file.seek(0)
+
+    return key, pdf_file
+
+
+def dataset_pdf_filename(dataset: Dataset) -> str:
+    """
+        Name of the PDF report of the dataset when downloaded
+    """
+    return f'{slugify(dataset.name) or "dataset"}-{dataset.id}.pdf'
+
+
+def run_pdf_job(job: PDFJob) -> None:
+    """
+        Renders the PDF of a claimed job into the artifact store, unless the store has it, the job ends done or
+        failed. The PDF is only copied to the default storage when the artifact store can not keep it.
+    """
+    def report_progress(done_steps: int, total_steps: int) -> None:
+        PDFJob.objects.filter(id=job.id).update(progress=int(done_steps * 100 / total_steps))
+
+    try:
+        key, pdf_file = _stored_dataset_pdf(job.dataset, job.organization, progress=report_progress)
+
+        with pdf_file:
+            stored_pdf = artifact_store.open('pdf', key)
+
+            if stored_pdf is None:
+                # Larger than the artifact store, kept with the job
+                job.file.save(f'{job.id}.pdf', File(pdf_file), save=False)
+            else:
+                stored_pdf.close()
+                job.artifact_key = key
+
+        job.status = 'D'
+        job.progress = 100
+    except Exception as error:
+        logger.exception('PDF job %s failed', job.id)
+
+        job.status = 'F'
+        job.error = str(error)
+
+    job.finished = timezone.now()
+    job.save(update_fields=['status', 'progress', 'error', 'file', 'artifact_key', 'finished'])
+
+
+def open_pdf_job_file(job: PDFJob) -> Optional[BinaryIO]:
+    """
+        PDF of a done job, from the artifact store or the file of the job
+
+        Returns
+        -------
+        The PDF file to be closed by the caller, None when the artifact store evicted it
+    """
+    if job.artifact_key:
+        return artifact_store.open('pdf', job.artifact_key)
+
+    return job.file.open('rb')
+
+
+def requeue_evicted_pdf_job(job: PDFJob) -> None:
+    """
+        Queues again a done job whose PDF the artifact store evicted, the worker renders it again
+    """
+    PDFJob.objects.filter(id=job.id, status='D').update(
+        status='Q',
+        progress=0,
+        attempts=0,
+        artifact_key=None,
+        started=None,
+        finished=None
+    )
+
+
+def requeue_stale_pdf_jobs() -> int:
+    """
+        Queues again the jobs and ZIP exports running for longer than PDF_JOB_STALE_SECONDS and
+        PDF_EXPORT_JOB_STALE_SECONDS, their worker has stopped. They fail after PDF_JOB_MAX_ATTEMPTS.
+
+        Returns
+        -------
+        The amount of stale jobs
+    """
+    stale = 0
+
+    for model, stale_seconds in [
+        (PDFJob, settings.PDF_JOB_STALE_SECONDS),
+        (PDFExportJob, settings.PDF_EXPORT_JOB_STALE_SECONDS)
+    ]:
+        stale_jobs = model.objects.filter(
+            status='R',
+            started__lt=timezone.now() - timedelta(seconds=stale_seconds)
+        )
+
+        stale += stale_jobs.filter(attempts__gte=settings.PDF_JOB_MAX_ATTEMPTS).update(
+            status='F',
+            error='The worker rendering the PDF stopped',
+            finished=timezone.now()
+        )
+        stale += stale_jobs.update(status='Q', progress=0)
+
+    return stale
+
+
+def purge_expired_pdf_jobs() -> int:
+    """
+        Deletes the jobs and ZIP exports finished more than PDF_JOB_RETENTION_DAYS ago and their file
+
+        Returns
+        -------
+        The amount of deleted jobs
+    """
+    deleted = 0
+
+    for model in [PDFJob, PDFExportJob]:
+        expired_jobs = model.objects.filter(
+            status__in=['D', 'F'],
+            finished__lt=timezone.now() - timedelta(days=settings.PDF_JOB_RETENTION_DAYS)
+        )
+
+        for job in expired_jobs:
+            if job.file:
+                job.file.delete(save=False)
+
+        deleted += expired_jobs.delete()[0]
+
+    return deleted
+
+
+def pdf_job_status(job: PDFJob) -> dict:
+    """
+        Status of the job as returned by the PDF endpoints, with the URL of the PDF once rendered
+    """
+    return {
+        'id': job.id,
+        'dataset_id': job.dataset_id,
+        'status': job.get_status_display().lower(),
+        'progress': job.progress,
+        'error': job.error,
+        'status_url': f'/dataset/assessment/pdf/status?id={job.id}',
+        'download_url': f'/dataset/assessment/pdf/download?id={job.id}' if job.status == 'D' else None
+    }
@@ -0,0 +1,460 @@
+from typing import Iterable, Optional
+
+import numpy as np
+from django.db.models import Count
+
+from webapp.models import EHDSCategory, DQDimension, DQMetric, DQMetricValue, DQAssessment
+
+# Scores are rounded so that the single, bulk and incremental paths agree
+# independently of the floating point summation order of each of them
+SCORE_DECIMALS = 9
+
+
+def parse_answer(value: Optional[str]) -> float:
+    """
+        Converts a stored DQMetricValue.value into its numeric answer
+
+        Params
+        ------
+        value: str
+            The raw value of the DQMetricValue row
+
+        Returns
+        -------
+        The selected categorical level, or 0 if the value is empty or not numeric
+    """
+    if value is None:
+        return 0.0
+
+    value = str(value).strip()
+
+    if value.isdigit():
+        return float(value)
+
+    return 0.0
+
+
+class ScoringEngine:
+    """
+        Loads the DQ metric catalogue (EHDSCategory -> DQDimension.relevance -> DQMetric.weight ->
+        DQCategoricalMetricCategory counts) once into NumPy arrays, so an assessment is scored as a
+        weighted dot product of its answer vector instead of walking the catalogue with queries.
+
+        An answer vector has one column per metric (in catalogue order) holding the selected level
+        of the metric or NaN when the metric has not been answered.
+    """
+
+    # NumPy arrays of the engine, the ones that can live in shared memory
+    ARRAY_FIELDS = (
+        'metric_ids', 'dimension_category', 'metric_dimension', 'metric_category', 'dimension_relevance',
+        'category_relevance', 'weights', 'category_counts', 'coefficients'
+    )
+
+    def __init__(self, categories: list, dimensions: list, metrics: list, arrays: Optional[dict] = None):
+        """
+            Params
+            ------
+            categories: list
+                Dictionaries with the "id" and "name" of each EHDSCategory
+            dimensions: list
+                Dictionaries with the "id", "name", "relevance" and "ehds_category_id" of each DQDimension
+            metrics: list
+                Dictionaries with the "id", "definition", "weight", "dq_dimension_id", "is_categorical" and
+                "category_count" of each DQMetric
+            arrays: dict
+                Already computed ARRAY_FIELDS of the same catalogue (e.g. mapped from shared memory), they are
+                used as they are instead of being computed again
+        """
+        self.categories = categories
+        self.dimensions = dimensions
+        self.metrics = metrics
+
+        self.dimension_positions = {dimension['id']: index for index, dimension in enumerate(dimensions)}
+        self.metric_positions = {metric['id']: index for index, metric in enumerate(metrics)}
+
+        if arrays is not None:
+            for field in self.ARRAY_FIELDS:
+                setattr(self, field, arrays[field])
+        else:
+            self._compute_arrays()
+
+    def _compute_arrays(self) -> None:
+        categories = self.categories
+        dimensions = self.dimensions
+        metrics = self.metrics
+
+        category_positions = {category['id']: index for index, category in enumerate(categories)}
+
+        self.metric_ids = np.array([metric['id'] for metric in metrics], dtype=np.int64)
+
+        self.dimension_category = np.array(
+            [category_positions[dimension['ehds_category_id']] for dimension in dimensions],
+            dtype=np.int64
+        )
+        self.metric_dimension = np.array(
+            [self.dimension_positions[metric['dq_dimension_id']] for metric in metrics],
+            dtype=np.int64
+        )
+        self.metric_category = self.dimension_category[self.metric_dimension]
+
+        # Dimension relevance is normalised by the relevance of all the dimensions (Sum ignores NULLs)
+        relevances = np.array([dimension['relevance'] or 0 for dimension in dimensions], dtype=np.float64)
+        total_relevance = relevances.sum()
+        self.dimension_relevance = relevances / total_relevance if total_relevance else np.zeros_like(relevances)
+        self.category_relevance = np.bincount(
+            self.dimension_category,
+            weights=self.dimension_relevance * 100,
+            minlength=len(categories)
+        )
+
+        self.weights = np.array([metric['weight'] for metric in metrics], dtype=np.float64)
+        self.category_counts = np.array([metric['category_count'] for metric in metrics], dtype=np.int64)
+
+        # A categorical level "v" of "n" levels scores v / (n - 1) of the metric weight (0, 1, 2 -> 0% 50% 100%)
+        is_scorable = np.array([metric['is_categorical'] for metric in metrics], dtype=bool) & (self.category_counts > 1)
+        levels = np.where(is_scorable, self.category_counts - 1, 1)
+        self.coefficients = np.where(
+            is_scorable,
+            self.weights * self.dimension_relevance[self.metric_dimension] / levels,
+            0.0
+        )
+
+    def arrays(self) -> dict:
+        """
+            The ARRAY_FIELDS of the engine by name
+        """
+        return {field: getattr(self, field) for field in self.ARRAY_FIELDS}
+
+    @classmethod
+    def from_database(cls) -> 'ScoringEngine':
+        """
+            Builds the engine from the current catalogue with a fixed number of queries
+        """
+        categories = list(EHDSCategory.objects.order_by('id').values('id', 'name'))
+        dimensions = list(
+            DQDimension.objects.order_by('id').values('id', 'name', 'relevance', 'ehds_category_id')
+        )
+
+        dimension_order = {dimension['id']: index for index, dimension in enumerate(dimensions)}
+        category_order = {category['id']: index for index, category in enumerate(categories)}
+
+        metrics = list(
+            DQMetric.objects.order_by('id').annotate(
+                category_count=Count('dqcategoricalmetric__dqcategoricalmetriccategory')
+            ).values(
+                'id', 'definition', 'weight', 'dq_dimension_id', 'dqcategoricalmetric', 'category_count'
+            )
+        )
+
+        for metric in metrics:
+            metric['is_categorical'] = metric.pop('dqcategoricalmetric') is not None
+
+        # Metrics are grouped by category and dimension, keeping the catalogue order inside each group
+        metrics.sort(key=lambda metric: (
+            category_order[dimensions[dimension_order[metric['dq_dimension_id']]]['ehds_category_id']],
+            dimension_order[metric['dq_dimension_id']]
+        ))
+
+        return cls(categories=categories, dimensions=dimensions, metrics=metrics)
+
+    @property
+    def size(self) -> int:
+        return len(self.metrics)
+
+    def answer_vector(self, values: Iterable[tuple]) -> np.ndarray:
+        """
+            Builds the answer vector of an assessment
+
+            Params
+            ------
+            values: Iterable[tuple]
+                (dq_metric_id, value) pairs ordered by DQMetricValue id. Only the first value of a
+                metric is used, as the views do.
+
+            Returns
+            -------
+            The answer vector, NaN for the metrics without value
+        """
+        answers = np.full(self.size, np.nan)
+
+        for metric_id, value in values:
+            position = self.metric_positions.get(metric_id)
+
+            if position is not None and np.isnan(answers[position]):
+                answers[position] = parse_answer(value)
+
+        return answers
+
+    def assessment_answers(self, assessment: Optional[DQAssessment]) -> np.ndarray:
+        """
+            Loads the answer vector of an assessment with a single query
+        """
+        if assessment is None:
+            return np.full(self.size, np.nan)
+
+        values = DQMetricValue.objects.filter(dq_assessment=assessment).order_by('id').values_list(
+            'dq_metric_id', 'value'
+        )
+
+        return self.answer_vector(values)
+
+    def answer_matrix(self, assessment_ids: list, values: Iterable[tuple]) -> np.ndarray:
+        """
+            Pivots the DQMetricValue rows of many assessments into an assessments x metrics matrix
+
+            Params
+            ------
+            assessment_ids: list
+                The DQAssessment ids, one row of the matrix per id and in the same order
+            values: Iterable[tuple]
+                (dq_assessment_id, dq_metric_id, value) rows ordered by DQMetricValue id
+
+            Returns
+            -------
+            The answer matrix, NaN for the metrics without value
+        """
+        answers = np.full((len(assessment_ids), self.size), np.nan)
+        values = list(values)
+
+        if not values or not assessment_ids:
+            return answers
+
+        row_positions = {assessment_id: index for index, assessment_id in enumerate(assessment_ids)}
+
+        rows = []
+        columns = []
+        parsed_values = []
+
+        # Reversed so the first value of a metric is the one remaining after the assignment
+        for assessment_id, metric_id, value in reversed(values):
+            row = row_positions.get(assessment_id)
+            column = self.metric_positions.get(metric_id)
+
+            if row is None or column is None:
+                continue
+
+            rows.append(row)
+            columns.append(column)
+            parsed_values.append(parse_answer(value))
+
+        answers[rows, columns] = parsed_values
+
+        return answers
+
+    def assessments_answers(self, assessment_ids: list) -> np.ndarray:
+        """
+            Loads the answer matrix of many assessments with a single query
+        """
+        values = DQMetricValue.objects.filter(dq_assessment_id__in=assessment_ids).order_by('id').values_list(
+            'dq_assessment_id', 'dq_metric_id', 'value'
+        )
+
+        return self.answer_matrix(assessment_ids, values)
+
+    @staticmethod
+    def answered_counts(answers: np.ndarray) -> np.ndarray:
+        """
+            Amount of answered metrics of an answer vector or of every row of an answer matrix
+        """
+        return np.count_nonzero(~np.isnan(answers), axis=-1)
+
+    def metric_scores(self, answers: np.ndarray) -> np.ndarray:
+        """
+            Weighted score of every metric. Works on a single answer vector or on a matrix of them.
+        """
+        return np.nan_to_num(answers, nan=0.0) * self.coefficients
+
+    def total_scores(self, answers: np.ndarray) -> np.ndarray:
+        """
+            Total score as the dot product of the answers and the metric coefficients. Works on a single
+            answer vector or on a matrix of them (one row per assessment).
+        """
+        return np.round(np.nan_to_num(answers, nan=0.0) @ self.coefficients, SCORE_DECIMALS)
+
+    def dimension_scores(self, answers: np.ndarray) -> np.ndarray:
+        """
+            Score of every dimension for a single answer vector
+        """
+        return np.round(
+            np.bincount(self.metric_dimension, weights=self.metric_scores(answers), minlength=len(self.dimensions)),
+            SCORE_DECIMALS
+        )
+
+    def category_scores(self, answers: np.ndarray) -> np.ndarray:
+        """
+            Score of every category for a single answer vector
+        """
+        return np.round(
+            np.bincount(self.metric_category, weights=self.metric_scores(answers), minlength=len(self.categories)),
+            SCORE_DECIMALS
+        )
+
+    def dimension_score_matrix(self, answers: np.ndarray) -> np.ndarray:
+        """
+            Score of every dimension for every row of an answer matrix (rows x dimensions)
+        """
+        membership = np.zeros((self.size, len(self.dimensions)))
+        membership[np.arange(self.size), self.metric_dimension] = 1.0
+
+        return np.round(self.metric_scores(answers) @ membership, SCORE_DECIMALS)
+
+    def score(self, answers: np.ndarray) -> tuple[dict, float]:
+        """
+            Scores a single answer vector
+
+            Returns
+            -------
+            The score tree (category -> dimension -> metric) and the total score, with the same layout
+            returned by code.label.label.compute_scores
+        """
+        metric_scores = np.round(self.metric_scores(answers), SCORE_DECIMALS)
+        dimension_scores = self.dimension_scores(answers)
+        category_scores = self.category_scores(answers)
+        total_score = float(self.total_scores(answers))
+
+        results = {}
+
+        for category_index, category in enumerate(self.categories):
+            results[category['name']] = {
+                'relevance': float(self.category_relevance[category_index]),
+                'dimensions': {},
+                'score': float(category_scores[category_index])
+            }
+
+        for dimension_index, dimension in enumerate(self.dimensions):
+            category = self.categories[self.dimension_category[dimension_index]]
+
+            results[category['name']]['dimensions'][dimension['name']] = {
+                'relevance': float(self.dimension_relevance[dimension_index]),
+                'metrics': {},
+                'score': float(dimension_scores[dimension_index])
+            }
+
+        for metric_index, metric in enumerate(self.metrics):
+            dimension_index = self.metric_dimension[metric_index]
+            dimension = self.dimensions[dimension_index]
+            category = self.categories[self.dimension_category[dimension_index]]
+
+            results[category['name']]['dimensions'][dimension['name']]['metrics'][metric['definition']] = {
+                'weight': int(metric['weight']),
+                'score': float(metric_scores[metric_index])
+            }
+
+        return results, total_score
+
+
+class MaturityEngine:
+    """
+        Loads the maturity catalogue (MaturityDimension -> MaturityDimensionLevel values) into NumPy arrays.
+        The maturity score of an organization is the sum of the values of its selected levels.
+    """
+
+    # NumPy arrays of the engine, the ones that can live in shared memory
+    ARRAY_FIELDS = ('dimension_ids', 'level_ids', 'level_values', 'level_dimension')
+
+    def __init__(self, dimensions: list, levels: list, arrays: Optional[dict] = None):
+        """
+            Params
+            ------
+            dimensions: list
+                Dictionaries with the "id" and "name" of each MaturityDimension
+            levels: list
+                Dictionaries with the "id", "value" and "maturity_dimension_id" of each MaturityDimensionLevel
+            arrays: dict
+                Already computed ARRAY_FIELDS of the same catalogue, used as they are
+        """
+        self.dimensions = dimensions
+        self.levels = levels
+
+        self.dimension_positions = {dimension['id']: index for index, dimension in enumerate(dimensions)}
+        self.level_positions = {level['id']: index for index, level in enumerate(levels)}
+
+        if arrays is not None:
+            for field in self.ARRAY_FIELDS:
+                setattr(self, field, arrays[field])
+        else:
+            self.dimension_ids = np.array([dimension['id'] for dimension in dimensions], dtype=np.int64)
+            self.level_ids = np.array([level['id'] for level in levels], dtype=np.int64)
+            self.level_values = np.array([level['value'] for level in levels], dtype=np.int64)
+            self.level_dimension = np.array(
+                [self.dimension_positions[level['maturity_dimension_id']] for level in levels],
+                dtype=np.int64
+            )
+
+    def arrays(self) -> dict:
+        """
+            The ARRAY_FIELDS of the engine by name
+        """
+        return {field: getattr(self, field) for field in self.ARRAY_FIELDS}
+
+    def level_value(self, level_id: int) -> int:
+        return int(self.level_values[self.level_positions[level_id]])
+
+    def score(self, level_ids: Iterable[int]) -> int:
+        """
+            Maturity score of the selected levels of an organization, one level per dimension
+        """
+        positions = [self.level_positions[level_id] for level_id in level_ids if level_id in self.level_positions]
+
+        return int(self.level_values[positions].sum())
+
+    def level_matrix(self, organization_ids: list, values: Iterable[tuple]) -> np.ndarray:
+        """
+            Pivots the MaturityDimensionValue rows of many organizations into an organizations x dimensions
+            matrix of selected level values
+
+            Params
+            ------
+            organization_ids: list
+                The Organization ids, one row of the matrix per id and in the same order
+            values: Iterable[tuple]
+                (maturity_organization_id, maturity_dimension_id, maturity_dimension_level_id) rows
+
+            Returns
+            -------
+            The level matrix, NaN for the dimensions without level or with more than one value, which are
+            not scored
+        """
+        row_positions = {organization_id: index for index, organization_id in enumerate(organization_ids)}
+        shape = (len(organization_ids), len(self.dimensions))
+
+        rows = []
+        columns = []
+        levels = []
+
+        for organization_id, dimension_id, level_id in values:
+            row = row_positions.get(organization_id)
+            column = self.dimension_positions.get(dimension_id)
+
+            if row is None or column is None:
+                continue
+
+            rows.append(row)
+            columns.append(column)
+            levels.append(self.level_positions.get(level_id, -1))
+
+        rows = np.array(rows, dtype=np.int64)
+        columns = np.array(columns, dtype=np.int64)
+
+        value_counts = np.zeros(shape, dtype=np.int64)
+        np.add.at(value_counts, (rows, columns), 1)
+
+        level_positions = np.array(levels, dtype=np.int64)
+        level_values = np.where(
+            level_positions >= 0,
+            self.level_values[np.clip(level_positions, 0, None)] if len(self.level_values) else np.nan,
+            np.nan
+        )
+
+        matrix = np.full(shape, np.nan)
+        matrix[rows, columns] = level_values
+        matrix[value_counts != 1] = np.nan
+
+        return matrix
+
+    @staticmethod
+    def scores(level_matrix: np.ndarray) -> np.ndarray:
+        """
+            Maturity score of every row of a level matrix
+        """
+        return np.nansum(level_matrix, axis=1).astype(np.int64)
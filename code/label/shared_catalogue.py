@@ -0,0 +1,202 @@
+import json
+import logging
+import threading
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Segment layout: ready flag (8 bytes), header length (8 bytes), JSON header, aligned array data
+_FLAG_SIZE = 8
+_LENGTH_SIZE = 8
+_ALIGNMENT = 64
+
+# Segments mapped by this process, by name. They are closed once no array points to them anymore.
+_segments = {}
+_segments_lock = threading.Lock()
+
+
+def segment_name(generation: int, modified: Optional[datetime]) -> str:
+    """
+        Name of the segment of a catalogue version. The generation alone is not enough, the same one is reused
+        with other arrays after a rollback, but never with the same modification time.
+    """
+    stamp = int(modified.timestamp() * 1_000_000) if modified is not None else 0
+
+    return f'{settings.SHARED_CATALOGUE_NAME}_{generation}_{stamp}'
+
+
+def attach_catalogue_arrays(generation: int, modified: Optional[datetime]) -> Optional[dict]:
+    """
+        Maps the catalogue arrays of a version published by another process, without computing them
+
+        Params
+        ------
+        generation: int
+            The catalogue generation the arrays belong to
+        modified: datetime
+            The last time the generation was increased, None if unknown
+
+        Returns
+        -------
+        Read-only views of the shared arrays, or None if no process has published them yet, they are still being
+        written or shared memory is not available, in which case the arrays are computed and published
+    """
+    name = segment_name(generation, modified)
+
+    with _segments_lock:
+        try:
+            segment = _attach_segment(name)
+        except (FileExistsError, OSError) as error:
+            logger.info('Catalogue arrays of generation %s are not attached: %s', generation, error)
+            return None
+
+        if segment is None:
+            return None
+
+        return _register_segment(name, segment)
+
+
+def share_catalogue_arrays(generation: int, modified: Optional[datetime], arrays: dict) -> Optional[dict]:
+    """
+        Publishes the catalogue arrays of a version computed by this process, so the other processes of the same
+        version map them instead of computing them. Every process ends up reading the same physical pages.
+
+        Params
+        ------
+        generation: int
+            The catalogue generation the arrays belong to
+        modified: datetime
+            The last time the generation was increased, None if unknown
+        arrays: dict
+            The arrays computed by this process, copied to the segment
+
+        Returns
+        -------
+        Read-only views of the shared arrays with the same keys, or None if another process is publishing them at
+        the same time or shared memory is not available, in which case the local arrays should be used
+    """
+    name = segment_name(generation, modified)
+
+    with _segments_lock:
+        try:
+            segment = _publish_segment(name, arrays)
+        except FileExistsError:
+            # Published meanwhile by another process
+            return None
+        except OSError as error:
+            logger.warning('Catalogue arrays of generation %s are not shared: %s', generation, error)
+            return None
+
+        return _register_segment(name, segment)
+
+
+def _register_segment(name: str, segment: shared_memory.SharedMemory) -> Optional[dict]:
+    segment_version, views = _segment_arrays(segment)
+
+    if segment_version != name:
+        logger.warning('Catalogue arrays are not shared: segment %s holds the arrays of %s', name, segment_version)
+        del views
+        segment.close()
+        return None
+
+    _segments[name] = segment
+    _release_stale_segments(name)
+
+    return views
+
+
+def _attach_segment(name: str) -> Optional[shared_memory.SharedMemory]:
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return None
+
+    # Still being written by the process that created it
+    if not segment.buf[0]:
+        segment.close()
+        raise FileExistsError(f'shared memory segment {name} is not ready')
+
+    return segment
+
+
+def _publish_segment(name: str, arrays: dict) -> shared_memory.SharedMemory:
+    layout = {}
+    offset = 0
+
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        layout[key] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += _aligned(array.nbytes)
+
+    header = json.dumps({'version': name, 'arrays': layout}).encode()
+    data_start = _aligned(_FLAG_SIZE + _LENGTH_SIZE + len(header))
+
+    segment = shared_memory.SharedMemory(name=name, create=True, size=data_start + offset)
+    buffer = segment.buf
+    buffer[_FLAG_SIZE:_FLAG_SIZE + _LENGTH_SIZE] = len(header).to_bytes(_LENGTH_SIZE, 'little')
+    buffer[_FLAG_SIZE + _LENGTH_SIZE:_FLAG_SIZE + _LENGTH_SIZE + len(header)] = header
+
+    for key, array in arrays.items():
+        start = data_start + layout[key]['offset']
+        target = np.ndarray(array.shape, dtype=array.dtype, buffer=buffer, offset=start)
+        target[...] = array
+        del target
+
+    # The flag is the last thing written, attaching processes ignore the segment until then
+    buffer[0] = 1
+
+    return segment
+
+
+def _segment_arrays(segment: shared_memory.SharedMemory) -> tuple[str, dict]:
+    buffer = segment.buf
+    header_length = int.from_bytes(buffer[_FLAG_SIZE:_FLAG_SIZE + _LENGTH_SIZE], 'little')
+    header = json.loads(bytes(buffer[_FLAG_SIZE + _LENGTH_SIZE:_FLAG_SIZE + _LENGTH_SIZE + header_length]))
+    data_start = _aligned(_FLAG_SIZE + _LENGTH_SIZE + header_length)
+
+    views = {}
+    for key, spec in header['arrays'].items():
+        view = np.ndarray(
+            tuple(spec['shape']),
+            dtype=np.dtype(spec['dtype']),
+            buffer=buffer,
+            offset=data_start + spec['offset']
+        )
+        view.flags.writeable = False
+        views[key] = view
+
+    return header['version'], views
+
+
+def _release_stale_segments(current_name: str) -> None:
+    """
+        Closes the segments of previous generations mapped by this process. The names are unlinked so that
+        the memory is freed once every process has moved on, and a segment still referenced by an array in use
+        (e.g. by a request of another thread) is kept until the next generation change.
+    """
+    for name in list(_segments):
+        if name == current_name:
+            continue
+
+        segment = _segments[name]
+
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+        try:
+            segment.close()
+        except BufferError:
+            continue
+
+        del _segments[name]
+
+
+def _aligned(size: int) -> int:
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
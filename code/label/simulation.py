@@ -0,0 +1,195 @@
+from typing import Optional
+
+import numpy as np
+
+from code.helpers.django import compute_amounts_of_stars
+from code.label.scoring import ScoringEngine, SCORE_DECIMALS
+
+# Upper bound of the scenarios scored in a single request
+MAX_SCENARIOS = 10000
+
+
+class SimulationError(ValueError):
+    pass
+
+
+def scenario_answer_matrix(
+        engine: ScoringEngine,
+        current_answers: np.ndarray,
+        scenarios: list,
+        metric_ids: Optional[list] = None
+) -> np.ndarray:
+    """
+        Builds the answer matrix of the scenarios, one row per scenario
+
+        Params
+        ------
+        engine: ScoringEngine
+        current_answers: np.ndarray
+            Answer vector of the saved assessment, the base of every scenario
+        scenarios: list
+            Dictionaries metric id -> integer level. The given metrics replace the saved answers, a None level
+            removes the answer of the metric.
+            If metric_ids is given, lists of integer levels or None with one column per metric id instead,
+            which are checked and scored as a whole instead of level by level.
+        metric_ids: list
+            The metrics changed by the scenarios given as lists
+
+        Returns
+        -------
+        The scenarios x metrics answer matrix
+    """
+    if not isinstance(scenarios, list) or not scenarios:
+        raise SimulationError('"scenarios" must be a non-empty list')
+
+    if len(scenarios) > MAX_SCENARIOS:
+        raise SimulationError(f'At most {MAX_SCENARIOS} scenarios can be simulated at once')
+
+    if metric_ids is not None:
+        return _level_matrix_answers(engine, current_answers, scenarios, metric_ids)
+
+    # Plain lists, indexing NumPy arrays one element at a time is slower
+    category_counts = engine.category_counts.tolist()
+    rows = []
+    columns = []
+    levels = []
+
+    for row, scenario in enumerate(scenarios):
+        if not isinstance(scenario, dict):
+            raise SimulationError(f'Scenario {row} must be an object of metric id -> level')
+
+        for metric_id, level in scenario.items():
+            column = _metric_position(engine, metric_id, row)
+
+            rows.append(row)
+            columns.append(column)
+            levels.append(_parse_level(level, category_counts[column], metric_id, row))
+
+    answers = np.tile(current_answers, (len(scenarios), 1))
+    answers[rows, columns] = levels
+
+    return answers
+
+
+def simulate_scenarios(
+        engine: ScoringEngine,
+        current_answers: np.ndarray,
+        scenarios: list,
+        metric_ids: Optional[list] = None
+) -> dict:
+    """
+        Scores many hypothetical answer sets of an assessment at once, without saving anything
+
+        Params
+        ------
+        engine: ScoringEngine
+        current_answers: np.ndarray
+            Answer vector of the saved assessment
+        scenarios: list
+            Dictionaries metric id -> level, or lists of levels if metric_ids is given, see
+            scenario_answer_matrix
+        metric_ids: list
+            The metrics changed by the scenarios given as lists
+
+        Returns
+        -------
+        The current score, stars and dimension scores, and for every scenario its score, stars and the
+        difference of each dimension score with the current one (in the order of "dimensions")
+    """
+    answers = scenario_answer_matrix(engine, current_answers, scenarios, metric_ids)
+
+    current_score = float(engine.total_scores(current_answers))
+    current_dimension_scores = engine.dimension_scores(current_answers)
+
+    scores = engine.total_scores(answers)
+    stars = compute_amounts_of_stars(scores)
+    dimension_deltas = np.round(
+        engine.dimension_score_matrix(answers) - current_dimension_scores,
+        SCORE_DECIMALS
+    )
+
+    return {
+        'dimensions': [
+            {'id': dimension['id'], 'name': dimension['name'], 'score': float(score)}
+            for dimension, score in zip(engine.dimensions, current_dimension_scores)
+        ],
+        'current': {
+            'score': current_score,
+            'stars': int(compute_amounts_of_stars(current_score))
+        },
+        'scenarios': [
+            {'score': score, 'stars': star_count, 'dimension_deltas': deltas}
+            for score, star_count, deltas in zip(scores.tolist(), stars.tolist(), dimension_deltas.tolist())
+        ]
+    }
+
+
+def _level_matrix_answers(
+        engine: ScoringEngine,
+        current_answers: np.ndarray,
+        scenarios: list,
+        metric_ids: list
+) -> np.ndarray:
+    if not isinstance(metric_ids, list) or not metric_ids:
+        raise SimulationError('"metrics" must be a non-empty list')
+
+    columns = [_metric_position(engine, metric_id, 0) for metric_id in metric_ids]
+
+    if len(set(columns)) != len(columns):
+        raise SimulationError('"metrics" can not contain the same metric twice')
+
+    for row, scenario_levels in enumerate(scenarios):
+        if not isinstance(scenario_levels, list) or len(scenario_levels) != len(columns):
+            raise SimulationError(f'Every scenario must have {len(columns)} levels, one per metric')
+
+        # The same rule as _parse_level, NumPy would silently convert booleans, floats and numeric strings
+        if not all(_is_level(level) for level in scenario_levels):
+            raise SimulationError(f'Scenario {row}: the level of a metric must be an integer or null')
+
+    # None becomes NaN, the unanswered level
+    levels = np.array(scenarios, dtype=np.float64)
+
+    category_counts = engine.category_counts[columns]
+    answered = ~np.isnan(levels)
+    invalid = answered & ((levels < 0) | ((category_counts > 0) & (levels >= category_counts)))
+
+    if invalid.any():
+        row, column = np.argwhere(invalid)[0]
+        raise SimulationError(
+            f'Scenario {row}: level {levels[row, column]:g} out of range for metric {metric_ids[column]}'
+        )
+
+    answers = np.tile(current_answers, (len(scenarios), 1))
+    answers[:, columns] = levels
+
+    return answers
+
+
+def _metric_position(engine: ScoringEngine, metric_id, row: int) -> int:
+    try:
+        position = engine.metric_positions.get(int(metric_id))
+    except (TypeError, ValueError):
+        position = None
+
+    if position is None:
+        raise SimulationError(f'Scenario {row}: unknown metric "{metric_id}"')
+
+    return position
+
+
+def _parse_level(level, category_count: int, metric_id, row: int) -> float:
+    if level is None:
+        return np.nan
+
+    if not _is_level(level):
+        raise SimulationError(f'Scenario {row}: the level of a metric must be an integer or null')
+
+    if level < 0 or (category_count and level >= category_count):
+        raise SimulationError(f'Scenario {row}: level {level} out of range for metric {metric_id}')
+
+    return float(level)
+
+
+def _is_level(level) -> bool:
+    """A level of a scenario is an integer (not a boolean) or None, in both scenario formats"""
+    return level is None or type(level) is int
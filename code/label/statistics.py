@@ -0,0 +1,160 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from code.helpers.django import compute_amounts_of_stars
+from code.label.catalogue import get_catalogue_snapshot
+from code.label.scoring import ScoringEngine
+from webapp.models import Dataset, Organization
+
+PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# Width of the bins of the DQ&U score histogram
+DQ_SCORE_BIN_WIDTH = 10
+
+# Amount of metrics listed as the weakest of an organization
+WEAKEST_METRIC_COUNT = 5
+
+
+def organization_quality_statistics(organization: Organization) -> dict:
+    """
+        DQ&U statistics of all the datasets of an organization. The metric values of every dataset are read
+        with a single query and pivoted into a datasets x metrics answer matrix, so every aggregate is computed
+        on whole arrays.
+
+        Params
+        ------
+        organization: Organization
+
+        Returns
+        -------
+        The amount of datasets, the distribution of their scores and stars, the share of unanswered metrics,
+        the mean, median and percentiles of every dimension score and the weakest metrics
+    """
+    catalogue = get_catalogue_snapshot()
+    engine = catalogue.engine
+
+    # Datasets without assessment or values are kept by the outer joins, with null values
+    rows = Dataset.objects.filter(organization=organization).order_by(
+        'id', 'dq_assessment__dqmetricvalue__id'
+    ).values_list(
+        'id', 'dq_assessment_id', 'dq_assessment__dqmetricvalue__id', 'dq_assessment__dqmetricvalue__dq_metric_id',
+        'dq_assessment__dqmetricvalue__value'
+    )
+    frame = pd.DataFrame.from_records(
+        list(rows),
+        columns=['dataset_id', 'assessment_id', 'value_id', 'metric_id', 'value']
+    )
+
+    dataset_ids = pd.Index(frame['dataset_id'].unique())
+    answers = _organization_answers(engine, frame, dataset_ids)
+    answered = ~np.isnan(answers)
+
+    scores = engine.total_scores(answers)
+    stars = compute_amounts_of_stars(scores)
+    dimension_scores = pd.DataFrame(engine.dimension_score_matrix(answers))
+
+    # Share of the maximum level reached by every metric, unanswered metrics reach nothing
+    levels = np.where(engine.category_counts > 1, engine.category_counts - 1, 1)
+    level_shares = pd.DataFrame(np.nan_to_num(answers, nan=0.0) / levels)
+    answered_shares = answered.mean(axis=0) if len(dataset_ids) else np.zeros(engine.size)
+
+    dimension_maximums = np.bincount(
+        engine.metric_dimension,
+        weights=engine.coefficients * levels,
+        minlength=len(engine.dimensions)
+    )
+    dimension_quantiles = dimension_scores.quantile(list(PERCENTILES))
+    dimension_means = dimension_scores.mean()
+
+    dimensions = []
+    for position, dimension in enumerate(engine.dimensions):
+        dimensions.append({
+            'id': dimension['id'],
+            'name': dimension['name'],
+            'maximum': optional_float(dimension_maximums[position]),
+            'mean': optional_float(dimension_means[position]),
+            'median': optional_float(dimension_quantiles[position][0.5]),
+            'percentiles': percentiles(dimension_quantiles[position])
+        })
+
+    catalogue_metrics = {metric.id: metric for metric in catalogue.metrics}
+    mean_level_shares = level_shares.mean().to_numpy() if len(dataset_ids) else np.zeros(engine.size)
+    # Weakest first, the less answered first between equals
+    weakest_positions = np.lexsort((answered_shares, mean_level_shares))[:WEAKEST_METRIC_COUNT]
+
+    weakest_metrics = []
+    for position in weakest_positions:
+        metric = catalogue_metrics[int(engine.metric_ids[position])]
+
+        weakest_metrics.append({
+            'id': metric.id,
+            'name': metric.name,
+            'definition': metric.definition,
+            'dimension': engine.dimensions[engine.metric_dimension[position]]['name'],
+            'answered_share': optional_float(answered_shares[position]),
+            'level_share': optional_float(mean_level_shares[position])
+        })
+
+    bins = np.arange(0, 100 + DQ_SCORE_BIN_WIDTH, DQ_SCORE_BIN_WIDTH)
+    histogram, edges = np.histogram(scores, bins=bins)
+    score_series = pd.Series(scores)
+
+    return {
+        'organization': organization.name,
+        'datasets': len(dataset_ids),
+        'assessed_datasets': int(frame.drop_duplicates('dataset_id')['assessment_id'].notna().sum()),
+        'unanswered_share': optional_float(1 - answered.mean()) if answered.size else None,
+        'score': {
+            'mean': optional_float(score_series.mean()),
+            'median': optional_float(score_series.median()),
+            'percentiles': percentiles(score_series.quantile(list(PERCENTILES))),
+            'histogram': [
+                {'from': int(start), 'to': int(end), 'count': int(count)}
+                for start, end, count in zip(edges[:-1], edges[1:], histogram)
+            ],
+            'stars': [
+                {'stars': star_count, 'count': int(count)}
+                for star_count, count in enumerate(np.bincount(stars, minlength=6))
+            ]
+        },
+        'dimensions': dimensions,
+        'weakest_metrics': weakest_metrics
+    }
+
+
+def _organization_answers(engine: ScoringEngine, frame: pd.DataFrame, dataset_ids: pd.Index) -> np.ndarray:
+    """
+        Pivots the metric value rows into the datasets x metrics answer matrix, with the same parsing as
+        ScoringEngine.answer_matrix
+    """
+    answers = np.full((len(dataset_ids), engine.size), np.nan)
+
+    values = frame[frame['value_id'].notna()]
+    # Only the first value of a metric is used, the rows are ordered by value id
+    values = values.drop_duplicates(['dataset_id', 'metric_id'])
+    values = values[values['metric_id'].isin(engine.metric_positions.keys())]
+
+    if values.empty:
+        return answers
+
+    levels = values['value'].astype('string').str.strip()
+    parsed = pd.to_numeric(levels.where(levels.str.isdigit().fillna(False)), errors='coerce').fillna(0.0)
+
+    rows = dataset_ids.get_indexer(values['dataset_id'])
+    columns = pd.Index(engine.metric_ids).get_indexer(values['metric_id'])
+    answers[rows, columns] = parsed.to_numpy(dtype=np.float64)
+
+    return answers
+
+
+def percentiles(quantiles: pd.Series) -> list:
+    return [
+        {'percentile': int(round(percentile * 100)), 'value': optional_float(quantiles[percentile])}
+        for percentile in PERCENTILES
+    ]
+
+
+def optional_float(value) -> Optional[float]:
+    return None if pd.isna(value) else round(float(value), 2)
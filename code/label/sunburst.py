@@ -0,0 +1,257 @@
+import math
+import re
+from dataclasses import dataclass, field
+from html import escape
+from typing import Optional
+
+# Size of the images rendered by kaleido from the plotly figures
+WIDTH = 700
+HEIGHT = 500
+
+FONT_FAMILY = '"Open Sans", verdana, arial, sans-serif'
+# Text color of the sectors, dark on light colors and white on dark ones, as plotly does
+DARK_TEXT = '#444'
+LIGHT_TEXT = '#fff'
+MAX_FONT_SIZE = 12
+MIN_FONT_SIZE = 6
+# Width and height of a character and of a line of text, relative to the font size
+CHARACTER_WIDTH = 0.6
+LINE_HEIGHT = 1.2
+SECTOR_PADDING = 4
+# Logo drawn over the root by the plotly layout: center height and size relative to the image (contained in a
+# box of that fraction of the width and height), and height of the annotation under it
+LOGO_Y = 0.55
+LOGO_SIZE = 0.18
+LOGO_ANNOTATION_Y = 0.43
+
+_COLOR = re.compile(r'rgba?\(\s*([\d.]+)\s*,\s*([\d.]+)\s*,\s*([\d.]+)\s*(?:,\s*([\d.]+)\s*)?\)')
+
+
+@dataclass
+class SunburstSector:
+    # Text of the sector, lines separated by <br> as in plotly
+    label: str
+    value: float
+    # rgb(...) or rgba(...) color
+    color: str
+    hover_text: Optional[str] = None
+    # Identifier of the sector in the figure, the same for every dataset, the label if not given
+    id: Optional[str] = None
+    children: list = field(default_factory=list)
+
+
+def render_sunburst_svg(root: SunburstSector, annotation: list, width: int = WIDTH, height: int = HEIGHT,
+                        logo: Optional[tuple] = None) -> str:
+    """
+        Renders a sunburst as an SVG document, with the layout of the plotly sunburst with branchvalues='total':
+        the root is the disc in the middle, every level is a ring of the same thickness, the children of a sector
+        share its angle in proportion to their value (leaving the rest empty when they do not reach the value of
+        the parent), largest first, counterclockwise from 3 o'clock.
+
+        Params
+        ------
+        root: SunburstSector
+            The sector in the middle, with the children of every ring
+        annotation: list
+            Lines of text under the label of the root, as (text, font size)
+        width: int
+        height: int
+        logo: tuple
+            (href, width, height) of the image drawn over the root instead of its label, with the annotation
+            under it, as the plotly layout does
+
+        Returns
+        -------
+        The SVG document
+    """
+    center_x = width / 2
+    center_y = height / 2
+    ring_width = min(width, height) / 2 / _depth(root)
+
+    elements = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="{escape(FONT_FAMILY)}">',
+        f'<rect width="{width}" height="{height}" fill="#fff"/>'
+    ]
+
+    fill, opacity = _svg_color(root.color)
+    elements.append(
+        f'<circle cx="{center_x:.2f}" cy="{center_y:.2f}" r="{ring_width:.2f}" fill="{fill}" fill-opacity="{opacity}" '
+        f'stroke="#fff">{_title(root)}</circle>'
+    )
+    _render_children(elements, root, center_x, center_y, ring_width, 1, 0.0, 2 * math.pi)
+
+    if logo is None:
+        # The label of the root above the annotation, both centered in the disc
+        lines = [(line, MAX_FONT_SIZE) for line in root.label.split('<br>')] + list(annotation)
+        lines_center = center_y
+    else:
+        elements.append(_logo_image(logo, width, height))
+        lines = list(annotation)
+        lines_center = height * (1 - LOGO_ANNOTATION_Y)
+
+    total_height = sum(size * LINE_HEIGHT for _, size in lines)
+    baseline = lines_center - total_height / 2
+
+    for text, size in lines:
+        baseline += size * LINE_HEIGHT
+        elements.append(
+            f'<text x="{center_x:.2f}" y="{baseline - size * 0.25:.2f}" font-size="{size}" text-anchor="middle" '
+            f'fill="{_text_color(root.color)}">{escape(str(text))}</text>'
+        )
+
+    elements.append('</svg>')
+
+    return '\n'.join(elements)
+
+
+def _logo_image(logo: tuple, width: int, height: int) -> str:
+    href, logo_width, logo_height = logo
+
+    # Scaled to fit in its box keeping the aspect ratio, as plotly images with sizing="contain"
+    scale = min(width * LOGO_SIZE / logo_width, height * LOGO_SIZE / logo_height)
+    drawn_width = logo_width * scale
+    drawn_height = logo_height * scale
+
+    return (
+        f'<image x="{(width - drawn_width) / 2:.2f}" y="{height * (1 - LOGO_Y) - drawn_height / 2:.2f}" '
+        f'width="{drawn_width:.2f}" height="{drawn_height:.2f}" href="{escape(href)}"/>'
+    )
+
+
+def _render_children(elements: list, parent: SunburstSector, center_x: float, center_y: float, ring_width: float,
+                     depth: int, start: float, span: float) -> None:
+    if not parent.children or parent.value <= 0:
+        return
+
+    inner_radius = ring_width * depth
+    outer_radius = inner_radius + ring_width
+    angle = start
+
+    for child in sorted(parent.children, key=lambda sector: sector.value, reverse=True):
+        child_span = span * child.value / parent.value
+
+        if child_span <= 0:
+            continue
+
+        fill, opacity = _svg_color(child.color)
+        elements.append(
+            f'<path d="{_annular_sector(center_x, center_y, inner_radius, outer_radius, angle, child_span)}" '
+            f'fill="{fill}" fill-opacity="{opacity}" stroke="#fff">{_title(child)}</path>'
+        )
+        elements.append(_sector_text(child, center_x, center_y, inner_radius, outer_radius, angle, child_span))
+
+        _render_children(elements, child, center_x, center_y, ring_width, depth + 1, angle, child_span)
+        angle += child_span
+
+
+def _annular_sector(center_x: float, center_y: float, inner_radius: float, outer_radius: float, start: float,
+                    span: float) -> str:
+    # A full ring cannot be drawn as a single arc
+    span = min(span, 2 * math.pi - 1e-6)
+    end = start + span
+    large_arc = 1 if span > math.pi else 0
+
+    outer_start = _point(center_x, center_y, outer_radius, start)
+    outer_end = _point(center_x, center_y, outer_radius, end)
+    inner_end = _point(center_x, center_y, inner_radius, end)
+    inner_start = _point(center_x, center_y, inner_radius, start)
+
+    # SVG y goes down, counterclockwise on screen is sweep flag 0
+    return (
+        f'M{outer_start[0]:.2f},{outer_start[1]:.2f} '
+        f'A{outer_radius:.2f},{outer_radius:.2f} 0 {large_arc} 0 {outer_end[0]:.2f},{outer_end[1]:.2f} '
+        f'L{inner_end[0]:.2f},{inner_end[1]:.2f} '
+        f'A{inner_radius:.2f},{inner_radius:.2f} 0 {large_arc} 1 {inner_start[0]:.2f},{inner_start[1]:.2f} Z'
+    )
+
+
+def _sector_text(sector: SunburstSector, center_x: float, center_y: float, inner_radius: float, outer_radius: float,
+                 start: float, span: float) -> str:
+    """
+        Text of a sector, at the middle of the sector, either along the ring or along the radius, whichever allows
+        the larger font. Not drawn if it does not fit with the minimum font size.
+    """
+    lines = sector.label.split('<br>')
+    text_width = max(len(line) for line in lines) * CHARACTER_WIDTH
+    text_height = len(lines) * LINE_HEIGHT
+
+    middle_radius = (inner_radius + outer_radius) / 2
+    middle_angle = start + span / 2
+    radial_room = outer_radius - inner_radius - SECTOR_PADDING
+    # Chord at the inner radius, the narrowest part of the sector
+    tangential_room = 2 * inner_radius * math.sin(min(span, math.pi) / 2) - SECTOR_PADDING
+
+    along_ring = min(tangential_room / text_width, radial_room / text_height)
+    along_radius = min(radial_room / text_width, tangential_room / text_height)
+    font_size = min(max(along_ring, along_radius), MAX_FONT_SIZE)
+
+    if font_size < MIN_FONT_SIZE:
+        return ''
+
+    x, y = _point(center_x, center_y, middle_radius, middle_angle)
+    degrees = -math.degrees(middle_angle)
+
+    if along_ring >= along_radius:
+        rotation = degrees + 90
+    else:
+        rotation = degrees
+
+    # Never upside down
+    rotation = (rotation + 180) % 360 - 180
+    if rotation > 90:
+        rotation -= 180
+    elif rotation < -90:
+        rotation += 180
+
+    first_baseline = -(len(lines) - 1) * LINE_HEIGHT * font_size / 2 + font_size * 0.35
+    spans = ''.join(
+        f'<tspan x="0" y="{first_baseline + index * LINE_HEIGHT * font_size:.2f}">{escape(line)}</tspan>'
+        for index, line in enumerate(lines)
+    )
+
+    return (
+        f'<text transform="translate({x:.2f},{y:.2f}) rotate({rotation:.2f})" font-size="{font_size:.1f}" '
+        f'text-anchor="middle" fill="{_text_color(sector.color)}">{spans}</text>'
+    )
+
+
+def _point(center_x: float, center_y: float, radius: float, angle: float) -> tuple:
+    return center_x + radius * math.cos(angle), center_y - radius * math.sin(angle)
+
+
+def _depth(sector: SunburstSector) -> int:
+    return 1 + max((_depth(child) for child in sector.children), default=0)
+
+
+def _title(sector: SunburstSector) -> str:
+    text = sector.hover_text if sector.hover_text is not None else sector.label
+
+    return f'<title>{escape(text.replace("<br>", " "))}</title>'
+
+
+def _rgba(color: str) -> tuple:
+    match = _COLOR.fullmatch(color.strip())
+
+    if match is None:
+        raise ValueError(f'Unsupported color {color}')
+
+    red, green, blue, alpha = match.groups()
+
+    return float(red), float(green), float(blue), float(alpha) if alpha is not None else 1.0
+
+
+def _svg_color(color: str) -> tuple:
+    red, green, blue, alpha = _rgba(color)
+
+    return f'rgb({red:g},{green:g},{blue:g})', f'{alpha:g}'
+
+
+def _text_color(color: str) -> str:
+    red, green, blue, alpha = _rgba(color)
+
+    # Color seen over the white background
+    red, green, blue = (alpha * channel + (1 - alpha) * 255 for channel in (red, green, blue))
+    brightness = (red * 299 + green * 587 + blue * 114) / 1000
+
+    return DARK_TEXT if brightness >= 128 else LIGHT_TEXT
@@ -0,0 +1,238 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from code.helpers.django import compute_amount_of_stars
+from code.label.catalogue import CatalogueSnapshot, get_catalogue_snapshot
+from code.label.scoring import SCORE_DECIMALS
+from webapp.models import Dataset, DQAssessment, DQMetricValue
+
+
+@dataclass(frozen=True, slots=True)
+class MetricNode:
+    id: int
+    index: int
+    name: str
+    definition: str
+    additional_information: Optional[str]
+    measurement_approach: Optional[str]
+    formula: Optional[str]
+    weight: float
+    needs_report_URL: bool
+    is_categorical: bool
+    levels: tuple
+    # Answer of the assessment
+    is_answered: bool
+    value: Optional[str]
+    report_URL: Optional[str]
+    score: float
+
+    @property
+    def metric_label(self) -> str:
+        return f'Metric #{self.index}'
+
+    @property
+    def weight_str(self) -> str:
+        return f'{int(self.weight)}%'
+
+    @property
+    def score_str(self) -> str:
+        return f'{self.score:.2f}'
+
+    @property
+    def answer(self) -> str:
+        if not self.is_answered:
+            return 'Not answered'
+
+        # The text of the selected categorical level
+        if self.value is not None and self.value.isdigit():
+            for level in self.levels:
+                if level.value == int(self.value):
+                    return level.text
+
+        return self.value
+
+    @property
+    def is_metric_ok(self) -> bool:
+        return self.score > 0
+
+    @property
+    def is_zero_with_answer(self) -> bool:
+        return self.is_categorical and self._has_numeric_answer and self.score == 0
+
+    @property
+    def is_zero_unanswered(self) -> bool:
+        return self.is_categorical and not self._has_numeric_answer
+
+    @property
+    def _has_numeric_answer(self) -> bool:
+        return self.is_answered and self.value is not None and self.value.isdigit()
+
+
+@dataclass(frozen=True, slots=True)
+class DimensionNode:
+    id: int
+    index: int
+    category_index: int
+    name: str
+    definition: str
+    # Relevance of the dimension as a percentage of the relevance of all the dimensions
+    relevance: float
+    metrics: tuple
+    score: float
+
+    @property
+    def dimension_index_str(self) -> str:
+        return f'{self.category_index}.{self.index}.'
+
+    @property
+    def relevance_str(self) -> str:
+        return f'{self.relevance:.2f}%'
+
+    @property
+    def score_str(self) -> str:
+        return f'{self.score:.2f}'
+
+    @property
+    def all_metrics_ok(self) -> bool:
+        return all(metric.is_metric_ok for metric in self.metrics)
+
+
+@dataclass(frozen=True, slots=True)
+class CategoryNode:
+    id: int
+    index: int
+    name: str
+    relevance: float
+    dimensions: tuple
+    score: float
+
+    @property
+    def category_index_str(self) -> str:
+        return f'{self.index}.'
+
+    @property
+    def score_str(self) -> str:
+        return f'{self.score:.2f}'
+
+    @property
+    def all_dimensions_ok(self) -> bool:
+        return all(dimension.all_metrics_ok for dimension in self.dimensions)
+
+
+@dataclass(frozen=True, slots=True)
+class AssessmentTree:
+    categories: tuple
+    score: float
+
+    def __iter__(self):
+        return iter(self.categories)
+
+    @property
+    def dimensions(self) -> list:
+        return [dimension for category in self.categories for dimension in category.dimensions]
+
+    @property
+    def metrics(self) -> list:
+        return [metric for dimension in self.dimensions for metric in dimension.metrics]
+
+    @property
+    def stars(self) -> int:
+        return compute_amount_of_stars(self.score)
+
+    @property
+    def information_box_needed(self) -> bool:
+        return not all(category.all_dimensions_ok for category in self.categories)
+
+
+def build_assessment_tree(dataset: Dataset) -> AssessmentTree:
+    """
+        Builds the category -> dimension -> metric -> value tree of the dataset assessment with its scores.
+        The catalogue comes from the process snapshot, so it only queries the assessment values.
+
+        Params
+        ------
+        dataset: Dataset
+
+        Returns
+        -------
+        The immutable assessment tree
+    """
+    return assemble_assessment_tree(get_catalogue_snapshot(), dataset.dq_assessment)
+
+
+def assemble_assessment_tree(snapshot: CatalogueSnapshot, assessment: Optional[DQAssessment]) -> AssessmentTree:
+    """
+        Builds the assessment tree from a catalogue snapshot, querying only the metric values of the assessment
+    """
+    engine = snapshot.engine
+    values = {}
+
+    if assessment is not None:
+        for metric_value in DQMetricValue.objects.filter(dq_assessment=assessment).order_by('id'):
+            # Only the first value of a metric is used
+            values.setdefault(metric_value.dq_metric_id, metric_value)
+
+    answers = engine.answer_vector((metric_id, value.value) for metric_id, value in values.items())
+    metric_scores = np.round(engine.metric_scores(answers), SCORE_DECIMALS)
+    dimension_scores = engine.dimension_scores(answers)
+    category_scores = engine.category_scores(answers)
+
+    category_nodes = []
+    for category_index, category in enumerate(snapshot.categories, start=1):
+        dimension_nodes = []
+
+        for dimension_index, dimension in enumerate(category.dimensions, start=1):
+            metric_nodes = []
+
+            for metric_index, metric in enumerate(dimension.metrics, start=1):
+                metric_value = values.get(metric.id)
+                metric_position = engine.metric_positions[metric.id]
+
+                metric_nodes.append(MetricNode(
+                    id=metric.id,
+                    index=metric_index,
+                    name=metric.name,
+                    definition=metric.definition,
+                    additional_information=metric.additional_information,
+                    measurement_approach=metric.measurement_approach,
+                    formula=metric.formula,
+                    weight=metric.weight,
+                    needs_report_URL=metric.needs_report_URL,
+                    is_categorical=metric.is_categorical,
+                    levels=metric.levels,
+                    is_answered=metric_value is not None,
+                    value=str(metric_value.value) if metric_value is not None and metric_value.value is not None
+                    else None,
+                    report_URL=metric_value.report_URL if metric_value is not None else None,
+                    score=float(metric_scores[metric_position])
+                ))
+
+            dimension_position = engine.dimension_positions[dimension.id]
+
+            dimension_nodes.append(DimensionNode(
+                id=dimension.id,
+                index=dimension_index,
+                category_index=category_index,
+                name=dimension.name,
+                definition=dimension.definition,
+                relevance=float(engine.dimension_relevance[dimension_position] * 100),
+                metrics=tuple(metric_nodes),
+                score=float(dimension_scores[dimension_position])
+            ))
+
+        category_nodes.append(CategoryNode(
+            id=category.id,
+            index=category_index,
+            name=category.name,
+            relevance=float(engine.category_relevance[category_index - 1]),
+            dimensions=tuple(dimension_nodes),
+            score=float(category_scores[category_index - 1])
+        ))
+
+    return AssessmentTree(
+        categories=tuple(category_nodes),
+        score=float(engine.total_scores(answers))
+    )
+
@@ -2,8 +2,13 @@ import os
 
 from code.fdp.constants import FDP_DEVELOPMENT_URL
 from code.helpers.django import generate_assessment_stars, compute_amount_of_stars
-from code.label.label import compute_scores
-from webapp.models import Dataset, Catalogue, DQMetricValue, DQMetric, DQDimension, EHDSCategory, DQAssessment
+from code.label.artifacts import assessment_answers_key, content_key
+from code.label.catalogue import current_catalogue_generation
+from code.label.tree import build_assessment_tree, CategoryNode, DimensionNode, MetricNode
+from webapp.models import Dataset, Catalogue, DQAssessment
+
+# Increase when the generated RDF changes, so the files stored before are not reused
+TTL_TEMPLATE_VERSION = 1
 
 
 def format_name(dimension_name: str) -> str:
@@ -146,7 +151,7 @@ qnt:five_stars
 
 
 def template_categorical_metric_value(
-        metric_value: DQMetricValue,
+        metric: MetricNode,
         metric_name: str,
         measurement_name: str,
         dataset: Dataset
@@ -156,34 +161,34 @@ qnt:{measurement_name}
     a dqv:QualityMeasurement ;
     dqv:computedOn <{os.getenv('FDP_URL', '')}/dataset/{dataset.fdp_id or dataset.id}> ;
     dqv:isMeasurementOf qnt:{metric_name} ;
-    dqv:value "{metric_value.value}"^^xsd:integer ;
+    dqv:value "{metric.value}"^^xsd:integer ;
     .
 '''
 
 
-def template_metric(metric: DQMetric, metric_name: str) -> str:
+def template_metric(metric: MetricNode, metric_name: str, dimension: DimensionNode) -> str:
     return f'''
 qnt:{metric_name}
     a dqv:Metric ;
     skos:definition "{metric.definition}"@en ;
     dqv:expectedDataType xsd:integer ;
-    dqv:inDimension qnt:{format_name(metric.dq_dimension.name)} ;
+    dqv:inDimension qnt:{format_name(dimension.name)} ;
     .
 '''
 
 
-def template_dimension(dimension: DQDimension) -> str:
+def template_dimension(dimension: DimensionNode, category: CategoryNode) -> str:
     return f'''
 qnt:{format_name(dimension.name)}
     a dqv:Dimension ;
     skos:prefLabel "{dimension.name}"@en ;
     skos:definition "{dimension.definition}"@en ;
-    dqv:inCategory qnt:{format_name(dimension.ehds_category.name)} ;
+    dqv:inCategory qnt:{format_name(category.name)} ;
     .
 '''
 
 
-def template_ehds_category(category: EHDSCategory) -> str:
+def template_ehds_category(category: CategoryNode) -> str:
     return f'''
 qnt:{format_name(category.name)}
     a dqv:Category ;
@@ -217,14 +222,14 @@ def generate_ttl_file(
 
     assessment = dataset.dq_assessment
 
-    ehds_categories = EHDSCategory.objects.all()
+    # The category -> dimension -> metric tree with the values and scores
+    tree = build_assessment_tree(dataset)
 
     temporal_ttl = ''
     dimension_names = []
     measurement_names = []
 
-    _, score = compute_scores(dataset)
-    score = int(score)
+    score = int(tree.score)
     stars = compute_amount_of_stars(score)
     stars_text = 'zero_stars'
 
@@ -240,31 +245,25 @@ def generate_ttl_file(
         stars_text = 'five_stars'
 
     # We fill the dictionary with all the information to build the web page
-    for category in ehds_categories:
+    for category in tree.categories:
         category_filled_template = template_ehds_category(category=category)
 
-        dimensions = DQDimension.objects.filter(ehds_category=category)
-        for dimension in dimensions:
-            dimension_filled_template = template_dimension(dimension=dimension)
+        for dimension in category.dimensions:
+            dimension_filled_template = template_dimension(dimension=dimension, category=category)
             dimension_names.append(format_name(dimension.name))
 
-            metrics = DQMetric.objects.filter(dq_dimension=dimension)
-            for index, metric in enumerate(metrics):
-                metric_name = f'{format_name(dimension.name)}_metric{index + 1}'
-                measurement_name = f'{format_name(dimension.name)}_measurement{index + 1}'
+            for metric in dimension.metrics:
+                metric_name = f'{format_name(dimension.name)}_metric{metric.index}'
+                measurement_name = f'{format_name(dimension.name)}_measurement{metric.index}'
                 measurement_names.append(measurement_name)
-                metric_filled_template = template_metric(metric=metric, metric_name=metric_name)
-
-                dq_metric_value = DQMetricValue.objects.filter(dq_assessment=assessment, dq_metric=metric)
-                current_value = None
+                metric_filled_template = template_metric(metric=metric, metric_name=metric_name, dimension=dimension)
 
-                # If the metric is filled then we assign the value, else it is None
-                if len(dq_metric_value) >= 1:
-                    dq_metric_value = dq_metric_value.first()
+                # If the metric is filled then we assign the value
+                if metric.is_answered:
                     # For the categorical metrics we provide the possible values
-                    if getattr(metric, 'dqcategoricalmetric') is not None:
+                    if metric.is_categorical:
                         metric_value_filled_template = template_categorical_metric_value(
-                            metric_value=dq_metric_value,
+                            metric=metric,
                             metric_name=metric_name,
                             measurement_name=measurement_name,
                             dataset=dataset
@@ -290,3 +289,25 @@ def generate_ttl_file(
     final_ttl += temporal_ttl
 
     return final_ttl
+
+
+def ttl_artifact_key(catalogue: Catalogue, dataset: Dataset) -> str:
+    """
+    Key of the RDF file of the dataset in the artifact store, computed from everything written in the file
+    without building the assessment tree.
+
+    :param catalogue: The catalogue of the dataset.
+    :param dataset: The assessed dataset.
+    :return: The hexadecimal SHA-256 key.
+    """
+    assessment = dataset.dq_assessment
+
+    return content_key(
+        TTL_TEMPLATE_VERSION,
+        current_catalogue_generation(),
+        os.getenv('FDP_URL', ''),
+        [catalogue.id, catalogue.fdp_id, catalogue.title, catalogue.version] if catalogue is not None else None,
+        [dataset.id, dataset.fdp_id, dataset.name, dataset.version, dataset.description],
+        [assessment.id, assessment.fdp_id] if assessment is not None else None,
+        assessment_answers_key(dataset.dq_assessment_id)
+    )
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'webapp.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -133,10 +134,105 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static'
 ]
 
+# Fingerprinted and compressed static files (collectstatic), served by WhiteNoise with far future cache headers
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Share the NumPy arrays of the catalogue snapshot between the worker processes (gunicorn --preload)
+SHARED_CATALOGUE = os.environ.get('QUANTUM_SHARED_CATALOGUE', '0') == '1'
+SHARED_CATALOGUE_NAME = os.environ.get('QUANTUM_SHARED_CATALOGUE_NAME', 'quantum_catalogue')
+
+# Generated label images, PDF reports and RDF files, stored by the key of their inputs and shared by the worker
+# processes, least recently used removed above the maximum size (code.label.artifacts)
+ARTIFACT_STORE = {
+    'BACKEND': 'code.label.artifacts.LocalArtifactBackend',
+    'OPTIONS': {
+        'directory': os.environ.get('QUANTUM_ARTIFACT_DIR', BASE_DIR / 'cache' / 'artifacts'),
+        'max_bytes': int(os.environ.get('QUANTUM_ARTIFACT_MAX_BYTES', 1024 * 1024 * 1024)),
+    },
+}
+
+# Compiled templates of the PDF reports
+PDF_TEMPLATE_CACHE_DIR = os.environ.get('QUANTUM_PDF_TEMPLATE_CACHE_DIR', BASE_DIR / 'cache' / 'templates')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Generated plots, on disk so every worker process sees the invalidations
+    'plots': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('QUANTUM_PLOT_CACHE_DIR', BASE_DIR / 'cache' / 'plots'),
+        'TIMEOUT': 7 * 24 * 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+
+# Uploaded and generated files (the PDF reports), served through the views that check the access
+MEDIA_ROOT = os.environ.get('QUANTUM_MEDIA_ROOT', BASE_DIR / 'media')
+MEDIA_URL = 'media/'
+
+# PDF reports rendered by the pdf_worker command
+# Running jobs older than this are considered abandoned by a stopped worker and queued again
+PDF_JOB_STALE_SECONDS = 10 * 60
+# Same for the ZIP exports of all the PDFs of an organization, rendering many PDFs each
+PDF_EXPORT_JOB_STALE_SECONDS = 2 * 60 * 60
+PDF_JOB_MAX_ATTEMPTS = 3
+# Finished jobs and their PDF are deleted after this many days
+PDF_JOB_RETENTION_DAYS = 7
+# Rendered PDFs are kept in memory up to this size, in a temporary file above
+PDF_SPOOL_MAX_BYTES = 2 * 1024 * 1024
+# Laid out pages of the reusable PDF templates kept in memory by each process, 0 disables the cache
+PDF_REUSABLE_PAGES_CACHE_SIZE = int(os.environ.get('QUANTUM_PDF_REUSABLE_PAGES_CACHE_SIZE', 8))
+# Rendering processes of the pdf_worker for a ZIP export of all the PDFs of an organization (PDFExportJob)
+PDF_EXPORT_WORKERS = int(os.environ.get('QUANTUM_PDF_EXPORT_WORKERS', 2))
+
+# Per request SQL instrumentation (webapp.middleware.QueryInstrumentationMiddleware)
+QUERY_INSTRUMENTATION = os.environ.get('QUANTUM_QUERY_INSTRUMENTATION', '0') == '1'
+# Statements with the same shape executed this many times in a request are reported as N+1
+QUERY_REPEAT_THRESHOLD = 5
+# Maximum queries per view, by view name (e.g. 'webapp.views.user_dashboard_view'), and for the other views.
+# They do not depend on the size of the catalogue, rebuilding the catalogue snapshot after a change adds a few more.
+QUERY_BUDGETS = {
+    'webapp.views.dataset_label_view': 16,
+    'webapp.views.dataset_label_json_view': 12,
+    'webapp.views.user_dataset_assessment_view': 14,
+    'webapp.views.pdf_job_status_view': 9,
+    'webapp.views.user_dashboard_view': 19,
+}
+QUERY_BUDGET_DEFAULT = None
+# Raise QueryBudgetExceeded instead of logging when a budget is exceeded, for the tests
+QUERY_BUDGET_RAISE = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'webapp.queries': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 LOGIN_URL = '/login'
 LOGIN_REDIRECT_URL = '/login'
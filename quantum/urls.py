@@ -29,11 +29,22 @@ urlpatterns = [
     path('dataset/modify', dataset_modify_view),
     path('dataset/delete', dataset_delete_view),
     path('dataset/label', dataset_label_view),
+    path('dataset/label/json', dataset_label_json_view),
+    path('dataset/label/png', dataset_label_image_view),
+    path('dataset/simulate', dataset_simulation_view),
     path('dataset/assessment', user_dataset_assessment_view),
     path('dataset/assessment/rdf', download_assessment_rdf),
     path('dataset/assessment/pdf', download_assessment_pdf),
+    path('dataset/assessment/pdf/status', pdf_job_status_view),
+    path('dataset/assessment/pdf/download', pdf_job_download_view),
     path('catalogue/create', catalogue_create_view),
     path('catalogue/modify', catalogue_modify_view),
     path('catalogue/delete', catalogue_delete_view),
-    path('organization/maturity', organization_maturity_view)
+    path('organization/maturity', organization_maturity_view),
+    path('organization/statistics', organization_statistics_view),
+    path('organization/statistics/json', organization_statistics_json_view),
+    path('organization/maturity/benchmark', maturity_benchmark_view),
+    path('organization/pdf/export', organization_pdf_export_view),
+    path('organization/pdf/export/status', organization_pdf_export_status_view),
+    path('organization/pdf/export/download', organization_pdf_export_download_view)
 ]
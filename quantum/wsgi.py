@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quantum.settings')
 
 application = get_wsgi_application()
+
+# With gunicorn --preload this runs once in the master process, before the workers are forked
+if settings.SHARED_CATALOGUE:
+    from code.label.catalogue import preload_catalogue_snapshot
+
+    preload_catalogue_snapshot()
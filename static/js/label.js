@@ -0,0 +1,81 @@
+// Renders the DQ&U label plot from its figure, kept in the browser cache and revalidated with its ETag
+document.addEventListener("DOMContentLoaded", function () {
+    const container = document.getElementById("label_plot");
+
+    if (!container) {
+        return;
+    }
+
+    fetch(container.dataset.url, {credentials: "same-origin", headers: {"Accept": "application/json"}})
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`Label request failed with status ${response.status}`);
+            }
+
+            return response.json();
+        })
+        .then(figure => Plotly.newPlot(container, figure.data, figure.layout, {responsive: true}))
+        .catch(error => console.error(error));
+});
+
+// Queues the PDF report, follows the progress of its job and downloads it once rendered
+const PDF_STATUS_INTERVAL = 1000;
+
+document.addEventListener("DOMContentLoaded", function () {
+    const button = document.getElementById("pdf_download");
+
+    if (!button) {
+        return;
+    }
+
+    const buttonText = button.textContent;
+
+    function reset(message) {
+        button.disabled = false;
+        button.textContent = buttonText;
+
+        if (message) {
+            alert(message);
+        }
+    }
+
+    function follow(job) {
+        if (job.status === "done") {
+            reset();
+            window.location = job.download_url;
+        } else if (job.status === "failed") {
+            reset("The PDF could not be generated, please try again later.");
+        } else {
+            button.textContent = `Generating PDF... ${job.progress}%`;
+
+            setTimeout(() => fetchJob(job.status_url, {credentials: "same-origin"}), PDF_STATUS_INTERVAL);
+        }
+    }
+
+    function fetchJob(url, options) {
+        fetch(url, options)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`PDF request failed with status ${response.status}`);
+                }
+
+                return response.json();
+            })
+            .then(follow)
+            .catch(error => {
+                console.error(error);
+                reset("The PDF could not be generated, please try again later.");
+            });
+    }
+
+    button.addEventListener("click", function () {
+        button.disabled = true;
+        button.textContent = "Generating PDF...";
+
+        fetchJob(button.dataset.url, {
+            method: "POST",
+            credentials: "same-origin",
+            headers: {"X-CSRFToken": button.dataset.csrf}
+        });
+    });
+});
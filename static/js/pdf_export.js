@@ -0,0 +1,61 @@
+// Queues the ZIP with all the PDF labels of the organization, follows the progress of its job and downloads it once built
+const PDF_EXPORT_STATUS_INTERVAL = 2000;
+
+document.addEventListener("DOMContentLoaded", function () {
+    const button = document.getElementById("pdf_export");
+
+    if (!button) {
+        return;
+    }
+
+    const buttonText = button.textContent;
+
+    function reset(message) {
+        button.disabled = false;
+        button.textContent = buttonText;
+
+        if (message) {
+            alert(message);
+        }
+    }
+
+    function follow(job) {
+        if (job.status === "done") {
+            reset();
+            window.location = job.download_url;
+        } else if (job.status === "failed") {
+            reset("The PDF labels could not be generated, please try again later.");
+        } else {
+            button.textContent = `Generating PDF labels... ${job.progress}%`;
+
+            setTimeout(() => fetchJob(job.status_url, {credentials: "same-origin"}), PDF_EXPORT_STATUS_INTERVAL);
+        }
+    }
+
+    function fetchJob(url, options) {
+        fetch(url, options)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`PDF export request failed with status ${response.status}`);
+                }
+
+                return response.json();
+            })
+            .then(follow)
+            .catch(error => {
+                console.error(error);
+                reset("The PDF labels could not be generated, please try again later.");
+            });
+    }
+
+    button.addEventListener("click", function () {
+        button.disabled = true;
+        button.textContent = "Generating PDF labels...";
+
+        fetchJob(button.dataset.url, {
+            method: "POST",
+            credentials: "same-origin",
+            headers: {"X-CSRFToken": button.dataset.csrf}
+        });
+    });
+});
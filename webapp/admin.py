@@ -101,3 +101,17 @@ class MaturityDimensionLevelAdmin(admin.ModelAdmin):
 
 
 admin.site.register(MaturityDimensionLevel, MaturityDimensionLevelAdmin)
+
+
+class PDFJobAdmin(admin.ModelAdmin):
+    pass
+
+
+admin.site.register(PDFJob, PDFJobAdmin)
+
+
+class PDFExportJobAdmin(admin.ModelAdmin):
+    pass
+
+
+admin.site.register(PDFExportJob, PDFExportJobAdmin)
@@ -0,0 +1,46 @@
+import os
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from code.label.pdf_creator import get_pdf_creator
+from webapp.models import Dataset, DQAssessment
+
+
+class Command(BaseCommand):
+    help = 'Times the PDF report of a dataset rendered as a single document and page by page.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', type=int, required=True, help='Identifier of the assessed dataset')
+        parser.add_argument('--repeat', type=int, default=5, help='Renders in every mode, the median is kept')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be positive')
+
+        dataset = Dataset.objects.select_related('catalogue', 'organization').filter(id=options['dataset']).first()
+        if dataset is None:
+            raise CommandError(f'Dataset {options["dataset"]} does not exist')
+
+        assessment = DQAssessment.objects.filter(dataset=dataset).first()
+
+        for name, single_pass in (('per page', False), ('single pass', True)):
+            creator = get_pdf_creator(single_pass=single_pass)
+            timings = []
+            size = 0
+
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                pdf_file = creator.generate_pdf(
+                    dataset=dataset,
+                    catalogue=dataset.catalogue,
+                    assessment=assessment,
+                    organization=dataset.organization
+                )
+                timings.append((time.perf_counter() - start) * 1000)
+
+                with pdf_file:
+                    size = pdf_file.seek(0, os.SEEK_END)
+
+            self.stdout.write(f'{name:<12} {statistics.median(timings):10.1f} ms {size:>10} bytes')
@@ -0,0 +1,388 @@
+import json
+import os
+import statistics
+import time
+from typing import Callable, Optional
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from code.label.catalogue import bump_catalogue_generation, get_catalogue_snapshot, reset_catalogue_snapshot
+from code.label.label import compute_scores, compute_bulk_scores, compute_maturity_score, plot_label, plot_maturity
+from code.label.materialization import compute_assessment_scores
+from code.label.simulation import simulate_scenarios
+from code.label.tree import build_assessment_tree
+from webapp.models import Organization, Catalogue, Dataset, DQAssessment, EHDSCategory, DQDimension, DQMetric, \
+    DQCategoricalMetric, DQCategoricalMetricCategory, DQMetricValue, MaturityDimension, MaturityDimensionLevel, \
+    MaturityDimensionValue
+
+DEFAULT_BASELINES = settings.BASE_DIR / 'benchmarks' / 'scoring_baselines.json'
+DEFAULT_SIZES = [10, 100, 500, 2000]
+DEFAULT_DATASETS = 50
+DEFAULT_REPEAT = 10
+DEFAULT_TOLERANCE = 0.5
+
+# Synthetic catalogue shape, similar to the QUANTUM one
+CATEGORY_COUNT = 4
+METRICS_PER_DIMENSION = 10
+LEVELS_PER_METRIC = 3
+MATURITY_DIMENSION_COUNT = 10
+MATURITY_LEVELS_PER_DIMENSION = 5
+ANSWERED_FRACTION = 0.8
+SIMULATED_SCENARIOS = 1000
+
+# Timing regressions below this are noise
+TIMING_SLACK_MS = 1.0
+
+
+def reference_path(assessment_id: int) -> int:
+    """
+        Fixed workload the timings are divided by: reads the answers of an assessment with the ORM and adds
+        them up in plain Python, untouched by the optimizations of the measured paths
+    """
+    values = DQMetricValue.objects.filter(dq_assessment_id=assessment_id).values_list('value', flat=True)
+
+    return sum(int(value) for value in values if value)
+
+
+class Command(BaseCommand):
+    help = 'Times the scoring and label paths and counts their queries on synthetic catalogues of increasing size, ' \
+           'in a test database. The timings are compared as ratios to a reference path measured in the same run. ' \
+           'Fails if a path is relatively slower or runs more queries than the stored baselines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=DEFAULT_SIZES,
+            help=f'Amounts of metrics of the synthetic catalogues (default {DEFAULT_SIZES})'
+        )
+        parser.add_argument('--datasets', type=int, default=DEFAULT_DATASETS, help='Assessed datasets per catalogue')
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=DEFAULT_REPEAT,
+            help=f'Runs of every path, the median is shown and the fastest is compared (default {DEFAULT_REPEAT})'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=DEFAULT_TOLERANCE,
+            help=f'Allowed slowdown of the ratio over the baseline as a fraction (default {DEFAULT_TOLERANCE})'
+        )
+        parser.add_argument('--baselines', default=str(DEFAULT_BASELINES), help='JSON file with the baselines')
+        parser.add_argument(
+            '--update-baselines',
+            action='store_true',
+            help='Store the measurements as the new baselines instead of comparing with them'
+        )
+        parser.add_argument(
+            '--noinput', '--no-input',
+            action='store_false',
+            dest='interactive',
+            help='Delete an existing test database without asking first'
+        )
+
+    def handle(self, *args, **options):
+        if options['datasets'] < 1 or options['repeat'] < 1 or min(options['sizes']) < 1:
+            raise CommandError('--sizes, --datasets and --repeat must be positive')
+
+        self.stdout.write(
+            f'Creating the test database of the {connection.vendor} database "{connection.settings_dict["NAME"]}"'
+        )
+
+        # Django asks before deleting a test database left by another run, unless --noinput is given
+        old_database_name = connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=not options['interactive'],
+            serialize=False
+        )
+
+        try:
+            # Segments of the synthetic catalogues must not be shared with the running application
+            with override_settings(SHARED_CATALOGUE=False):
+                measurements = {}
+
+                for size in options['sizes']:
+                    measurements.update(self.benchmark_size(size, options['datasets'], options['repeat']))
+        finally:
+            reset_catalogue_snapshot()
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+
+        self._print(measurements)
+
+        if options['update_baselines']:
+            self._write_baselines(options['baselines'], measurements)
+            self.stdout.write(self.style.SUCCESS(f'Baselines stored in {options["baselines"]}'))
+            return
+
+        regressions = self.regressions(options['baselines'], measurements, options['tolerance'])
+
+        if regressions:
+            raise CommandError('Scoring regressions:\n' + '\n'.join(regressions))
+
+        self.stdout.write(self.style.SUCCESS('No regressions'))
+
+    def benchmark_size(self, size: int, dataset_count: int, repeat: int) -> dict:
+        """
+            Measures every path on a synthetic catalogue of the given amount of metrics, rolled back afterwards
+        """
+        self.stdout.write(f'Benchmarking a catalogue of {size} metrics and {dataset_count} datasets')
+
+        with transaction.atomic():
+            organization, datasets = self._create_synthetic_data(size, dataset_count)
+            dataset = datasets[0]
+            assessment_ids = [dataset.dq_assessment_id for dataset in datasets]
+
+            def forget_score():
+                DQAssessment.objects.filter(id=dataset.dq_assessment_id).update(score=None, score_tree=None)
+                dataset.refresh_from_db()
+
+            def forget_dataset_assessment():
+                dataset.refresh_from_db()
+
+            tree = build_assessment_tree(dataset)
+
+            engine = get_catalogue_snapshot().engine
+            answers = engine.assessment_answers(dataset.dq_assessment)
+            random = np.random.default_rng(size)
+            scenarios = [
+                {int(metric_id): int(random.integers(0, LEVELS_PER_METRIC))}
+                for metric_id in random.choice(engine.metric_ids, SIMULATED_SCENARIOS)
+            ]
+
+            # The PNG label is not measured, kaleido dominates its timing and varies from machine to machine
+            paths = {
+                'catalogue_snapshot': (lambda: get_catalogue_snapshot(), reset_catalogue_snapshot),
+                'compute_scores_unmaterialized': (lambda: compute_scores(dataset), forget_score),
+                'compute_scores': (lambda: compute_scores(dataset), forget_dataset_assessment),
+                'compute_bulk_scores': (lambda: compute_bulk_scores(Dataset.objects.filter(organization=organization)), None),
+                'assessment_tree': (lambda: build_assessment_tree(dataset), forget_dataset_assessment),
+                'compute_maturity_score': (lambda: compute_maturity_score(organization), None),
+                'compute_assessment_scores': (lambda: compute_assessment_scores(assessment_ids, engine), None),
+                'simulate_scenarios': (lambda: simulate_scenarios(engine, answers, scenarios), None),
+                'label_html': (lambda: plot_label(dataset, tree=tree), None),
+                'label_svg': (lambda: plot_label(dataset, output_type='svg', tree=tree), None),
+                'maturity_html': (lambda: plot_maturity(organization), None),
+                'maturity_svg': (lambda: plot_maturity(organization, output_type='svg'), None)
+            }
+
+            def reference():
+                reference_path(dataset.dq_assessment_id)
+
+            measurements = {
+                f'{name}[{size}]': self._measure(function, setup, reference, repeat)
+                for name, (function, setup) in paths.items()
+            }
+
+            transaction.set_rollback(True)
+
+        # The rolled back generation will be reached again by the next catalogue
+        reset_catalogue_snapshot()
+
+        return measurements
+
+    @staticmethod
+    def _measure(function: Callable, setup: Optional[Callable], reference: Callable, repeat: int) -> dict:
+        """
+            Median timing and query count of the path, and the ratio of its timing to the reference path. The
+            reference runs right after every run of the path, under the same load of the machine, and the
+            fastest runs of both are compared as the least disturbed by the rest of the machine.
+        """
+        timings = []
+        reference_timings = []
+        query_count = 0
+
+        # A first run outside of the measurements warms up the caches of the path
+        for run in range(repeat + 1):
+            if setup is not None:
+                setup()
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                function()
+                elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            reference()
+            reference_elapsed = time.perf_counter() - start
+
+            if run:
+                timings.append(elapsed)
+                reference_timings.append(reference_elapsed)
+                query_count = max(query_count, len(queries))
+
+        return {
+            'ms': round(statistics.median(timings) * 1000, 3),
+            'ratio': round(min(timings) / min(reference_timings), 3),
+            'reference_ms': round(min(reference_timings) * 1000, 3),
+            'queries': query_count
+        }
+
+    @staticmethod
+    def _create_synthetic_data(size: int, dataset_count: int) -> tuple:
+        """
+            Creates a synthetic catalogue of the given amount of categorical metrics, an organization with
+            its maturity values and assessed datasets. Bulk inserts do not send signals, the scores are
+            materialized by the benchmarked paths.
+        """
+        random = np.random.default_rng(size)
+        dimension_count = max(CATEGORY_COUNT, -(-size // METRICS_PER_DIMENSION))
+
+        EHDSCategory.objects.bulk_create([
+            EHDSCategory(name=f'Category {index}') for index in range(CATEGORY_COUNT)
+        ])
+        categories = list(EHDSCategory.objects.order_by('id'))
+
+        DQDimension.objects.bulk_create([
+            DQDimension(
+                name=f'Dimension {index}',
+                definition=f'Definition of dimension {index}',
+                relevance=float(random.integers(1, 11)),
+                ehds_category=categories[index % CATEGORY_COUNT]
+            )
+            for index in range(dimension_count)
+        ])
+        dimensions = list(DQDimension.objects.order_by('id'))
+
+        DQMetric.objects.bulk_create([
+            DQMetric(
+                name=f'Metric {index}',
+                definition=f'Definition of metric {index}',
+                weight=float(random.integers(1, 101)),
+                dq_dimension=dimensions[index % dimension_count]
+            )
+            for index in range(size)
+        ], batch_size=500)
+        metric_ids = list(DQMetric.objects.order_by('id').values_list('id', flat=True))
+
+        # Multi-table inheritance can not be bulk created, the child rows only hold the parent pointer
+        DQCategoricalMetric.objects._insert(
+            [DQCategoricalMetric(dqmetric_ptr_id=metric_id) for metric_id in metric_ids],
+            fields=[DQCategoricalMetric._meta.pk]
+        )
+
+        DQCategoricalMetricCategory.objects.bulk_create([
+            DQCategoricalMetricCategory(value=value, text=f'Level {value}', dq_categorical_metric_id=metric_id)
+            for metric_id in metric_ids for value in range(LEVELS_PER_METRIC)
+        ], batch_size=1000)
+
+        MaturityDimension.objects.bulk_create([
+            MaturityDimension(name=f'Maturity dimension {index}', definition='')
+            for index in range(MATURITY_DIMENSION_COUNT)
+        ])
+        maturity_dimensions = list(MaturityDimension.objects.order_by('id'))
+
+        MaturityDimensionLevel.objects.bulk_create([
+            MaturityDimensionLevel(value=value, text=f'Level {value}', maturity_dimension=dimension)
+            for dimension in maturity_dimensions for value in range(1, MATURITY_LEVELS_PER_DIMENSION + 1)
+        ])
+        maturity_levels = list(MaturityDimensionLevel.objects.order_by('id'))
+
+        user = User.objects.create(username=f'benchmark_{size}')
+        organization = Organization.objects.create(name='Benchmark')
+        catalogue = Catalogue.objects.create(title='Benchmark', version=1, part_of='', user=user)
+
+        MaturityDimensionValue.objects.bulk_create([
+            MaturityDimensionValue(
+                maturity_dimension=dimension,
+                maturity_dimension_level=maturity_levels[
+                    index * MATURITY_LEVELS_PER_DIMENSION + int(random.integers(0, MATURITY_LEVELS_PER_DIMENSION))
+                ],
+                maturity_organization=organization
+            )
+            for index, dimension in enumerate(maturity_dimensions)
+        ])
+
+        DQAssessment.objects.bulk_create([DQAssessment(start_date=timezone.now()) for _ in range(dataset_count)])
+        assessment_ids = list(DQAssessment.objects.order_by('id').values_list('id', flat=True))
+
+        Dataset.objects.bulk_create([
+            Dataset(
+                name=f'Dataset {index}',
+                description='',
+                version=1,
+                organization=organization,
+                catalogue=catalogue,
+                dq_assessment_id=assessment_id
+            )
+            for index, assessment_id in enumerate(assessment_ids)
+        ])
+
+        values = []
+        for assessment_id in assessment_ids:
+            answered = random.random(size) < ANSWERED_FRACTION
+            levels = random.integers(0, LEVELS_PER_METRIC, size)
+
+            values.extend(
+                DQMetricValue(value=str(level), dq_metric_id=metric_id, dq_assessment_id=assessment_id)
+                for metric_id, is_answered, level in zip(metric_ids, answered, levels.tolist())
+                if is_answered
+            )
+
+        DQMetricValue.objects.bulk_create(values, batch_size=1000)
+
+        bump_catalogue_generation()
+
+        return organization, list(Dataset.objects.filter(organization=organization).order_by('id'))
+
+    def _print(self, measurements: dict) -> None:
+        width = max(len(name) for name in measurements)
+
+        for name, measurement in measurements.items():
+            self.stdout.write(
+                f'{name:<{width}}  {measurement["ms"]:>10.3f} ms  {measurement["ratio"]:>9.2f}x  '
+                f'{measurement["queries"]:>4} queries'
+            )
+
+    @staticmethod
+    def _write_baselines(path: str, measurements: dict) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # The absolute timings only describe the machine that stored them
+        baselines = {
+            name: {'ratio': measurement['ratio'], 'queries': measurement['queries']}
+            for name, measurement in measurements.items()
+        }
+
+        with open(path, 'w') as baselines_file:
+            json.dump(baselines, baselines_file, indent=4, sort_keys=True)
+            baselines_file.write('\n')
+
+    @staticmethod
+    def regressions(path: str, measurements: dict, tolerance: float) -> list:
+        """
+            Measurements with more queries than their baseline or a timing ratio to the reference path over the
+            tolerance, one line each
+        """
+        if not os.path.exists(path):
+            raise CommandError(f'No baselines in {path}, create them with --update-baselines')
+
+        with open(path) as baselines_file:
+            baselines = json.load(baselines_file)
+
+        regressions = []
+
+        for name, measurement in measurements.items():
+            baseline = baselines.get(name)
+
+            if baseline is None:
+                continue
+
+            if measurement['queries'] > baseline['queries']:
+                regressions.append(f'{name}: {measurement["queries"]} queries, baseline {baseline["queries"]}')
+
+            slack = TIMING_SLACK_MS / measurement['reference_ms']
+
+            if measurement['ratio'] > baseline['ratio'] * (1 + tolerance) + slack:
+                regressions.append(
+                    f'{name}: {measurement["ratio"]:.2f}x the reference, baseline {baseline["ratio"]:.2f}x'
+                )
+
+        return regressions
@@ -0,0 +1,68 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from code.label.pdf_export import iter_pdf_zip
+from webapp.models import Dataset
+
+
+class Command(BaseCommand):
+    help = 'Writes a ZIP with the PDF report of every assessed dataset of the organizations or catalogues, ' \
+           'rendered in worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organization',
+            type=int,
+            action='append',
+            help='The datasets of this organization id (can be repeated)'
+        )
+        parser.add_argument(
+            '--catalogue',
+            type=int,
+            action='append',
+            help='The datasets of this catalogue id (can be repeated)'
+        )
+        parser.add_argument('--output', required=True, help='ZIP file to write')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Rendering processes, 1 renders in this process (default: number of CPUs)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['organization'] and not options['catalogue']:
+            raise CommandError('Give at least one --organization or --catalogue')
+
+        if options['workers'] < 1:
+            raise CommandError('--workers must be positive')
+
+        datasets = Dataset.objects.filter(dq_assessment__isnull=False)
+        if options['organization']:
+            datasets = datasets.filter(organization_id__in=options['organization'])
+        if options['catalogue']:
+            datasets = datasets.filter(catalogue_id__in=options['catalogue'])
+
+        dataset_ids = list(datasets.order_by('id').values_list('id', flat=True))
+        self.stdout.write(f'Exporting {len(dataset_ids)} PDFs with {options["workers"]} worker(s)')
+
+        start = time.monotonic()
+
+        def report_progress(done: int, total: int) -> None:
+            elapsed = time.monotonic() - start
+            rate = done / elapsed if elapsed else 0
+
+            self.stdout.write(f'{done}/{total} PDFs ({rate:.1f}/s)')
+
+        # Written to a temporary file first so an interruption never leaves a truncated ZIP
+        temporary_path = f'{options["output"]}.tmp'
+
+        with open(temporary_path, 'wb') as zip_file:
+            for chunk in iter_pdf_zip(dataset_ids, workers=options['workers'], progress=report_progress):
+                zip_file.write(chunk)
+
+        os.replace(temporary_path, options['output'])
+
+        self.stdout.write(self.style.SUCCESS(f'{len(dataset_ids)} PDFs written to {options["output"]}'))
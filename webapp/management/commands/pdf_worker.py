@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from code.label.artifacts import artifact_store
+from code.label.pdf_creator import get_pdf_creator
+from code.label.pdf_export import run_pdf_export_job
+from code.label.pdf_jobs import claim_next_pdf_export_job, claim_next_pdf_job, purge_expired_pdf_jobs, \
+    requeue_stale_pdf_jobs, run_pdf_job
+from webapp.models import PDFExportJob
+
+
+class Command(BaseCommand):
+    help = 'Renders the queued PDF reports (PDFJob) and ZIP exports (PDFExportJob) one after the other, so the web ' \
+           'workers never render them. Several workers can run at the same time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait when no job is queued (default 2)'
+        )
+        parser.add_argument('--once', action='store_true', help='Stop when no job is queued')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Stop after rendering this many jobs')
+
+    def handle(self, *args, **options):
+        if options['poll_interval'] <= 0 or (options['max_jobs'] is not None and options['max_jobs'] < 1):
+            raise CommandError('--poll-interval and --max-jobs must be positive')
+
+        # Templates compiled before the first job
+        get_pdf_creator()
+
+        rendered = 0
+
+        try:
+            while options['max_jobs'] is None or rendered < options['max_jobs']:
+                # Long running process, the connections closed by the database server are replaced
+                close_old_connections()
+
+                stale = requeue_stale_pdf_jobs()
+                if stale:
+                    self.stdout.write(self.style.WARNING(f'{stale} stale PDF jobs queued again or failed'))
+
+                # The reports of a single dataset first, they are waited for on the label page
+                job = claim_next_pdf_job() or claim_next_pdf_export_job()
+
+                if job is None:
+                    if options['once']:
+                        break
+
+                    purge_expired_pdf_jobs()
+                    # The web workers only scan the artifact store every few artifacts they store
+                    artifact_store.evict()
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                start = time.perf_counter()
+
+                if isinstance(job, PDFExportJob):
+                    run_pdf_export_job(job)
+                    description = f'PDF export job {job.id} of organization {job.organization_id}'
+                else:
+                    run_pdf_job(job)
+                    description = f'PDF job {job.id} of dataset {job.dataset_id}'
+
+                rendered += 1
+
+                self.stdout.write(
+                    f'{description}: {job.get_status_display()} in {time.perf_counter() - start:.1f} s'
+                )
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'{rendered} PDF jobs rendered'))
@@ -0,0 +1,232 @@
+import json
+import os
+import time
+from collections import deque
+from multiprocessing import Pool
+from typing import Iterator, Optional
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from code.label.catalogue import bump_catalogue_generation, current_catalogue_generation, get_catalogue_snapshot
+from code.label.materialization import REFRESH_CHUNK_SIZE, score_assessment_answers, store_scored_assessments
+from code.label.scoring import ScoringEngine
+from webapp.models import DQAssessment
+
+DEFAULT_CHECKPOINT = settings.BASE_DIR / '.recompute_scores.json'
+
+# Engine of each worker process, set by _init_worker
+_worker_engine = None
+
+
+def _init_worker(engine: ScoringEngine) -> None:
+    global _worker_engine
+
+    # Processes started with "spawn" do not inherit the configured Django
+    if not apps.ready:
+        django.setup()
+
+    # Connections inherited with "fork" can not be shared with the parent, each worker opens its own
+    connections.close_all()
+
+    _worker_engine = engine
+
+
+def _score_chunk(assessment_ids: list, engine: Optional[ScoringEngine] = None) -> tuple:
+    """
+        (assessment ids, answer matrix, scores) of the chunk, the answers are needed to detect the assessments
+        saved while the chunk was scored
+    """
+    if engine is None:
+        engine = _worker_engine
+
+    answers = engine.assessments_answers(assessment_ids)
+
+    return assessment_ids, answers, score_assessment_answers(assessment_ids, answers, engine)
+
+
+def _chunks(ids: Iterator[int], size: int) -> Iterator[list]:
+    chunk = []
+
+    for assessment_id in ids:
+        chunk.append(assessment_id)
+
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the materialized scores of the DQ assessments with the current catalogue, e.g. after ' \
+           'a change of the metric weights or dimension relevance made in SQL. The catalogue generation is ' \
+           'increased first, so the running processes reload it. An interrupted run is resumed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organization',
+            type=int,
+            action='append',
+            help='Only the assessments of the datasets of this organization id (can be repeated)'
+        )
+        parser.add_argument(
+            '--catalogue',
+            type=int,
+            action='append',
+            help='Only the assessments of the datasets of this catalogue id (can be repeated)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=REFRESH_CHUNK_SIZE,
+            help=f'Assessments scored and stored together (default {REFRESH_CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Scoring processes, 1 scores in this process (default: number of CPUs)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=str(DEFAULT_CHECKPOINT),
+            help='File storing the progress of the run, removed once it finishes'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint of a previous interrupted run'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        workers = options['workers']
+
+        if chunk_size < 1 or workers < 1:
+            raise CommandError('--chunk-size and --workers must be positive')
+
+        filters = {
+            'organization': sorted(options['organization'] or []),
+            'catalogue': sorted(options['catalogue'] or [])
+        }
+
+        last_id = self._resume_from(
+            options['checkpoint'], filters, current_catalogue_generation(), options['restart']
+        )
+
+        if last_id is None:
+            # Changes made in SQL fire no signal, the web workers would keep scoring with their old snapshot and
+            # the labels and PDFs stored for it would still be served. An interrupted run already increased it.
+            bump_catalogue_generation()
+
+        snapshot = get_catalogue_snapshot()
+
+        assessments = DQAssessment.objects.all()
+        if filters['organization']:
+            assessments = assessments.filter(dataset__organization_id__in=filters['organization'])
+        if filters['catalogue']:
+            assessments = assessments.filter(dataset__catalogue_id__in=filters['catalogue'])
+        if last_id is not None:
+            assessments = assessments.filter(id__gt=last_id)
+
+        total = assessments.count()
+        self.stdout.write(f'Recomputing {total} assessments with {workers} worker(s)')
+
+        assessment_ids = assessments.order_by('id').values_list('id', flat=True).iterator(chunk_size=chunk_size)
+        chunks = _chunks(assessment_ids, chunk_size)
+
+        progress = {'done': 0, 'total': total, 'start': time.monotonic()}
+        checkpoint = {'filters': filters, 'generation': snapshot.generation, 'last_id': last_id}
+
+        if workers == 1:
+            for chunk in chunks:
+                self._store(_score_chunk(chunk, snapshot.engine), snapshot.engine, checkpoint, options, progress)
+        else:
+            self._recompute_in_pool(chunks, snapshot.engine, workers, checkpoint, options, progress)
+
+        if os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+
+        self.stdout.write(self.style.SUCCESS(f'{progress["done"]} assessments recomputed'))
+
+    def _recompute_in_pool(
+            self,
+            chunks: Iterator[list],
+            engine: ScoringEngine,
+            workers: int,
+            checkpoint: dict,
+            options: dict,
+            progress: dict
+    ) -> None:
+        # The forked workers must not inherit the connection of this process
+        connections.close_all()
+
+        with Pool(workers, initializer=_init_worker, initargs=(engine,)) as pool:
+            # Results are stored in order so the checkpoint is always the end of a fully stored prefix,
+            # with a bounded amount of chunks in flight
+            pending = deque()
+
+            for chunk in chunks:
+                pending.append(pool.apply_async(_score_chunk, (chunk,)))
+
+                if len(pending) >= workers * 2:
+                    self._store(pending.popleft().get(), engine, checkpoint, options, progress)
+
+            while pending:
+                self._store(pending.popleft().get(), engine, checkpoint, options, progress)
+
+    def _store(self, scored_chunk: tuple, engine: ScoringEngine, checkpoint: dict, options: dict,
+               progress: dict) -> None:
+        assessment_ids, answers, results = scored_chunk
+
+        # Locked while stored, a concurrent save of an assessment of the chunk is not overwritten
+        store_scored_assessments(assessment_ids, answers, results, engine)
+
+        checkpoint['last_id'] = assessment_ids[-1]
+        self._write_checkpoint(options['checkpoint'], checkpoint)
+
+        progress['done'] += len(assessment_ids)
+        elapsed = time.monotonic() - progress['start']
+        rate = progress['done'] / elapsed if elapsed else 0
+
+        self.stdout.write(f'{progress["done"]}/{progress["total"]} assessments ({rate:.0f}/s)')
+
+    def _resume_from(self, path: str, filters: dict, generation: int, restart: bool) -> Optional[int]:
+        """
+            Last assessment id stored by a previous interrupted run with the same filters and catalogue, or
+            None to start from the beginning
+        """
+        if restart or not os.path.exists(path):
+            return None
+
+        with open(path) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+
+        if checkpoint.get('filters') != filters:
+            raise CommandError(
+                f'The checkpoint {path} belongs to a run with other filters ({checkpoint.get("filters")}), '
+                f'use --restart to discard it'
+            )
+
+        if checkpoint.get('generation') != generation:
+            self.stdout.write('The catalogue changed since the interrupted run, starting from the beginning')
+            return None
+
+        self.stdout.write(f'Resuming after assessment {checkpoint["last_id"]}')
+
+        return checkpoint['last_id']
+
+    @staticmethod
+    def _write_checkpoint(path: str, checkpoint: dict) -> None:
+        # Written to a temporary file first so an interruption never leaves a truncated checkpoint
+        temporary_path = f'{path}.tmp'
+
+        with open(temporary_path, 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+
+        os.replace(temporary_path, path)
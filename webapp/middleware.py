@@ -0,0 +1,155 @@
+import logging
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+logger = logging.getLogger('webapp.queries')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def normalize_query(sql: str) -> str:
+    """
+    Shape of a SQL statement: literals and parameters become "?" and IN lists of any length are the same
+    """
+    shape = sql.replace('%s', '?')
+    shape = _STRING_LITERAL.sub('?', shape)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _PLACEHOLDER_LIST.sub('(?...)', shape)
+
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+def _call_site() -> str:
+    """
+    First frame of the project code (not an installed library, not this module) that runs the query
+    """
+    frame = sys._getframe(2)
+    base_directory = str(settings.BASE_DIR)
+
+    while frame is not None:
+        filename = frame.f_code.co_filename
+
+        if filename.startswith(base_directory) and filename != __file__ and 'site-packages' not in filename:
+            return f'{os.path.relpath(filename, base_directory)}:{frame.f_lineno} in {frame.f_code.co_name}'
+
+        frame = frame.f_back
+
+    return 'unknown'
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper recording the duration, shape and call site of every statement
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        # Shape -> call site -> amount of statements
+        self.shapes = defaultdict(lambda: defaultdict(int))
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[normalize_query(sql)][_call_site()] += 1
+
+    def repeated_shapes(self, threshold: int) -> list:
+        """
+        (amount, shape, call sites) of the shapes executed at least threshold times, most repeated first
+        """
+        repeated = []
+
+        for shape, call_sites in self.shapes.items():
+            amount = sum(call_sites.values())
+
+            if amount >= threshold:
+                repeated.append((amount, shape, dict(call_sites)))
+
+        return sorted(repeated, key=lambda repetition: repetition[0], reverse=True)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Records the SQL statements of every request (QUERY_INSTRUMENTATION setting). Logs the statements repeated
+    inside a loop (N+1) with their call site, checks the query budget of the view (QUERY_BUDGETS) and reports
+    the database time and amount of queries in the Server-Timing header.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        recorder = QueryRecorder()
+
+        with ExitStack() as stack:
+            # Connection handlers of this thread, the database connection itself may be opened later
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+
+            response = self.get_response(request)
+
+        view_name = _view_name(request)
+
+        logger.info(
+            '%s %s (%s): %d queries in %.1f ms',
+            request.method, request.path, view_name, recorder.count, recorder.duration * 1000
+        )
+
+        for amount, shape, call_sites in recorder.repeated_shapes(settings.QUERY_REPEAT_THRESHOLD):
+            sites = ', '.join(f'{site} ({count}x)' for site, count in call_sites.items())
+            logger.warning('Repeated query in %s, %dx: %s at %s', view_name, amount, shape, sites)
+
+        self._check_budget(view_name, recorder.count)
+
+        server_timing = f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"'
+        if response.has_header('Server-Timing'):
+            server_timing = f'{response["Server-Timing"]}, {server_timing}'
+        response['Server-Timing'] = server_timing
+
+        return response
+
+    @staticmethod
+    def _check_budget(view_name: Optional[str], query_count: int) -> None:
+        budget = settings.QUERY_BUDGETS.get(view_name, settings.QUERY_BUDGET_DEFAULT)
+
+        if budget is None or query_count <= budget:
+            return
+
+        message = f'{view_name} ran {query_count} queries, its budget is {budget}'
+
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+
+        logger.warning(message)
+
+
+def _view_name(request: HttpRequest) -> Optional[str]:
+    resolver_match = getattr(request, 'resolver_match', None)
+
+    return resolver_match.view_name if resolver_match is not None else None
+
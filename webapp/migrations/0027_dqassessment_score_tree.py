@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webapp', '0026_dqmetric_needs_report_url_dqmetricvalue_report_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dqassessment',
+            name='answered_metrics',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dqassessment',
+            name='score_tree',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
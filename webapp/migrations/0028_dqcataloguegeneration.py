@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webapp', '0027_dqassessment_score_tree'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DQCatalogueGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generation', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
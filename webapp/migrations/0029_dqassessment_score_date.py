@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webapp', '0028_dqcataloguegeneration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dqassessment',
+            name='score_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dqcataloguegeneration',
+            name='modified',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webapp', '0030_pdfjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfjob',
+            name='artifact_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -125,6 +125,12 @@ class DQAssessment(models.Model):
     start_date = models.DateTimeField()
     end_date = models.DateTimeField(blank=True, null=True)
     score = models.FloatField(blank=True, null=True)
+    # Materialized score tree (category -> dimension -> metric scores) and number of answered metrics,
+    # kept up to date by the signals in webapp.signals
+    score_tree = models.JSONField(blank=True, null=True)
+    answered_metrics = models.IntegerField(blank=True, null=True)
+    # Last time the materialized scores were stored
+    score_date = models.DateTimeField(blank=True, null=True)
     rdf = models.TextField(blank=True, null=True)
     fdp_id = models.CharField(max_length=256, default=None, null=True, blank=True)
 
@@ -200,3 +206,112 @@ class DQMetricValue(models.Model):
 
     def __str__(self):
         return f'{self.dq_assessment.id} - {self.dq_metric.definition} - {self.value}'
+
+
+class DQCatalogueGeneration(models.Model):
+    """
+    Single row counter increased on every change of the DQ catalogue (categories, dimensions, metrics and
+    categorical levels), so every worker process knows when its in-memory catalogue snapshot is outdated
+    """
+    generation = models.IntegerField(default=0)
+    # Last time the generation was increased
+    modified = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f'DQ catalogue generation {self.generation}'
+
+
+class PDFJob(models.Model):
+    """
+    PDF report of a dataset assessment, rendered by the pdf_worker command instead of the web workers
+    """
+    status = models.CharField(
+        choices=[
+            ('Q', 'Queued'),
+            ('R', 'Running'),
+            ('D', 'Done'),
+            ('F', 'Failed')
+        ],
+        max_length=1,
+        default='Q'
+    )
+    dataset = models.ForeignKey(
+        'Dataset',
+        on_delete=models.CASCADE
+    )
+    organization = models.ForeignKey(
+        'Organization',
+        on_delete=models.CASCADE
+    )
+    requested_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True
+    )
+    # Rendered pages, in percentage
+    progress = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    file = models.FileField(upload_to='pdf_jobs/', blank=True, null=True)
+    # PDF in the artifact store, downloaded from there without a copy in the file
+    artifact_key = models.CharField(max_length=64, blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(blank=True, null=True)
+    finished = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created'])
+        ]
+
+    def __str__(self):
+        return f'PDF job {self.id} - {self.dataset_id} - {self.get_status_display()}'
+
+
+class PDFExportJob(models.Model):
+    """
+    ZIP with the PDF report of every assessed dataset of an organization, or of one of its catalogues, built by the
+    pdf_worker command instead of the web workers
+    """
+    status = models.CharField(
+        choices=[
+            ('Q', 'Queued'),
+            ('R', 'Running'),
+            ('D', 'Done'),
+            ('F', 'Failed')
+        ],
+        max_length=1,
+        default='Q'
+    )
+    organization = models.ForeignKey(
+        'Organization',
+        on_delete=models.CASCADE
+    )
+    # Only the datasets of this catalogue when set
+    catalogue = models.ForeignKey(
+        'Catalogue',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True
+    )
+    requested_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True
+    )
+    # Rendered PDFs, in percentage
+    progress = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    file = models.FileField(upload_to='pdf_exports/', blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(blank=True, null=True)
+    finished = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created'])
+        ]
+
+    def __str__(self):
+        return f'PDF export job {self.id} - {self.organization_id} - {self.get_status_display()}'
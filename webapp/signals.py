@@ -0,0 +1,145 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from code.label.catalogue import bump_catalogue_generation
+from code.label.label import invalidate_maturity_plot
+from code.label.materialization import schedule_assessment_refresh, schedule_all_assessment_refresh
+from webapp.models import DQMetricValue, DQMetric, DQCategoricalMetric, DQDimension, DQCategoricalMetricCategory, \
+    EHDSCategory, MaturityDimension, MaturityDimensionLevel, MaturityDimensionValue
+
+
+def _started_deletion(instance, origin) -> bool:
+    """
+    True if the instance is the one (or in the queryset) being deleted, False if it is deleted in cascade
+    """
+    if isinstance(origin, QuerySet):
+        return origin.model is type(instance)
+
+    return origin is instance
+
+
+# Materialized scores of one assessment
+@receiver(post_save, sender=DQMetricValue)
+def refresh_assessment_score_on_save(sender, instance: DQMetricValue, **kwargs):
+    schedule_assessment_refresh(instance.dq_assessment_id)
+
+
+@receiver(post_delete, sender=DQMetricValue)
+def refresh_assessment_score_on_delete(sender, instance: DQMetricValue, origin=None, **kwargs):
+    # Values deleted in cascade belong to a deleted assessment or to a catalogue change refreshing everything
+    if _started_deletion(instance, origin):
+        schedule_assessment_refresh(instance.dq_assessment_id)
+
+
+# Materialized scores of every assessment, the scoring catalogue has changed. The materialized score trees are
+# keyed by the category and dimension names and the metric definitions, renaming them also changes the scores.
+@receiver(pre_save, sender=DQMetric)
+@receiver(pre_save, sender=DQCategoricalMetric)
+def store_previous_metric_weight(sender, instance: DQMetric, **kwargs):
+    instance._previous_scoring_fields = DQMetric.objects.filter(pk=instance.pk).values(
+        'weight', 'dq_dimension_id', 'definition'
+    ).first()
+
+
+@receiver(pre_save, sender=DQDimension)
+def store_previous_dimension_relevance(sender, instance: DQDimension, **kwargs):
+    instance._previous_scoring_fields = DQDimension.objects.filter(pk=instance.pk).values(
+        'relevance', 'ehds_category_id', 'name'
+    ).first()
+
+
+@receiver(pre_save, sender=EHDSCategory)
+def store_previous_category_name(sender, instance: EHDSCategory, **kwargs):
+    instance._previous_scoring_fields = EHDSCategory.objects.filter(pk=instance.pk).values('name').first()
+
+
+@receiver(post_save, sender=DQMetric)
+@receiver(post_save, sender=DQCategoricalMetric)
+def refresh_scores_on_metric_change(sender, instance: DQMetric, created: bool, **kwargs):
+    previous = getattr(instance, '_previous_scoring_fields', None)
+    current = {
+        'weight': instance.weight,
+        'dq_dimension_id': instance.dq_dimension_id,
+        'definition': instance.definition
+    }
+
+    if created or previous != current:
+        schedule_all_assessment_refresh()
+
+
+@receiver(post_save, sender=DQDimension)
+def refresh_scores_on_dimension_change(sender, instance: DQDimension, created: bool, **kwargs):
+    previous = getattr(instance, '_previous_scoring_fields', None)
+    current = {
+        'relevance': instance.relevance,
+        'ehds_category_id': instance.ehds_category_id,
+        'name': instance.name
+    }
+
+    if created or previous != current:
+        schedule_all_assessment_refresh()
+
+
+@receiver(post_save, sender=EHDSCategory)
+def refresh_scores_on_category_change(sender, instance: EHDSCategory, created: bool, **kwargs):
+    previous = getattr(instance, '_previous_scoring_fields', None)
+
+    if created or previous != {'name': instance.name}:
+        schedule_all_assessment_refresh()
+
+
+@receiver(post_save, sender=DQCategoricalMetricCategory)
+def refresh_scores_on_metric_category_change(sender, instance: DQCategoricalMetricCategory, created: bool, **kwargs):
+    # Only the amount of levels of a categorical metric changes the scores
+    if created:
+        schedule_all_assessment_refresh()
+
+
+@receiver(post_delete, sender=EHDSCategory)
+@receiver(post_delete, sender=DQDimension)
+@receiver(post_delete, sender=DQMetric)
+@receiver(post_delete, sender=DQCategoricalMetric)
+@receiver(post_delete, sender=DQCategoricalMetricCategory)
+def refresh_scores_on_catalogue_delete(sender, instance, origin=None, **kwargs):
+    # A single refresh for the deleted object, not for every object deleted with it in cascade
+    if _started_deletion(instance, origin):
+        schedule_all_assessment_refresh()
+
+
+# Cached maturity plots of the organization, the ones of every organization are outdated by the catalogue
+# generation when the maturity dimensions or levels change
+@receiver(pre_save, sender=MaturityDimensionValue)
+def store_previous_maturity_organization(sender, instance: MaturityDimensionValue, **kwargs):
+    instance._previous_organization_id = MaturityDimensionValue.objects.filter(pk=instance.pk).values_list(
+        'maturity_organization_id', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=MaturityDimensionValue)
+@receiver(post_delete, sender=MaturityDimensionValue)
+def invalidate_maturity_plot_on_value_change(sender, instance: MaturityDimensionValue, **kwargs):
+    invalidate_maturity_plot(instance.maturity_organization_id)
+
+    previous_organization_id = getattr(instance, '_previous_organization_id', None)
+    if previous_organization_id not in (None, instance.maturity_organization_id):
+        invalidate_maturity_plot(previous_organization_id)
+
+
+# In-memory catalogue snapshots of every process are outdated
+@receiver(post_save, sender=EHDSCategory)
+@receiver(post_save, sender=DQDimension)
+@receiver(post_save, sender=DQMetric)
+@receiver(post_save, sender=DQCategoricalMetric)
+@receiver(post_save, sender=DQCategoricalMetricCategory)
+@receiver(post_save, sender=MaturityDimension)
+@receiver(post_save, sender=MaturityDimensionLevel)
+@receiver(post_delete, sender=EHDSCategory)
+@receiver(post_delete, sender=DQDimension)
+@receiver(post_delete, sender=DQMetric)
+@receiver(post_delete, sender=DQCategoricalMetric)
+@receiver(post_delete, sender=DQCategoricalMetricCategory)
+@receiver(post_delete, sender=MaturityDimension)
+@receiver(post_delete, sender=MaturityDimensionLevel)
+def invalidate_catalogue_snapshot(sender, instance, **kwargs):
+    bump_catalogue_generation()
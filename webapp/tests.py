@@ -1,3 +1,741 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+from unittest import mock, skipIf
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, override_settings, tag
+from django.utils import timezone
+
+from code.helpers.django import compute_amount_of_stars, compute_amounts_of_stars
+from code.label.artifacts import ArtifactBackend, ArtifactStore, LocalArtifactBackend, create_artifact_store, \
+    pdf_artifact_key
+from code.label.catalogue import get_catalogue_snapshot
+from code.label.label import compute_scores, plot_label, plot_maturity
+from code.label.materialization import compute_assessment_scores, refresh_all_assessment_scores, \
+    store_scored_assessments
+from code.label.pdf_creator import PDFCreator, get_pdf_creator
+from code.label.pdf_export import run_pdf_export_job
+from code.label.pdf_jobs import claim_next_pdf_export_job, enqueue_pdf_job
+from code.label.scoring import ScoringEngine
+from code.label.simulation import SimulationError, scenario_answer_matrix
+from webapp.management.commands.benchmark_scoring import DEFAULT_BASELINES, DEFAULT_DATASETS, DEFAULT_REPEAT, \
+    DEFAULT_TOLERANCE, Command as BenchmarkScoringCommand
+from webapp.models import Catalogue, Dataset, DQAssessment, DQCategoricalMetric, DQCategoricalMetricCategory, \
+    DQDimension, DQMetric, DQMetricValue, EHDSCategory, Organization, PDFExportJob, PDFJob, UserOrganization
+
+try:
+    from weasyprint.formatting_structure.boxes import TextBox
+except OSError:
+    # WeasyPrint is installed without the pango library
+    TextBox = None
+
+
+def create_catalogue_fixture() -> dict:
+    """
+        Small DQ catalogue with a zero relevance dimension, categorical metrics of 2, 3 and 5 levels and a
+        non-categorical metric, and the assessments answering it in several ways
+    """
+    quality = EHDSCategory.objects.create(name='Quality')
+    utility = EHDSCategory.objects.create(name='Utility')
+
+    completeness = DQDimension.objects.create(name='Completeness', definition='', relevance=3, ehds_category=quality)
+    accuracy = DQDimension.objects.create(name='Accuracy', definition='', relevance=2, ehds_category=quality)
+    ignored = DQDimension.objects.create(name='Ignored', definition='', relevance=0, ehds_category=utility)
+    coverage = DQDimension.objects.create(name='Coverage', definition='', relevance=5, ehds_category=utility)
+
+    metrics = {}
+    for name, dimension, weight, levels in [
+        ('missing values', completeness, 40, 3),
+        ('mandatory fields', completeness, 60, 2),
+        ('plausibility', accuracy, 100, 5),
+        ('ignored', ignored, 100, 3),
+        ('population', coverage, 70, 3),
+        ('time span', coverage, 30, 5),
+    ]:
+        metric = DQCategoricalMetric.objects.create(name=name, definition=name, weight=weight, dq_dimension=dimension)
+        for value in range(levels):
+            DQCategoricalMetricCategory.objects.create(value=value, text=str(value), dq_categorical_metric=metric)
+
+        metrics[name] = metric
+
+    # Never answered, it only shows in the score tree
+    metrics['free text'] = DQMetric.objects.create(
+        name='free text', definition='free text', weight=10, dq_dimension=accuracy
+    )
+
+    organization = Organization.objects.create(name='Hospital')
+    user = User.objects.create(username='owner')
+    catalogue = Catalogue.objects.create(title='Catalogue', version=1, part_of='', user=user)
+
+    datasets = {}
+    for name, answers in [
+        ('complete', {'missing values': '2', 'mandatory fields': '1', 'plausibility': '4', 'ignored': '2',
+                      'population': '2', 'time span': '4'}),
+        ('partial', {'missing values': '1', 'plausibility': '2', 'ignored': '1', 'time span': '3'}),
+        ('empty values', {'missing values': '', 'mandatory fields': '0', 'population': ''}),
+        ('unanswered', {}),
+    ]:
+        assessment = DQAssessment.objects.create(start_date=timezone.now())
+        for metric_name, value in answers.items():
+            DQMetricValue.objects.create(value=value, dq_metric=metrics[metric_name], dq_assessment=assessment)
+
+        datasets[name] = Dataset.objects.create(
+            name=name, description='', version=1, dq_assessment=assessment, organization=organization,
+            catalogue=catalogue
+        )
+
+    datasets['without assessment'] = Dataset.objects.create(
+        name='without assessment', description='', version=1, organization=organization, catalogue=catalogue
+    )
+
+    return datasets
+
+
+def per_object_scores(dataset: Dataset) -> tuple[dict, float]:
+    """
+        Reference scoring walking the catalogue object by object, as compute_scores did before the ScoringEngine
+    """
+    dimensions_total_relevance = DQDimension.objects.aggregate(Sum('relevance'))['relevance__sum']
+
+    results = {}
+    total_score = 0
+    assessment = dataset.dq_assessment
+    for category in EHDSCategory.objects.all():
+        results[category.name] = {
+            'relevance': 0,
+            'dimensions': {},
+            'score': 0
+        }
+
+        for dimension in DQDimension.objects.filter(ehds_category=category):
+            dimension_relevance = (dimension.relevance / dimensions_total_relevance)
+            results[category.name]['dimensions'][dimension.name] = {
+                'relevance': dimension_relevance,
+                'metrics': {},
+                'score': 0
+            }
+            results[category.name]['relevance'] += (dimension_relevance * 100)
+
+            for metric in DQMetric.objects.filter(dq_dimension=dimension):
+                results[category.name]['dimensions'][dimension.name]['metrics'][metric.definition] = {
+                    'weight': int(metric.weight),
+                    'score': 0
+                }
+                metric_score = 0
+
+                dq_metric_value = DQMetricValue.objects.filter(dq_assessment=assessment, dq_metric=metric)
+
+                if len(dq_metric_value) >= 1:
+                    current_value = str(dq_metric_value.first().value)
+
+                    if getattr(metric, 'dqcategoricalmetric') is not None and current_value:
+                        current_value = int(current_value)
+                        metric_categories = DQCategoricalMetricCategory.objects.filter(
+                            dq_categorical_metric=metric
+                        ).count()
+
+                        metric_score = current_value / (metric_categories - 1)
+                    metric_score = metric_score * metric.weight * results[category.name]['dimensions'][dimension.name][
+                        'relevance']
+                    results[category.name]['dimensions'][dimension.name]['metrics'][metric.definition][
+                        'score'] = metric_score
+                    results[category.name]['dimensions'][dimension.name]['score'] += metric_score
+                    results[category.name]['score'] += metric_score
+
+            total_score += results[category.name]['dimensions'][dimension.name]['score']
+
+    return results, total_score
+
+
+class ScoringEngineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datasets = create_catalogue_fixture()
+
+    def assertScoreTreeEqual(self, tree: dict, expected: dict):
+        self.assertEqual(tree.keys(), expected.keys())
+
+        for category_name, category in expected.items():
+            self.assertAlmostEqual(tree[category_name]['relevance'], category['relevance'])
+            self.assertAlmostEqual(tree[category_name]['score'], category['score'])
+            self.assertEqual(tree[category_name]['dimensions'].keys(), category['dimensions'].keys())
+
+            for dimension_name, dimension in category['dimensions'].items():
+                scored_dimension = tree[category_name]['dimensions'][dimension_name]
+                self.assertAlmostEqual(scored_dimension['relevance'], dimension['relevance'])
+                self.assertAlmostEqual(scored_dimension['score'], dimension['score'])
+                self.assertEqual(scored_dimension['metrics'].keys(), dimension['metrics'].keys())
+
+                for metric_name, metric in dimension['metrics'].items():
+                    self.assertEqual(scored_dimension['metrics'][metric_name]['weight'], metric['weight'])
+                    self.assertAlmostEqual(scored_dimension['metrics'][metric_name]['score'], metric['score'])
+
+    def test_compute_scores_matches_per_object_scoring(self):
+        for name, dataset in self.datasets.items():
+            with self.subTest(dataset=name):
+                tree, total_score = compute_scores(dataset)
+                expected_tree, expected_total_score = per_object_scores(dataset)
+
+                self.assertScoreTreeEqual(tree, expected_tree)
+                self.assertAlmostEqual(total_score, expected_total_score)
+
+    def test_zero_relevance_dimension_scores_nothing(self):
+        tree, _ = compute_scores(self.datasets['complete'])
+
+        self.assertEqual(tree['Utility']['dimensions']['Ignored']['score'], 0)
+        self.assertEqual(tree['Utility']['dimensions']['Ignored']['metrics']['ignored']['score'], 0)
+
+    def test_unanswered_assessment_scores_zero(self):
+        for name in ['unanswered', 'without assessment']:
+            with self.subTest(dataset=name):
+                _, total_score = compute_scores(self.datasets[name])
+
+                self.assertEqual(total_score, 0)
+
+    def test_batch_scores_match_single_scores(self):
+        engine = ScoringEngine.from_database()
+        datasets = [dataset for dataset in self.datasets.values() if dataset.dq_assessment_id is not None]
+
+        answers = engine.assessments_answers([dataset.dq_assessment_id for dataset in datasets])
+        total_scores = engine.total_scores(answers)
+
+        for dataset, total_score in zip(datasets, total_scores):
+            with self.subTest(dataset=dataset.name):
+                self.assertEqual(total_score, engine.score(engine.assessment_answers(dataset.dq_assessment))[1])
+
+
+class CatalogueChangeRefreshTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datasets = create_catalogue_fixture()
+
+    @staticmethod
+    def scheduled_full_refreshes() -> int:
+        return sum(
+            callback is refresh_all_assessment_scores
+            for _, callback, *_ in transaction.get_connection().run_on_commit
+        )
+
+    def test_catalogue_changes_refresh_scores_once_after_commit(self):
+        assessment = self.datasets['complete'].dq_assessment
+        assessment.refresh_from_db()
+        previous_score = assessment.score
+
+        for metric in DQMetric.objects.all():
+            metric.weight *= 2
+            metric.save()
+
+        DQDimension.objects.filter(name='Coverage').first().delete()
+
+        # Nothing is rescored inside the transaction changing the catalogue, a single refresh waits for the commit
+        assessment.refresh_from_db()
+        self.assertEqual(assessment.score, previous_score)
+        self.assertEqual(self.scheduled_full_refreshes(), 1)
+
+        refresh_all_assessment_scores()
+
+        assessment.refresh_from_db()
+        self.assertAlmostEqual(assessment.score, compute_scores(self.datasets['complete'])[1])
+        self.assertNotAlmostEqual(assessment.score, previous_score)
+
+    def test_rolled_back_change_does_not_prevent_the_refresh(self):
+        with transaction.atomic():
+            # Forget the refresh scheduled while creating the fixture
+            transaction.get_connection().run_on_commit.clear()
+
+            try:
+                with transaction.atomic():
+                    DQDimension.objects.get(name='Completeness').delete()
+                    raise ValueError
+            except ValueError:
+                pass
+
+            self.assertEqual(self.scheduled_full_refreshes(), 0)
+
+            metric = DQMetric.objects.get(name='plausibility')
+            metric.weight = 1
+            metric.save()
+
+            self.assertEqual(self.scheduled_full_refreshes(), 1)
+
+
+    def test_renamed_catalogue_objects_refresh_the_score_trees(self):
+        transaction.get_connection().run_on_commit.clear()
+
+        category = EHDSCategory.objects.get(name='Quality')
+        category.name = 'Data quality'
+        category.save()
+
+        dimension = DQDimension.objects.get(name='Accuracy')
+        dimension.name = 'Correctness'
+        dimension.save()
+
+        metric = DQMetric.objects.get(name='plausibility')
+        metric.definition = 'plausible values'
+        metric.save()
+
+        self.assertEqual(self.scheduled_full_refreshes(), 1)
+
+        refresh_all_assessment_scores()
+
+        tree = DQAssessment.objects.get(id=self.datasets['complete'].dq_assessment_id).score_tree
+        self.assertEqual(tree, per_object_scores(self.datasets['complete'])[0])
+        self.assertIn('plausible values', tree['Data quality']['dimensions']['Correctness']['metrics'])
+
+    def test_unchanged_catalogue_objects_do_not_refresh_the_scores(self):
+        transaction.get_connection().run_on_commit.clear()
+
+        for model in [EHDSCategory, DQDimension, DQMetric]:
+            for instance in model.objects.all():
+                instance.save()
+
+        self.assertEqual(self.scheduled_full_refreshes(), 0)
+
+
+class StoreScoredAssessmentsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datasets = create_catalogue_fixture()
+
+    def test_scores_of_assessments_saved_meanwhile_are_not_overwritten(self):
+        engine = ScoringEngine.from_database()
+        assessment_ids = [self.datasets[name].dq_assessment_id for name in ['complete', 'partial', 'unanswered']]
+        answers = engine.assessments_answers(assessment_ids)
+        results = compute_assessment_scores(assessment_ids, engine)
+
+        # Saved after the batch read the answers, the signals store its new score
+        DQMetricValue.objects.create(
+            value='2', dq_metric=DQMetric.objects.get(name='population'), dq_assessment_id=assessment_ids[2]
+        )
+        new_score = DQAssessment.objects.get(id=assessment_ids[2]).score
+        self.assertGreater(new_score, 0)
+
+        store_scored_assessments(assessment_ids, answers, results, engine)
+
+        self.assertEqual(DQAssessment.objects.get(id=assessment_ids[2]).score, new_score)
+        self.assertEqual(DQAssessment.objects.get(id=assessment_ids[0]).score, results[0][1])
+
+    def test_assessments_deleted_meanwhile_are_skipped(self):
+        engine = ScoringEngine.from_database()
+        assessment_ids = [self.datasets[name].dq_assessment_id for name in ['complete', 'partial']]
+        answers = engine.assessments_answers(assessment_ids)
+        results = compute_assessment_scores(assessment_ids, engine)
+
+        DQAssessment.objects.filter(id=assessment_ids[1]).delete()
+        store_scored_assessments(assessment_ids, answers, results, engine)
+
+        self.assertEqual(DQAssessment.objects.get(id=assessment_ids[0]).score, results[0][1])
+        self.assertFalse(DQAssessment.objects.filter(id=assessment_ids[1]).exists())
+
+
+class RecomputeScoresCommandTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datasets = create_catalogue_fixture()
+
+    def test_catalogue_changed_in_sql_is_reloaded(self):
+        snapshot = get_catalogue_snapshot()
+
+        # As a change of init/init.sql, no signal fires
+        DQDimension.objects.filter(name='Coverage').update(relevance=1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                'recompute_scores', workers=1, checkpoint=f'{directory}/checkpoint.json', stdout=io.StringIO()
+            )
+
+        self.assertGreater(get_catalogue_snapshot().generation, snapshot.generation)
+        self.assertIsNot(get_catalogue_snapshot(), snapshot)
+
+        dataset = self.datasets['complete']
+        score = DQAssessment.objects.get(id=dataset.dq_assessment_id).score
+        self.assertAlmostEqual(score, per_object_scores(dataset)[1])
+
+
+class SunburstSvgTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datasets = create_catalogue_fixture()
+
+        # The label can not be drawn with a dimension of zero relevance
+        DQDimension.objects.filter(name='Ignored').delete()
+
+    def test_svg_labels_embed_the_quantum_icon(self):
+        dataset = self.datasets['complete']
+
+        for svg in [plot_label(dataset, output_type='svg'), plot_maturity(dataset.organization, output_type='svg')]:
+            self.assertEqual(svg.count('<image '), 1)
+            self.assertIn('href="data:image/png;base64,', svg)
+            # Hidden under the icon in the plotly figure
+            self.assertNotIn('>QUANTUM</text>', svg)
+
+
+def document_text(document) -> list:
+    """Text laid out on every page of a WeasyPrint document"""
+    return [
+        ' '.join(box.text for box in page._page_box.descendants() if isinstance(box, TextBox))
+        for page in document.pages
+    ]
+
+
+@skipIf(TextBox is None, 'WeasyPrint can not load pango')
+class PDFRenderingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datasets = create_catalogue_fixture()
+
+        # The label can not be drawn with a dimension of zero relevance
+        DQDimension.objects.filter(name='Ignored').delete()
+
+    def test_single_pass_lays_out_the_pages_of_the_per_page_rendering(self):
+        for name in ['complete', 'partial', 'unanswered']:
+            dataset = self.datasets[name]
+            documents = []
+
+            for single_pass in [True, False]:
+                # Both reports generated at the same time
+                with mock.patch('code.label.pdf_creator.datetime') as pdf_datetime:
+                    pdf_datetime.now.return_value = datetime(2024, 1, 1)
+
+                    documents.append(PDFCreator(single_pass=single_pass).render_document(
+                        dataset, dataset.catalogue, dataset.dq_assessment, dataset.organization
+                    ))
+
+            single_pass_document, per_page_document = documents
+
+            with self.subTest(dataset=name):
+                self.assertEqual(len(single_pass_document.pages), len(per_page_document.pages))
+                self.assertEqual(document_text(single_pass_document), document_text(per_page_document))
+
+
+class ReusablePDFPagesTests(TestCase):
+
+    def test_only_pages_with_few_outputs_are_reused(self):
+        creator = PDFCreator()
+
+        # The pages showing the answers have too many different outputs
+        self.assertEqual(
+            [html_file for html_file, reusable in zip(creator.html_files, creator.reusable) if reusable],
+            ['page_2_template.html']
+        )
+
+    @override_settings(PDF_REUSABLE_PAGES_CACHE_SIZE=2)
+    def test_reused_pages_are_bounded_by_the_setting(self):
+        creator = PDFCreator()
+
+        with mock.patch.object(creator, '_render_document', side_effect=lambda pages: object()):
+            for score in range(5):
+                creator._render_reusable_page(f'<p>{score}</p>')
+
+        self.assertEqual(len(creator.reusable_pages), 2)
+
+
+class LocalArtifactBackendTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.backend = LocalArtifactBackend(directory.name, 25)
+
+    def test_store_is_scanned_once_while_under_the_limit(self):
+        with mock.patch.object(self.backend, 'evict', wraps=self.backend.evict) as evict:
+            for index in range(2):
+                self.backend.put('pdf', f'{index:02d}', io.BytesIO(b'0123456789'))
+
+        self.assertEqual(evict.call_count, 1)
+
+    def test_least_recently_used_artifacts_are_removed_over_the_limit(self):
+        for index in range(3):
+            self.backend.put('pdf', f'{index:02d}', io.BytesIO(b'0123456789'))
+            # Older artifacts were used less recently
+            os.utime(self.backend.path('pdf', f'{index:02d}'), (index, index))
+
+        self.backend.evict()
+
+        self.assertIsNone(self.backend.open('pdf', '00'))
+        with self.backend.open('pdf', '02') as artifact:
+            self.assertEqual(artifact.read(), b'0123456789')
+
+
+class ArtifactBackendTests(TestCase):
+
+    def test_incomplete_backend_can_not_be_created(self):
+        class ReadOnlyBackend(ArtifactBackend):
+            def open(self, kind: str, key: str):
+                return None
+
+        with self.assertRaises(TypeError):
+            ReadOnlyBackend()
+
+    @override_settings(ARTIFACT_STORE={'BACKEND': 'collections.Counter'})
+    def test_store_with_another_class_as_backend_is_not_created(self):
+        with self.assertRaises(ImproperlyConfigured):
+            create_artifact_store()
+
+
+class PDFJobArtifactTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = create_catalogue_fixture()['complete']
+
+        cls.user = User.objects.create_user(username='assessor', password='assessor')
+        UserOrganization.objects.create(user=cls.user, organization=cls.dataset.organization)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.store = ArtifactStore(LocalArtifactBackend(directory.name, 1024 * 1024))
+        patcher = mock.patch('code.label.pdf_jobs.artifact_store', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.key = pdf_artifact_key(self.dataset, self.dataset.catalogue, self.dataset.organization)
+        self.store.put('pdf', self.key, b'%PDF-stored')
+
+        self.client.force_login(self.user)
+
+    def test_stored_pdf_is_downloaded_from_the_artifact_store(self):
+        job = enqueue_pdf_job(self.dataset, self.dataset.organization, self.user)
+
+        self.assertEqual(job.status, 'D')
+        self.assertEqual(job.artifact_key, self.key)
+        self.assertFalse(job.file)
+
+        response = self.client.get(f'/dataset/assessment/pdf/download?id={job.id}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-stored')
+
+    def test_web_request_does_not_create_the_pdf_creator(self):
+        # No PDF creator created yet in this process
+        with mock.patch.dict('code.label.pdf_creator._pdf_creators', clear=True), \
+                mock.patch('code.label.pdf_creator.PDFCreator', side_effect=AssertionError('PDF creator created')):
+            job = enqueue_pdf_job(self.dataset, self.dataset.organization, self.user)
+
+        self.assertEqual(job.artifact_key, get_pdf_creator().artifact_key(
+            self.dataset, self.dataset.catalogue, self.dataset.organization
+        ))
+
+    def test_pdf_links_opened_with_get_still_work(self):
+        response = self.client.get(f'/dataset/assessment/pdf?id={self.dataset.id}')
+        job = PDFJob.objects.get(dataset=self.dataset)
+
+        # Already rendered, downloaded at once
+        self.assertRedirects(response, f'/dataset/assessment/pdf/download?id={job.id}', fetch_redirect_response=False)
+
+        self.store.delete('pdf', self.key)
+        response = self.client.get(f'/dataset/assessment/pdf?id={self.dataset.id}')
+
+        # Rendered by the worker meanwhile
+        self.assertRedirects(response, f'/dataset/label?id={self.dataset.id}', fetch_redirect_response=False)
+        self.assertTrue(PDFJob.objects.filter(dataset=self.dataset, status='Q').exists())
+
+    def test_evicted_pdf_is_queued_again(self):
+        job = enqueue_pdf_job(self.dataset, self.dataset.organization, self.user)
+        self.store.delete('pdf', self.key)
+
+        response = self.client.get(f'/dataset/assessment/pdf/download?id={job.id}')
+        job.refresh_from_db()
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(job.status, 'Q')
+        self.assertIsNone(job.artifact_key)
+
+
+class PDFExportJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datasets = create_catalogue_fixture()
+        cls.organization = cls.datasets['complete'].organization
+
+        cls.user = User.objects.create_user(username='assessor', password='assessor')
+        UserOrganization.objects.create(user=cls.user, organization=cls.organization)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        media = override_settings(MEDIA_ROOT=directory.name, PDF_EXPORT_WORKERS=1)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.client.force_login(self.user)
+
+    def test_export_is_queued_and_built_by_the_worker(self):
+        response = self.client.post('/organization/pdf/export')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], 'queued')
+        # Requested again while waiting
+        self.assertEqual(self.client.post('/organization/pdf/export').json()['id'], response.json()['id'])
+
+        job = claim_next_pdf_export_job()
+
+        with mock.patch('code.label.pdf_export.dataset_pdf', side_effect=lambda *args: io.BytesIO(b'%PDF')):
+            run_pdf_export_job(job)
+
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(status['status'], 'done')
+
+        response = self.client.get(status['download_url'])
+        self.assertEqual(response.status_code, 200)
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            # Every assessed dataset of the organization
+            self.assertEqual(len(archive.namelist()), 4)
+
+    @override_settings(STORAGES={
+        **settings.STORAGES,
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}
+    })
+    def test_export_jobs_can_be_inspected_in_the_admin(self):
+        job = PDFExportJob.objects.create(organization=self.organization, status='F', error='Stopped')
+        self.client.force_login(User.objects.create_superuser(username='admin', password='admin'))
+
+        response = self.client.get(f'/admin/webapp/pdfexportjob/{job.id}/change/')
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_export_of_another_organization_can_not_be_downloaded(self):
+        other_organization = Organization.objects.create(name='Other hospital')
+        job = PDFExportJob.objects.create(organization=other_organization, status='D')
+
+        response = self.client.get(f'/organization/pdf/export/status?id={job.id}')
+
+        self.assertEqual(response.status_code, 302)
+
+
+class SimulationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datasets = create_catalogue_fixture()
+
+    def setUp(self):
+        self.engine = ScoringEngine.from_database()
+        self.current_answers = self.engine.assessment_answers(self.datasets['partial'].dq_assessment)
+        self.metric_ids = [
+            DQMetric.objects.get(name='missing values').id,
+            DQMetric.objects.get(name='time span').id
+        ]
+
+    def test_level_lists_match_level_dictionaries(self):
+        levels = [[0, 4], [2, None], [None, 1]]
+
+        from_lists = scenario_answer_matrix(self.engine, self.current_answers, levels, self.metric_ids)
+        from_dictionaries = scenario_answer_matrix(
+            self.engine,
+            self.current_answers,
+            [dict(zip(self.metric_ids, scenario_levels)) for scenario_levels in levels]
+        )
+
+        self.assertTrue(np.array_equal(from_lists, from_dictionaries, equal_nan=True))
+
+    def test_level_lists_reject_what_level_dictionaries_reject(self):
+        for level in [True, 1.0, 1.5, '1', '2', ' 2 ', 3]:
+            with self.subTest(level=level):
+                with self.assertRaises(SimulationError):
+                    scenario_answer_matrix(self.engine, self.current_answers, [[level, 0]], self.metric_ids)
+
+                with self.assertRaises(SimulationError):
+                    scenario_answer_matrix(self.engine, self.current_answers, [{self.metric_ids[0]: level}])
+
+    def test_stars_of_single_and_many_scores_agree(self):
+        scores = [0, 24.9, 25, 44.9, 45, 59.9, 60, 79.9, 80, 89.9, 90, 100]
+
+        self.assertEqual(
+            [compute_amount_of_stars(score) for score in scores],
+            compute_amounts_of_stars(np.array(scores)).tolist()
+        )
+
+
+@tag('benchmark')
+class ScoringBenchmarkTests(TestCase):
+
+    @override_settings(SHARED_CATALOGUE=False)
+    def test_smallest_catalogue_has_no_regressions(self):
+        command = BenchmarkScoringCommand(stdout=io.StringIO())
+        measurements = command.benchmark_size(size=10, dataset_count=DEFAULT_DATASETS, repeat=DEFAULT_REPEAT)
+
+        self.assertEqual(command.regressions(str(DEFAULT_BASELINES), measurements, DEFAULT_TOLERANCE), [])
+
+
+class BenchmarkScoringCommandTests(TestCase):
+
+    def test_existing_test_database_is_only_deleted_with_noinput(self):
+        creation = connection.creation
+
+        for options, autoclobber in [({}, False), ({'interactive': False}, True)]:
+            with self.subTest(options=options), \
+                    mock.patch.object(creation, 'create_test_db', return_value='quantum') as create_test_db, \
+                    mock.patch.object(creation, 'destroy_test_db'), \
+                    mock.patch.object(BenchmarkScoringCommand, 'benchmark_size', return_value={}), \
+                    mock.patch.object(BenchmarkScoringCommand, '_print'), \
+                    mock.patch.object(BenchmarkScoringCommand, 'regressions', return_value=[]):
+                call_command('benchmark_scoring', sizes=[10], stdout=io.StringIO(), **options)
+
+                self.assertIs(create_test_db.call_args.kwargs['autoclobber'], autoclobber)
+
+
+@override_settings(
+    QUERY_INSTRUMENTATION=True,
+    QUERY_BUDGET_RAISE=True,
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}
+)
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datasets = create_catalogue_fixture()
+        cls.dataset = cls.datasets['complete']
+
+        # The label can not be drawn with a dimension of zero relevance
+        DQDimension.objects.filter(name='Ignored').delete()
+
+        cls.user = User.objects.create_user(username='assessor', password='assessor')
+        UserOrganization.objects.create(user=cls.user, organization=cls.dataset.organization)
+
+        cls.pdf_job = PDFJob.objects.create(
+            dataset=cls.dataset, organization=cls.dataset.organization, requested_by=cls.user
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+        # The budgets do not include rebuilding the catalogue snapshot after a catalogue change
+        get_catalogue_snapshot()
+
+    def test_hot_views_stay_within_their_query_budget(self):
+        for url, view_name in [
+            (f'/dataset/label?id={self.dataset.id}', 'webapp.views.dataset_label_view'),
+            (f'/dataset/label/json?id={self.dataset.id}', 'webapp.views.dataset_label_json_view'),
+            (f'/dataset/assessment?id={self.dataset.id}', 'webapp.views.user_dataset_assessment_view'),
+            (f'/dataset/assessment/pdf/status?id={self.pdf_job.id}', 'webapp.views.pdf_job_status_view'),
+            ('/dashboard', 'webapp.views.user_dashboard_view'),
+        ]:
+            with self.subTest(view=view_name):
+                self.assertIn(view_name, settings.QUERY_BUDGETS)
+
+                # Raises QueryBudgetExceeded over the budget
+                response = self.client.get(url)
+
+                self.assertEqual(response.status_code, 200)
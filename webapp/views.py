@@ -1,24 +1,41 @@
+import json
+import logging
 import os
 from datetime import datetime
 
 from django.contrib.auth import login, authenticate, logout
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
 from django.core.validators import URLValidator
-from django.db.models import Sum
-from django.http import HttpResponse, HttpRequest
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, HttpRequest, JsonResponse
 from django.shortcuts import render, redirect
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
 from code.fdp.constants import FDP_DEVELOPMENT_URL
 
-from code.label.pdf_creator import PDFCreator
 from code.helpers.django import redirect_with_message, generate_assessment_stars, is_user_allowed_to_access
-from code.label.label import plot_label, compute_scores, compute_maturity_score, plot_maturity
-from code.rdf.ttl_templating import generate_ttl_file
+from code.label.artifacts import artifact_store
+from code.label.materialization import deferred_score_refresh
+from code.label.pdf_export import enqueue_pdf_export_job, pdf_export_filename, pdf_export_job_status
+from code.label.pdf_jobs import dataset_pdf_filename, enqueue_pdf_job, open_pdf_job_file, pdf_job_status, \
+    requeue_evicted_pdf_job
+from code.label.benchmarking import maturity_benchmark
+from code.label.catalogue import get_catalogue_snapshot
+from code.label.simulation import simulate_scenarios, SimulationError
+from code.label.statistics import organization_quality_statistics
+from code.label.tree import build_assessment_tree
+from code.label.label import plot_label, label_image, label_validators, compute_bulk_scores, compute_maturity_score, \
+    cached_plot_maturity, invalidate_maturity_plot
+from code.rdf.ttl_templating import generate_ttl_file, ttl_artifact_key
 
 from webapp.models import Dataset, DQAssessment, DQMetric, DQMetricValue, EHDSCategory, DQDimension, \
     DQCategoricalMetricCategory, UserOrganization, Catalogue, MaturityDimension, MaturityDimensionLevel, \
-    MaturityDimensionValue
+    MaturityDimensionValue, Organization, PDFExportJob, PDFJob
+
+logger = logging.getLogger(__name__)
 
 
 ###########################
@@ -140,19 +157,21 @@ def user_dashboard_view(request: HttpRequest) -> HttpResponse:
 
         user_organization = user_organization.first()
 
-        datasets = Dataset.objects.filter(organization=user_organization.organization)
+        datasets = Dataset.objects.filter(
+            organization=user_organization.organization
+        ).select_related('catalogue__user')
+
+        # Score all the datasets at once instead of one tree walk per dataset
+        dataset_scores = compute_bulk_scores(datasets)
+        metrics = DQMetric.objects.all().count()
 
         dataset_list = []
 
         # Make a list of the datasets and the assessment filled fields ratio
         for dataset in datasets:
-            assessment = DQAssessment.objects.filter(dataset=dataset).first()
-
-            metrics = DQMetric.objects.all().count()
-            dq_metric_value_amount = DQMetricValue.objects.filter(dq_assessment=assessment).count()
+            dq_metric_value_amount = dataset_scores[dataset.id]['answered']
 
-            _, score = compute_scores(dataset)
-            score = int(score)
+            score = int(dataset_scores[dataset.id]['score'])
             stars = generate_assessment_stars(score)
 
             if metrics == dq_metric_value_amount:
@@ -226,20 +245,24 @@ def user_dataset_assessment_view(request: HttpRequest) -> HttpResponse:
         dataset = dataset.first()
 
         assessment = DQAssessment.objects.filter(dataset=dataset).first()
-        ehds_categories = EHDSCategory.objects.all()
+        catalogue = get_catalogue_snapshot()
+
+        # The first value of every metric of the assessment
+        dq_metric_values = {}
+        for dq_metric_value in DQMetricValue.objects.filter(dq_assessment=assessment).order_by('id'):
+            dq_metric_values.setdefault(dq_metric_value.dq_metric_id, dq_metric_value)
 
         values = {}
 
         # We fill the dictionary with all the information to build the web page
-        for category_index, category in enumerate(ehds_categories):
+        for category_index, category in enumerate(catalogue.categories):
             values[category.name] = {
                 'id': category.id,
                 'name': f'{category_index + 1}. {category.name}',
                 'dimensions': []
             }
 
-            dimensions = DQDimension.objects.filter(ehds_category=category)
-            for dimension_index, dimension in enumerate(dimensions):
+            for dimension_index, dimension in enumerate(category.dimensions):
                 values[category.name]['dimensions'].append({
                     'id': dimension.id,
                     'name': f'{category_index + 1}.{dimension_index + 1}. {dimension.name}',
@@ -248,16 +271,13 @@ def user_dataset_assessment_view(request: HttpRequest) -> HttpResponse:
                     'metrics': []
                 })
 
-                metrics = DQMetric.objects.filter(dq_dimension=dimension)
-                for index, metric in enumerate(metrics):
+                for index, metric in enumerate(dimension.metrics):
                     metric_label = f"Metric #{index + 1}"
-                    dq_metric_value = DQMetricValue.objects.filter(dq_assessment=assessment, dq_metric=metric)
                     current_value = None
 
                     # If the metric is filled then we assign the value, else it is None
-                    current_dq_metric_value = None
-                    if len(dq_metric_value) >= 1:
-                        current_dq_metric_value = dq_metric_value.first()
+                    current_dq_metric_value = dq_metric_values.get(metric.id)
+                    if current_dq_metric_value is not None:
                         current_value = str(current_dq_metric_value.value)
 
                     values[category.name]['dimensions'][-1]['metrics'].append({
@@ -284,11 +304,10 @@ def user_dataset_assessment_view(request: HttpRequest) -> HttpResponse:
                             'report_URL'] = report_url
 
                     # For the categorical metrics we provide the possible values
-                    if getattr(metric, 'dqcategoricalmetric') is not None:
+                    if metric.is_categorical:
                         metric_category_values = []
 
-                        metric_categories = DQCategoricalMetricCategory.objects.filter(dq_categorical_metric=metric)
-                        for metric_category in metric_categories:
+                        for metric_category in metric.levels:
                             metric_category_values.append({
                                 'value': str(metric_category.value),
                                 'text': metric_category.text
@@ -362,86 +381,89 @@ def user_dataset_assessment_view(request: HttpRequest) -> HttpResponse:
 
         # We create or update the filled values
         changes = []
-        for metric in metrics:
-            dq_metric = DQMetric.objects.filter(id=metric[0]).first()
-            metric_needs_report = dq_metric.needs_report_URL
-
-            value = metric[1]
-            report_url = metric[2]
-            validated_report_url = None
-            is_report_url_valid = False
-
-            if report_url:
-                url_validator = URLValidator()
-                try:
-                    url_validator(report_url)
-                    validated_report_url = report_url
-                    is_report_url_valid = True
-                except ValidationError:
-                    pass
-            else:
-                is_report_url_valid = True
 
-            lookup_fields = {
-                'dq_metric': dq_metric,
-                'dq_assessment': assessment,
-            }
+        # The materialized assessment scores are refreshed once, in the same transaction as the values
+        with transaction.atomic(), deferred_score_refresh():
+            for metric in metrics:
+                dq_metric = DQMetric.objects.filter(id=metric[0]).first()
+                metric_needs_report = dq_metric.needs_report_URL
+
+                value = metric[1]
+                report_url = metric[2]
+                validated_report_url = None
+                is_report_url_valid = False
+
+                if report_url:
+                    url_validator = URLValidator()
+                    try:
+                        url_validator(report_url)
+                        validated_report_url = report_url
+                        is_report_url_valid = True
+                    except ValidationError:
+                        pass
+                else:
+                    is_report_url_valid = True
 
-            # Value to None means to remove it
-            if value is None:
-                current_dq_value = DQMetricValue.objects.filter(**lookup_fields)
+                lookup_fields = {
+                    'dq_metric': dq_metric,
+                    'dq_assessment': assessment,
+                }
 
-                if current_dq_value:
-                    current_dq_value.delete()
-                    changes.append(f'{dq_metric.dq_dimension.name} updated')
+                # Value to None means to remove it
+                if value is None:
+                    current_dq_value = DQMetricValue.objects.filter(**lookup_fields)
 
-                continue
+                    if current_dq_value:
+                        current_dq_value.delete()
+                        changes.append(f'{dq_metric.dq_dimension.name} updated')
 
-            if is_report_url_valid:
-                update_fields = {
-                    'report_URL': validated_report_url,
-                    'value': value
-                }
-            else:
-                update_fields = {
-                    'report_URL': None,
-                    'value': value
-                }
+                    continue
 
-            previous_dq_metric_value = DQMetricValue.objects.filter(**lookup_fields).first()
+                if is_report_url_valid:
+                    update_fields = {
+                        'report_URL': validated_report_url,
+                        'value': value
+                    }
+                else:
+                    update_fields = {
+                        'report_URL': None,
+                        'value': value
+                    }
 
-            dq_metric_value, created = DQMetricValue.objects.update_or_create(
-                defaults=update_fields,
-                **lookup_fields
-            )
+                previous_dq_metric_value = DQMetricValue.objects.filter(**lookup_fields).first()
 
-            if created:
-                changes.append(f'{dq_metric.dq_dimension.name} reported')
+                dq_metric_value, created = DQMetricValue.objects.update_or_create(
+                    defaults=update_fields,
+                    **lookup_fields
+                )
 
-                if metric_needs_report:
-                    if is_report_url_valid:
-                        if validated_report_url is not None:
-                            changes.append(f'{dq_metric.dq_dimension.name} URL report added {report_url}')
-                        else:
-                            changes.append(f'{dq_metric.dq_dimension.name} URL report removed')
-                    else:
-                        changes.append(f'{dq_metric.dq_dimension.name} URL report is not valid: ({report_url})')
-            else:
-                if previous_dq_metric_value:
-                    if previous_dq_metric_value.value != value:
-                        changes.append(f'{dq_metric.dq_dimension.name} updated')
+                if created:
+                    changes.append(f'{dq_metric.dq_dimension.name} reported')
 
                     if metric_needs_report:
-                        if previous_dq_metric_value.report_URL != report_url:
-                            if is_report_url_valid:
-                                if validated_report_url is not None:
-                                    changes.append(f'{dq_metric.dq_dimension.name} URL report updated ({report_url})')
-                                else:
-                                    changes.append(f'{dq_metric.dq_dimension.name} URL report removed')
+                        if is_report_url_valid:
+                            if validated_report_url is not None:
+                                changes.append(f'{dq_metric.dq_dimension.name} URL report added {report_url}')
                             else:
-                                changes.append(f'{dq_metric.dq_dimension.name} URL report is not valid ({report_url})')
+                                changes.append(f'{dq_metric.dq_dimension.name} URL report removed')
+                        else:
+                            changes.append(f'{dq_metric.dq_dimension.name} URL report is not valid: ({report_url})')
+                else:
+                    if previous_dq_metric_value:
+                        if previous_dq_metric_value.value != value:
+                            changes.append(f'{dq_metric.dq_dimension.name} updated')
+
+                        if metric_needs_report:
+                            if previous_dq_metric_value.report_URL != report_url:
+                                if is_report_url_valid:
+                                    if validated_report_url is not None:
+                                        changes.append(f'{dq_metric.dq_dimension.name} URL report updated ({report_url})')
+                                    else:
+                                        changes.append(f'{dq_metric.dq_dimension.name} URL report removed')
+                                else:
+                                    changes.append(f'{dq_metric.dq_dimension.name} URL report is not valid ({report_url})')
 
-            dq_metric_value.save()
+                dq_metric_value.save()
 
         changes = set(changes)
         changes_message = ''
@@ -1043,107 +1065,12 @@ def dataset_label_view(request: HttpRequest) -> HttpResponse:
         user_organization = UserOrganization.objects.filter(user=user).first()
         organization = user_organization.organization
 
-        # Needs to add 0 score box
-        information_box_needed = False
-
-        # Compute the label plot
-        label = plot_label(dataset)
-
-        # Compute the assessment table
-        dimensions_total_relevance = DQDimension.objects.aggregate(Sum('relevance'))[
-            'relevance__sum']  # DQDimension.objects: This refers to all records (or rows) in the DQDimension table (or model). It allows you to query or manipulate the data related to this model in the database. aggregate(): This is a method in Django ORM used for performing aggregate functions (such as sum, average, count) on a set of data.
-        # When using aggregate() in Django, it returns a dictionary where the keys are based on the fields and operations you're performing. In your case, Sum('relevance') creates a key 'relevance__sum', and to get the actual sum, you access the dictionary value using this key.
-        results = []  # This list will store the results for each category, dimension, and metric.
-        total_score = 0  # This will accumulate the total score across all dimensions and metrics.
-        assessment = dataset.dq_assessment
-        ehds_categories = EHDSCategory.objects.all()  # This retrieves all EHDS categories, which will be iterated over to calculate the score for each category and its associated dimensions and metrics.
-        for category in ehds_categories:
-            results.append({
-                'name': category.name,
-                'dimensions': [],
-                'score': 0,  # Initialized to 0. This will accumulate the total score for the category.
-                'all_dimensions_ok': True,
-                'id': category.id
-
-            })
-
-            dimensions = DQDimension.objects.filter(ehds_category=category)
-            for dimension in dimensions:
-                results[-1]['dimensions'].append({
-                    # why the -1? --> In Python, -1 is an index that refers to the last element in a list. In this case, results[-1] is referring to the most recent category that was added to the results list. MORE INFO: e use results[-1] is because we want to add dimensions to the current category being processed in the loop. When you start processing a new category (from EHDSCategory), you first append the category to the results list. Then, within that same loop, you start adding dimensions to the dimensions list within that newly appended category. Since you’re still processing the last category added, you access it via results[-1]. Without -1, we wouldn’t know which category to add dimensions to, and Python doesn’t have direct references to the most recently appended item without such indexing.
-                    'name': dimension.name,
-                    'relevance': (dimension.relevance / dimensions_total_relevance) * 100,
-                    # (inside the table of the label page) this formula make the dimension scores from decimal (0.1) to percentage (10) --> affecting also the numbers of stars since you would add 0.1 instead of 10
-                    'metrics': [],
-                    'score': 0,
-                    'all_metrics_ok': True,
-                    'id': dimension.id
-                })
-
-                metrics = DQMetric.objects.filter(dq_dimension=dimension)
-                for metric_index, metric in enumerate(metrics):
-                    metric_label = f"Metric #{metric_index + 1}"
-                    metric_value = DQMetricValue.objects.filter(dq_assessment=assessment, dq_metric=metric).first()
-                    answer_text = "Not answered"
-
-                    if metric_value:
-                        # Fetch the corresponding text for the categorical value
-                        answer_text = metric_value.value
-                        if metric_value.value.isdigit():
-                            category_match = DQCategoricalMetricCategory.objects.filter(
-                                dq_categorical_metric=metric, value=int(metric_value.value)
-                            ).first()
-                            if category_match:
-                                answer_text = category_match.text
-
-                    results[-1]['dimensions'][-1]['metrics'].append({
-                        'definition': metric.definition,
-                        'weight': int(metric.weight),
-                        'score': 0,
-                        'metric_label': metric_label,
-                        'answer': answer_text,
-                        'is_metric_ok': False,
-                        'is_zero_with_answer': False,
-                        'is_zero_unanswered': False
-                    })
-
-                    dq_metric_value = DQMetricValue.objects.filter(dq_assessment=assessment, dq_metric=metric)
-                    current_value = None
-                    metric_score = 0
-
-                    if len(dq_metric_value) >= 1:
-                        current_value = str(dq_metric_value.first().value)
-
-                    if getattr(metric, 'dqcategoricalmetric') is not None:
-                        if current_value is not None and current_value.isdigit():
-                            current_value = int(current_value)
-                            metric_categories = DQCategoricalMetricCategory.objects.filter(
-                                dq_categorical_metric=metric
-                            ).count()
-
-                            # Compute metric score
-                            metric_score = current_value / (metric_categories - 1)
-                            metric_score *= (metric.weight / 100) * results[-1]['dimensions'][-1]['relevance']
-                            results[-1]['dimensions'][-1]['metrics'][-1]['score'] = metric_score
-                            results[-1]['dimensions'][-1]['score'] += metric_score
-
-                            if metric_score == 0:
-                                results[-1]['dimensions'][-1]['metrics'][-1]['is_zero_with_answer'] = True
-                        else:
-                            results[-1]['dimensions'][-1]['metrics'][-1]['is_zero_unanswered'] = True
-
-                    results[-1]['dimensions'][-1]['metrics'][-1]['is_metric_ok'] = metric_score > 0
-                    results[-1]['dimensions'][-1]['all_metrics_ok'] = results[-1]['dimensions'][-1]['all_metrics_ok'] and results[-1]['dimensions'][-1]['metrics'][-1]['is_metric_ok']
-                    information_box_needed = information_box_needed or not results[-1]['dimensions'][-1]['all_metrics_ok']
-
-                # This is exactly line 774 above and adds the score of the last dimension (just calculated) to the total score for all dimensions and categories.
-                total_score += results[-1]['dimensions'][-1]['score']
-
-                results[-1]['all_dimensions_ok'] = results[-1]['all_dimensions_ok'] and results[-1]['dimensions'][-1][
-                    'all_metrics_ok']
+        # The category -> dimension -> metric tree with the scores of the table, the plot is loaded from
+        # dataset/label/json by the page
+        tree = build_assessment_tree(dataset)
 
         # Drawing the stars
-        stars_element = generate_assessment_stars(total_score)
+        stars_element = generate_assessment_stars(tree.score)
 
         # Maturity score
         dimensions_dictionary, matrix_score = compute_maturity_score(organization=organization)
@@ -1153,12 +1080,11 @@ def dataset_label_view(request: HttpRequest) -> HttpResponse:
             request,
             'dataset_label.html',
             context={
-                'label': label,
-                'results': results,
-                'score': total_score,
+                'results': tree.categories,
+                'score': tree.score,
                 'stars': stars_element,
                 'dataset_id': dataset_id,
-                'information_box_needed': information_box_needed,
+                'information_box_needed': tree.information_box_needed,
                 'maturity_score': matrix_score,
                 'maturity_percentage': maturity_percentage,
             }
@@ -1171,6 +1097,147 @@ def dataset_label_view(request: HttpRequest) -> HttpResponse:
         )
 
 
+@login_required
+def dataset_label_json_view(request: HttpRequest) -> HttpResponse:
+    """
+    Plotly figure of the DQ&U label of a dataset, with ETag and Last-Modified validators so the browser keeps it
+    in its cache and only revalidates it
+    :param request:
+    :return: JSON with the data and layout of the figure, or Not Modified
+    """
+    if request.method == 'GET':
+        dataset_id = request.GET.get('id', None)
+
+        can_access, redirect_request = is_user_allowed_to_access(
+            request,
+            request.user,
+            dataset_id_to_check=dataset_id
+        )
+
+        if not can_access:
+            return redirect_request
+
+        dataset = Dataset.objects.select_related('dq_assessment').filter(id=dataset_id).first() \
+            if dataset_id is not None else None
+        if dataset is None:
+            return redirect_with_message(
+                request,
+                '/dashboard',
+                f'Dataset not existing!'
+            )
+
+        etag, last_modified = label_validators(dataset)
+        last_modified = round(last_modified.timestamp()) if last_modified is not None else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+        if response is None:
+            response = HttpResponse(
+                plot_label(dataset, output_type='json', tree=build_assessment_tree(dataset)),
+                content_type='application/json'
+            )
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        # Always revalidated, the label changes with every answer
+        patch_cache_control(response, private=True, no_cache=True)
+
+        return response
+    else:
+        return redirect_with_message(
+            request,
+            '/dashboard',
+            f'Wrong access!'
+        )
+
+
+@login_required
+def dataset_label_image_view(request: HttpRequest) -> HttpResponse:
+    """
+    PNG image of the DQ&U label of a dataset, from the label image cache when the same label was already rendered
+    :param request:
+    :return: The PNG image
+    """
+    if request.method == 'GET':
+        dataset_id = request.GET.get('id', None)
+
+        can_access, redirect_request = is_user_allowed_to_access(
+            request,
+            request.user,
+            dataset_id_to_check=dataset_id
+        )
+
+        if not can_access:
+            return redirect_request
+
+        dataset = Dataset.objects.filter(id=dataset_id).first() if dataset_id is not None else None
+        if dataset is None:
+            return redirect_with_message(
+                request,
+                '/dashboard',
+                f'Dataset not existing!'
+            )
+
+        return HttpResponse(label_image(build_assessment_tree(dataset)), content_type='image/png')
+    else:
+        return redirect_with_message(
+            request,
+            '/dashboard',
+            f'Wrong access!'
+        )
+
+
+@login_required
+def dataset_simulation_view(request: HttpRequest) -> HttpResponse:
+    """
+    Scores hypothetical answer sets of the dataset assessment without saving them. The body is a JSON object
+    {"scenarios": [{"<metric id>": <level or null>, ...}, ...]}, every scenario changes the saved answers, or
+    {"metrics": [<metric id>, ...], "scenarios": [[<level or null>, ...], ...]} for large batches.
+    :param request:
+    :return: JSON with the current score and the score, stars and dimension deltas of every scenario
+    """
+    if request.method == 'POST':
+        dataset_id = request.GET.get('id', None)
+
+        can_access, redirect_request = is_user_allowed_to_access(
+            request,
+            request.user,
+            dataset_id_to_check=dataset_id
+        )
+
+        if not can_access:
+            return redirect_request
+
+        if dataset_id is None:
+            return JsonResponse({'error': 'Dataset not provided!'}, status=400)
+
+        dataset = Dataset.objects.filter(id=dataset_id).first()
+
+        try:
+            body = json.loads(request.body)
+            scenarios = body.get('scenarios')
+            metric_ids = body.get('metrics')
+        except (ValueError, AttributeError):
+            return JsonResponse({'error': 'The body must be a JSON object'}, status=400)
+
+        engine = get_catalogue_snapshot().engine
+        current_answers = engine.assessment_answers(dataset.dq_assessment)
+
+        try:
+            simulation = simulate_scenarios(engine, current_answers, scenarios, metric_ids)
+        except SimulationError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+
+        return JsonResponse({'dataset_id': dataset.id, **simulation})
+    else:
+        return redirect_with_message(
+            request,
+            '/dashboard',
+            f'Wrong access!'
+        )
+
+
 @login_required
 def organization_maturity_view(request: HttpRequest) -> HttpResponse:
     if request.method == 'GET':
@@ -1188,9 +1255,10 @@ def organization_maturity_view(request: HttpRequest) -> HttpResponse:
 
         user_organization = user_organization.first().organization
 
-        dimensions_dictionary, matrix_score = compute_maturity_score(organization=user_organization)
+        maturity = compute_maturity_score(organization=user_organization)
+        dimensions_dictionary, matrix_score = maturity
 
-        maturity_plot = plot_maturity(user_organization)
+        maturity_plot = cached_plot_maturity(user_organization, maturity=maturity)
         maturity_percentage = matrix_score * 100 / 50
 
         return render(
@@ -1277,6 +1345,9 @@ def organization_maturity_view(request: HttpRequest) -> HttpResponse:
 
             maturity_dimension_value.save()
 
+        # The cached plots are outdated, as done by the signals of every saved or deleted value
+        invalidate_maturity_plot(user_organization.id)
+
         changes = set(changes)
         changes_message = ''
 
@@ -1303,6 +1374,85 @@ def organization_maturity_view(request: HttpRequest) -> HttpResponse:
         )
 
 
+@login_required
+def organization_statistics_view(request: HttpRequest) -> HttpResponse:
+    """
+    DQ&U statistics of all the datasets of the user organization
+    :param request:
+    :return:
+    """
+    if request.method == 'GET':
+        can_access, redirect_request = is_user_allowed_to_access(request, request.user)
+
+        if not can_access:
+            return redirect_request
+
+        organization = UserOrganization.objects.filter(user=request.user).first().organization
+
+        return render(
+            request,
+            'organization_statistics.html',
+            context={
+                'statistics': organization_quality_statistics(organization)
+            }
+        )
+    else:
+        return redirect_with_message(
+            request,
+            '/dashboard',
+            f'Wrong access!'
+        )
+
+
+@login_required
+def organization_statistics_json_view(request: HttpRequest) -> HttpResponse:
+    """
+    DQ&U statistics of all the datasets of the user organization as JSON
+    :param request:
+    :return:
+    """
+    if request.method == 'GET':
+        can_access, redirect_request = is_user_allowed_to_access(request, request.user)
+
+        if not can_access:
+            return redirect_request
+
+        organization = UserOrganization.objects.filter(user=request.user).first().organization
+
+        return JsonResponse(organization_quality_statistics(organization))
+    else:
+        return redirect_with_message(
+            request,
+            '/dashboard',
+            f'Wrong access!'
+        )
+
+
+@staff_member_required
+def maturity_benchmark_view(request: HttpRequest) -> HttpResponse:
+    """
+    Staff overview of the maturity of all the organizations: percentiles and distributions per dimension
+    :param request:
+    :return:
+    """
+    if request.method == 'GET':
+        benchmark = maturity_benchmark(Organization.objects.all())
+
+        return render(
+            request,
+            'maturity_benchmark.html',
+            context={
+                'benchmark': benchmark
+            }
+        )
+    else:
+        return redirect_with_message(
+            request,
+            '/dashboard',
+            f'Wrong access!'
+        )
+
+
 @login_required
 def download_assessment_rdf(request: HttpRequest) -> HttpResponse:
     if request.method == 'GET':
@@ -1330,10 +1480,15 @@ def download_assessment_rdf(request: HttpRequest) -> HttpResponse:
         catalogue = dataset.catalogue
         assessment = DQAssessment.objects.filter(dataset=dataset).first()
 
-        ttl_file = generate_ttl_file(
-            catalogue=catalogue,
-            dataset=dataset,
-            username=user.username
+        # Generated again only when the answers, the catalogue or the dataset change
+        ttl_file = artifact_store.get_or_create(
+            'ttl',
+            ttl_artifact_key(catalogue=catalogue, dataset=dataset),
+            lambda: generate_ttl_file(
+                catalogue=catalogue,
+                dataset=dataset,
+                username=user.username
+            ).encode('utf-8')
         )
 
         response = HttpResponse(ttl_file, content_type='application/text charset=utf-8')
@@ -1348,39 +1503,268 @@ def download_assessment_rdf(request: HttpRequest) -> HttpResponse:
         )
 
 
+@login_required
 def download_assessment_pdf(request: HttpRequest) -> HttpResponse:
-    if request.method == 'GET':
-        user = request.user
+    """
+    Queues the PDF report of a dataset, rendered by the pdf_worker command so the web workers never block on it.
+    Links opened with GET (bookmarks, e-mails) download the PDF if it is already rendered, or go back to the label
+    page while it is rendered.
+    :param request:
+    :return: JSON with the id and status of the job, or a redirect for GET
+    """
+    if request.method in ('GET', 'POST'):
         dataset_id = request.GET.get('id', None)
 
-        dataset = Dataset.objects.filter(id=dataset_id)
-        if len(dataset) == 0:
+        can_access, redirect_request = is_user_allowed_to_access(
+            request,
+            request.user,
+            dataset_id_to_check=dataset_id
+        )
+
+        if not can_access:
+            return redirect_request
+
+        dataset = Dataset.objects.filter(id=dataset_id).first() if dataset_id is not None else None
+        if dataset is None:
             return redirect_with_message(
                 request,
                 '/dashboard',
                 'Dataset accessed doesn\'t exist'
             )
 
-        organization = UserOrganization.objects.filter(user=user).first().organization
-        dataset = dataset.first()
-        catalogue = dataset.catalogue
-        assessment = DQAssessment.objects.filter(dataset=dataset).first()
+        organization = UserOrganization.objects.filter(user=request.user).first().organization
+        job = enqueue_pdf_job(dataset, organization, request.user)
+        status = pdf_job_status(job)
+
+        if request.method == 'POST':
+            return JsonResponse(status, status=202)
 
-        pdf_creator = PDFCreator()
-        pdf_file = pdf_creator.generate_pdf(
-            dataset=dataset,
-            catalogue=catalogue,
-            assessment=assessment,
-            organization=organization
+        if job.status == 'D':
+            return redirect(status['download_url'])
+
+        return redirect_with_message(
+            request,
+            f'/dataset/label?id={dataset.id}',
+            'The PDF is being generated, download it from this page in a moment.'
+        )
+    else:
+        return redirect_with_message(
+            request,
+            '/dashboard',
+            f'Wrong access!'
         )
 
-        response = HttpResponse(pdf_file, content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="document.pdf"'
 
-        return response
+@login_required
+def organization_pdf_export_view(request: HttpRequest) -> HttpResponse:
+    """
+    Queues the ZIP with the PDF report of every assessed dataset of the organization, or of one of its catalogues,
+    built by the pdf_worker command so the web workers never render it
+    :param request:
+    :return: JSON with the id and status of the job
+    """
+    if request.method == 'POST':
+        catalogue_id = request.GET.get('catalogue', None)
+
+        can_access, redirect_request = is_user_allowed_to_access(
+            request,
+            request.user,
+            catalogue_id_to_check=catalogue_id
+        )
+
+        if not can_access:
+            return redirect_request
+
+        organization = UserOrganization.objects.filter(user=request.user).first().organization
+        catalogue = Catalogue.objects.filter(id=catalogue_id).first() if catalogue_id is not None else None
+
+        job = enqueue_pdf_export_job(organization, catalogue, request.user)
+
+        return JsonResponse(pdf_export_job_status(job), status=202)
     else:
         return redirect_with_message(
             request,
             '/dashboard',
             f'Wrong access!'
         )
+
+
+@login_required
+def organization_pdf_export_status_view(request: HttpRequest) -> HttpResponse:
+    """
+    Status and progress of a ZIP export, polled by the dashboard
+    :param request:
+    :return: JSON with the status, the progress and the URL of the ZIP once built
+    """
+    if request.method == 'GET':
+        job, redirect_request = _requested_pdf_export_job(request)
+
+        if job is None:
+            return redirect_request
+
+        return JsonResponse(pdf_export_job_status(job))
+    else:
+        return redirect_with_message(
+            request,
+            '/dashboard',
+            f'Wrong access!'
+        )
+
+
+@login_required
+def organization_pdf_export_download_view(request: HttpRequest) -> HttpResponse:
+    """
+    ZIP built by a finished export, read from the storage
+    :param request:
+    :return: The ZIP file
+    """
+    if request.method == 'GET':
+        job, redirect_request = _requested_pdf_export_job(request)
+
+        if job is None:
+            return redirect_request
+
+        if job.status != 'D':
+            return redirect_with_message(
+                request,
+                '/dashboard',
+                'The PDF labels are not ready yet!'
+            )
+
+        # Streamed from the storage, with the Content-Length of the file
+        return FileResponse(
+            job.file.open('rb'),
+            as_attachment=True,
+            filename=pdf_export_filename(job),
+            content_type='application/zip'
+        )
+    else:
+        return redirect_with_message(
+            request,
+            '/dashboard',
+            f'Wrong access!'
+        )
+
+
+def _requested_pdf_export_job(request: HttpRequest) -> tuple:
+    """
+    ZIP export of the id parameter, if it is one of the organization of the user
+    :param request:
+    :return: The job, or None and the response redirecting with the error
+    """
+    job_id = request.GET.get('id', None)
+    job = PDFExportJob.objects.select_related('organization').filter(
+        id=job_id
+    ).first() if job_id is not None and job_id.isdigit() else None
+
+    if job is None:
+        return None, redirect_with_message(
+            request,
+            '/dashboard',
+            'PDF export not existing!'
+        )
+
+    if not UserOrganization.objects.filter(user=request.user, organization_id=job.organization_id).exists():
+        return None, redirect_with_message(
+            request,
+            '/dashboard',
+            f'Wrong access!'
+        )
+
+    return job, None
+
+
+@login_required
+def pdf_job_status_view(request: HttpRequest) -> HttpResponse:
+    """
+    Status and progress of a PDF job, polled by the label page
+    :param request:
+    :return: JSON with the status, the progress and the URL of the PDF once rendered
+    """
+    if request.method == 'GET':
+        job, redirect_request = _requested_pdf_job(request)
+
+        if job is None:
+            return redirect_request
+
+        return JsonResponse(pdf_job_status(job))
+    else:
+        return redirect_with_message(
+            request,
+            '/dashboard',
+            f'Wrong access!'
+        )
+
+
+@login_required
+def pdf_job_download_view(request: HttpRequest) -> HttpResponse:
+    """
+    PDF rendered by a finished job, read from the artifact store or the storage
+    :param request:
+    :return: The PDF file
+    """
+    if request.method == 'GET':
+        job, redirect_request = _requested_pdf_job(request)
+
+        if job is None:
+            return redirect_request
+
+        if job.status != 'D':
+            return redirect_with_message(
+                request,
+                f'/dataset/label?id={job.dataset_id}',
+                'The PDF is not ready yet!'
+            )
+
+        pdf_file = open_pdf_job_file(job)
+
+        if pdf_file is None:
+            requeue_evicted_pdf_job(job)
+
+            return redirect_with_message(
+                request,
+                f'/dataset/label?id={job.dataset_id}',
+                'The PDF expired and is being generated again!'
+            )
+
+        # Streamed from the artifact store or the storage, with the Content-Length of the file
+        return FileResponse(
+            pdf_file,
+            as_attachment=True,
+            filename=dataset_pdf_filename(job.dataset),
+            content_type='application/pdf'
+        )
+    else:
+        return redirect_with_message(
+            request,
+            '/dashboard',
+            f'Wrong access!'
+        )
+
+
+def _requested_pdf_job(request: HttpRequest) -> tuple:
+    """
+    PDF job of the id parameter, if the user can access its dataset
+    :param request:
+    :return: The job, or None and the response redirecting with the error
+    """
+    job_id = request.GET.get('id', None)
+    job = PDFJob.objects.filter(id=job_id).first() if job_id is not None and job_id.isdigit() else None
+
+    if job is None:
+        return None, redirect_with_message(
+            request,
+            '/dashboard',
+            'PDF job not existing!'
+        )
+
+    can_access, redirect_request = is_user_allowed_to_access(
+        request,
+        request.user,
+        dataset_id_to_check=job.dataset_id
+    )
+
+    if not can_access:
+        return None, redirect_request
+
+    return job, None